@@ -1,41 +1,48 @@
-import psutil
 from flask import Flask
 from flask_swagger_ui import get_swaggerui_blueprint
-from prometheus_client import Gauge, make_wsgi_app
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
 
+from commands.media import media_cli
 from config import Config
 from config.config import TestConfig
-from dependencies import cache, db, jwt, ma, migrate, registry
+from dependencies import (cache, db, image_pipeline, jwt, ma, migrate, password_hasher,
+                          registry, request_metrics)
 from routes.accounts import accounts
 from routes.categories import categories
 from routes.orders import orders
 from routes.products import products
 from routes.shops import shops
+from utils.images import cache_immutable_media
+from utils.metrics import SystemMetricsSampler, make_metrics_app
+from utils.revocation import init_revocation_store
+from utils.uploads import UploadRequest
 
 
 def create_app(config_class=Config) -> Flask:
     app = Flask(__name__, static_folder='static', static_url_path='/static')
-
-    ram_metric = Gauge("memory_usage_percent", "Memory usage in percent.",
-                       registry=registry)
-    cpu_metric = Gauge("cpu_usage_percent", "CPU usage percent.",
-                       registry=registry)
-
-    ram_metric.set_function(lambda: psutil.virtual_memory().percent)
-    cpu_metric.set_function(lambda: psutil.cpu_percent(interval=1))
+    app.request_class = UploadRequest
 
     app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {
-        '/healthcheck': make_wsgi_app(registry=registry)
+        '/healthcheck': make_metrics_app(registry)
     })
 
     app.config.from_object(config_class)
 
+    app.extensions['system_metrics'] = SystemMetricsSampler(
+        registry, interval=app.config['SYSTEM_METRICS_INTERVAL'])
+    app.extensions['system_metrics'].start()
+
     db.init_app(app)
     migrate.init_app(app, db)
     ma.init_app(app)
     cache.init_app(app)
     jwt.init_app(app)
+    request_metrics.init_app(app)
+    init_revocation_store(app)
+    password_hasher.init_app(app)
+    image_pipeline.init_app(app)
+    app.after_request(cache_immutable_media)
+    app.cli.add_command(media_cli)
 
     SWAGGER_URL = "/swagger"
     API_URL = "/static/swaggerAuth.json"
@@ -55,8 +62,9 @@ def create_app(config_class=Config) -> Flask:
 
 def create_testing_app(config_class=TestConfig) -> Flask:
     app = Flask(__name__, static_folder='static', static_url_path='/static')
+    app.request_class = UploadRequest
     app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {
-        '/healthcheck': make_wsgi_app(registry=registry)
+        '/healthcheck': make_metrics_app(registry)
     })
 
     app.config.from_object(config_class)
@@ -67,6 +75,12 @@ def create_testing_app(config_class=TestConfig) -> Flask:
     ma.init_app(app)
     cache.init_app(app)
     jwt.init_app(app)
+    request_metrics.init_app(app)
+    init_revocation_store(app)
+    password_hasher.init_app(app)
+    image_pipeline.init_app(app)
+    app.after_request(cache_immutable_media)
+    app.cli.add_command(media_cli)
 
     SWAGGER_URL = "/swagger"
     API_URL = "/static/swaggerAuth.json"
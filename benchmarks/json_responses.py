@@ -0,0 +1,79 @@
+"""
+Compares response bodies of pydantic-backed endpoints before and after compact JSON.
+
+Serializes a full page of /products/shop_products (30 products with 4 photos
+each) the old way, model_dump_json(indent=4), and through
+utils.serialization.json_response, then prints bytes and microseconds per body.
+
+Run from the repository root: python -m benchmarks.json_responses
+"""
+import datetime
+import timeit
+
+from app import create_testing_app
+from utils.serialization import json_response
+from validation.products import PaginatedDetailProductSchema
+
+PRODUCTS_PER_PAGE = 30
+PHOTOS_PER_PRODUCT = 4
+REPEAT = 200
+
+
+def build_page() -> dict:
+    now = datetime.datetime(2024, 3, 27, 12, 0)
+    return {
+        "has_next": True,
+        "total_pages": 10,
+        "next_cursor": "WyIyMDI0LTAzLTI3IDEyOjAwOjAwIiwgMzBd",
+        "data": [{
+            "id": product_id,
+            "category_id": 1,
+            "sub_category_id": 11,
+            "shop_id": 1,
+            "product_name": f"Заколка для волосся {product_id}",
+            "product_description": "Ручна робота, натуральні матеріали, подарункове пакування.",
+            "price": 249.5,
+            "time_added": now,
+            "time_modifeid": now,
+            "is_active": True,
+            "is_return": True,
+            "is_unique": False,
+            "product_status": "В наявності",
+            "product_characteristic": {"Колір": "Синій", "Матеріал": "Метал", "Розмір": "8 см"},
+            "delivery_post": {"novaPost": True, "ukrPost": False},
+            "method_of_payment": {"card": True, "cash": True},
+            "photos": [{
+                "id": product_id * PHOTOS_PER_PRODUCT + index,
+                "product_photo": f"{index:02x}/{product_id:02x}/{'ab' * 32}.jpeg",
+                "timestamp": now,
+                "main": index == 0,
+            } for index in range(PHOTOS_PER_PRODUCT)],
+        } for product_id in range(PRODUCTS_PER_PAGE)],
+    }
+
+
+def measure(build_body) -> tuple[int, float]:
+    size = len(build_body())
+    seconds = timeit.timeit(build_body, number=REPEAT) / REPEAT
+    return size, seconds * 1e6
+
+
+def main():
+    app = create_testing_app()
+    with app.test_request_context():
+        page = PaginatedDetailProductSchema(**build_page())
+        before = measure(lambda: page.model_dump_json(indent=4).encode())
+        after = measure(lambda: json_response(page).get_data())
+    with app.test_request_context("/?pretty=1"):
+        pretty = measure(lambda: json_response(page).get_data())
+
+    print(f"{'body':<28}{'bytes':>10}{'us':>10}")
+    for name, (size, micros) in (("model_dump_json(indent=4)", before),
+                                 ("json_response", after),
+                                 ("json_response ?pretty=1", pretty)):
+        print(f"{name:<28}{size:>10}{micros:>10.0f}")
+    print(f"compact body is {100 * (1 - after[0] / before[0]):.0f}% smaller")
+
+
+if __name__ == "__main__":
+    main()
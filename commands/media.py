@@ -0,0 +1,238 @@
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import click
+from flask.cli import AppGroup
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy import bindparam, delete, select
+
+from dependencies import db
+from models import accounts, products, shops
+from models.media import MediaFile, media_key
+from utils.images import generate_image_variants, image_files, shard_name
+
+media_cli = AppGroup('media', help='Manage uploaded media files.')
+# Extensions of uploaded images and their variants, other files in media folders are kept
+MEDIA_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+
+
+def media_columns() -> list:
+    """Returns (folder path, column) of every model field holding a stored image name"""
+    return [
+        (products.PRODUCT_PHOTOS_PATH, products.ProductPhoto.product_photo),
+        (shops.SHOPS_PHOTOS_PATH, shops.Shop.photo_shop),
+        (shops.SHOPS_BANNER_PHOTOS_PATH, shops.Shop.banner_shop),
+        (accounts.PROFILE_PHOTOS_PATH, accounts.User.profile_picture),
+    ]
+
+
+def _referenced_names(column) -> set[str]:
+    """Names of the files referenced by column, variants included, read in a single query"""
+    # Photos of soft deleted products count too, the product can be reactivated
+    query = select(column).distinct().where(column.is_not(None))
+    names = set()
+    for name in db.session.execute(query.execution_options(yield_per=10000)).scalars():
+        names.update(image_files(name))
+    return names
+
+
+def _drop_stale_counts(photo_path: str, names: list[str]):
+    """Deletes the reference counts left for removed files no row references"""
+    keys = [media_key(photo_path, name) for name in names]
+    for start in range(0, len(keys), 500):
+        db.session.execute(delete(MediaFile).where(MediaFile.path.in_(keys[start:start + 500])))
+    db.session.commit()
+
+
+def _scan_entry(entry: os.DirEntry, photo_path: str, cutoff: float) -> list[tuple[str, int]]:
+    """Lists (name relative to photo_path, size) of images at or below entry older than cutoff"""
+    # Dotfiles such as the tracked .gitkeep are no uploads
+    if entry.name.startswith('.'):
+        return []
+    if entry.is_dir(follow_symlinks=False):
+        with os.scandir(entry.path) as entries:
+            return [file for child in entries for file in _scan_entry(child, photo_path, cutoff)]
+    if entry.is_file(follow_symlinks=False) \
+            and entry.name.rsplit('.', 1)[-1].lower() in MEDIA_EXTENSIONS:
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime < cutoff:
+            return [(os.path.relpath(entry.path, photo_path).replace(os.sep, '/'), stat.st_size)]
+    return []
+
+
+def _kept_for_shard(name: str, referenced: set[str]) -> bool:
+    """Whether name is a flat file whose sharded copy is referenced, left to media shard --prune"""
+    return '/' not in name and shard_name(name) in referenced
+
+
+def _collect_file(photo_path: str, name: str, cutoff: float, quarantine: str | None) -> bool:
+    """Removes or quarantines an unreferenced file unless it was written since the scan"""
+    path = os.path.join(photo_path, name)
+    try:
+        if os.stat(path).st_mtime >= cutoff:
+            return False
+        if quarantine:
+            target = os.path.join(quarantine, os.path.basename(photo_path), name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(path, target)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _link_into_shard(photo_path: str, name: str):
+    """Links the flat file and its variants into the sharded layout, keeping the flat names"""
+    for flat, sharded in zip(image_files(os.path.join(photo_path, name)),
+                             image_files(os.path.join(photo_path, shard_name(name)))):
+        if not os.path.isfile(flat) or os.path.exists(sharded):
+            continue
+        os.makedirs(os.path.dirname(sharded), exist_ok=True)
+        try:
+            os.link(flat, sharded)
+        except OSError:
+            shutil.copy2(flat, sharded)
+
+
+def _prune_flat(photo_path: str, entry: os.DirEntry):
+    """Removes a flat file once its sharded copy exists"""
+    if entry.is_file() and os.path.isfile(os.path.join(photo_path, shard_name(entry.name))):
+        os.remove(entry.path)
+        return 1
+    return 0
+
+
+def _shard_column(pool: ThreadPoolExecutor, photo_path: str, column, batch_size: int) -> int:
+    rename_rows = column.table.update() \
+        .where(column == bindparam('old_name')) \
+        .values({column.key: bindparam('new_name')})
+    rename_refs = MediaFile.__table__.update() \
+        .where(MediaFile.path == bindparam('old_key')) \
+        .values(path=bindparam('new_key'))
+    moved = 0
+    while True:
+        names = db.session.execute(
+            select(column).distinct()
+            .where(column.is_not(None), column.not_like('%/%'))
+            .limit(batch_size)
+        ).scalars().all()
+        if not names:
+            return moved
+        list(pool.map(partial(_link_into_shard, photo_path), names))
+        db.session.execute(rename_rows, [{'old_name': name, 'new_name': shard_name(name)}
+                                         for name in names])
+        db.session.execute(rename_refs, [{'old_key': media_key(photo_path, name),
+                                          'new_key': media_key(photo_path, shard_name(name))}
+                                         for name in names])
+        db.session.commit()
+        moved += len(names)
+
+
+def _backfill_variants(photo_path: str, name: str) -> bool | None:
+    """Generates the variants of a stored image missing any, None if there was nothing to do"""
+    path, *variants = image_files(os.path.join(photo_path, name))
+    if not os.path.isfile(path) or all(os.path.isfile(variant) for variant in variants):
+        return None
+    try:
+        generate_image_variants(path)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as ex:
+        click.echo(f"{name}: variants were not generated: {ex}", err=True)
+        return False
+    return True
+
+
+@media_cli.command('variants')
+@click.option('--workers', default=4, show_default=True, help='Threads resizing images.')
+def backfill_variants(workers: int):
+    """
+        Generates the size variants of images uploaded before variants existed.
+
+        API responses list variant URLs for every stored image, images
+        missing any variant get all of them written. Rerunning the command
+        only resizes images that still miss variants.
+    """
+    with ThreadPoolExecutor(workers) as pool:
+        for photo_path, column in media_columns():
+            names = db.session.execute(
+                select(column).distinct().where(column.is_not(None))).scalars().all()
+            results = list(pool.map(partial(_backfill_variants, photo_path), names))
+            click.echo(f"{os.path.basename(photo_path)}: variants generated for "
+                       f"{results.count(True)} images, {results.count(False)} failed")
+
+
+@media_cli.command('shard')
+@click.option('--batch-size', default=500, show_default=True,
+              help='Rows renamed per transaction.')
+@click.option('--workers', default=8, show_default=True, help='Threads moving files.')
+@click.option('--prune', is_flag=True,
+              help='Remove flat files already linked into the sharded layout.')
+def shard_media(batch_size: int, workers: int, prune: bool):
+    """
+        Moves media stored in flat folders into the sharded layout.
+
+        Files are hard linked into ab/cd/ sub folders before the rows naming
+        them are renamed, batch by batch, so the command can be interrupted
+        and rerun. The flat names keep working for cached pages and clients
+        until the command is rerun with --prune, after the caches expired.
+    """
+    with ThreadPoolExecutor(workers) as pool:
+        for photo_path, column in media_columns():
+            folder = os.path.basename(photo_path)
+            moved = _shard_column(pool, photo_path, column, batch_size)
+            click.echo(f"{folder}: {moved} files sharded")
+            if prune and os.path.isdir(photo_path):
+                with os.scandir(photo_path) as entries:
+                    pruned = sum(pool.map(partial(_prune_flat, photo_path), list(entries)))
+                click.echo(f"{folder}: {pruned} flat files removed")
+
+
+@media_cli.command('gc')
+@click.option('--grace-period', default=24 * 3600, show_default=True,
+              help='Seconds an unreferenced file is kept, covering uploads not committed yet.')
+@click.option('--workers', default=8, show_default=True, help='Threads scanning folders.')
+@click.option('--quarantine', type=click.Path(file_okay=False),
+              help='Move unreferenced files into this folder instead of removing them.')
+@click.option('--dry-run', is_flag=True, help='Only report unreferenced files.')
+def collect_media(grace_period: int, workers: int, quarantine: str | None, dry_run: bool):
+    """
+        Removes media files no row references.
+
+        Files left by failed uploads are removed once they are older than
+        the grace period, together with any reference count left for them.
+        References are read again after the scan, and uploads reusing a
+        stored file refresh the mtime of the file and its variants, so files
+        referenced while the command runs are kept. Flat files whose sharded
+        copy is referenced are left for media shard --prune.
+    """
+    cutoff = time.time() - grace_period
+    with ThreadPoolExecutor(workers) as pool:
+        for photo_path, column in media_columns():
+            if not os.path.isdir(photo_path):
+                continue
+            folder = os.path.basename(photo_path)
+            referenced = _referenced_names(column)
+            with os.scandir(photo_path) as entries:
+                scanned = pool.map(partial(_scan_entry, photo_path=photo_path, cutoff=cutoff),
+                                   list(entries))
+            candidates = [file for files in scanned for file in files
+                          if file[0] not in referenced
+                          and not _kept_for_shard(file[0], referenced)]
+            # Rows committed during the scan
+            db.session.rollback()
+            referenced = _referenced_names(column)
+            candidates = [file for file in candidates if file[0] not in referenced
+                          and not _kept_for_shard(file[0], referenced)]
+            if dry_run:
+                reclaimed = candidates
+            else:
+                removed = pool.map(partial(_collect_file, photo_path, cutoff=cutoff,
+                                           quarantine=quarantine),
+                                   [name for name, _size in candidates])
+                reclaimed = [file for file, done in zip(candidates, removed) if done]
+                _drop_stale_counts(photo_path, [name for name, _size in reclaimed])
+            click.echo(f"{folder}: {len(reclaimed)} unreferenced files, "
+                       f"{sum(size for _name, size in reclaimed)} bytes reclaimed")
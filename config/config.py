@@ -1,6 +1,7 @@
 import datetime
 import os
 import sys
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -18,6 +19,15 @@ def _get_db_connection_str():
         sys.exit(1)
     return 'sqlite:///' + os.path.join(_basedir, 'data', db_name)
 
+
+def _get_cached_response_hosts():
+    """Host headers whose responses may be cached, SERVER_NAME or the public hosts by default"""
+    default = os.environ.get('SERVER_NAME') or \
+        ('localhost:8080' if _debug else 'www.dorechi.store,dorechi.store')
+    hosts = os.environ.get('CACHED_RESPONSE_HOSTS') or default
+    return [host.strip() for host in hosts.split(',') if host.strip()]
+
+
 def _init_google_flow():
     redirect_uri = 'http://0.0.0.0:8000' if _debug else 'https://www.dorechi.store'
 
@@ -51,6 +61,21 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES =  datetime.timedelta(seconds=int(
         os.environ.get('JWT_ACCESS_TOKEN_EXPIRES', '3600')))
     GOOGLE_FLOW = _init_google_flow()
+    SYSTEM_METRICS_INTERVAL = float(os.environ.get('SYSTEM_METRICS_INTERVAL', '5'))
+    JWT_REVOCATION_STORE = os.environ.get('JWT_REVOCATION_STORE', 'database')
+    JWT_REVOCATION_NEGATIVE_TTL = float(os.environ.get('JWT_REVOCATION_NEGATIVE_TTL', '5'))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '8'))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10'))
+    IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', '2'))
+    CACHED_RESPONSE_HOSTS = _get_cached_response_hosts()
+    # Response, identity and revocation entries must be shared by all gunicorn
+    # workers, or an invalidation only reaches the worker that made the change.
+    # Use e.g. RedisCache when workers run on several machines.
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'FileSystemCache')
+    CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'tc_cache'))
+    CACHE_THRESHOLD = int(os.environ.get('CACHE_THRESHOLD', '10000'))
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
 
 
 class TestConfig:
@@ -62,3 +87,11 @@ class TestConfig:
     MEDIA_PATH = None
     JWT_ACCESS_TOKEN_EXPIRES =  datetime.timedelta(seconds=3600)
     GOOGLE_FLOW = None
+    JWT_REVOCATION_STORE = 'database'
+    JWT_REVOCATION_NEGATIVE_TTL = 5
+    PASSWORD_HASH_WORKERS = 0
+    PASSWORD_HASH_MAX_PENDING = 8
+    PASSWORD_HASH_TIMEOUT = 10
+    IMAGE_VARIANT_WORKERS = 0
+    CACHED_RESPONSE_HOSTS = ['localhost']
+    CACHE_TYPE = 'SimpleCache'
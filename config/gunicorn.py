@@ -1,2 +1,30 @@
+import os
+import shutil
+import tempfile
+
 bind = "0.0.0.0:8080"
 workers = 1
+# Requests waiting on the password hashing pool must not block the others
+threads = 4
+
+# Set before the app imports prometheus_client, so every worker writes its
+# metrics to files in this directory and /healthcheck aggregates them.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus_multiproc"))
+# Shared by the workers as the FileSystemCache directory, see Config.CACHE_DIR
+cache_dir = os.environ.setdefault(
+    "CACHE_DIR", os.path.join(tempfile.gettempdir(), "tc_cache"))
+
+
+def on_starting(server):
+    """Drops metric files and cached responses left over from a previous master"""
+    shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(prometheus_multiproc_dir)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def child_exit(server, worker):
+    """Removes live gauges of an exited worker"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
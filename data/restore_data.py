@@ -20,7 +20,8 @@ security_data_to_transfer = cursor_old.fetchall()
 cursor_old.execute('SELECT * FROM delivery_user_info')
 delivery_info_data_to_transfer = cursor_old.fetchall()
 
-cursor_old.execute('SELECT * FROM shops')
+cursor_old.execute('SELECT id, owner_id, name, description, photo_shop, banner_shop,'
+                   ' phone_number, link FROM shops ORDER BY id')
 shops_data_to_transfer = cursor_old.fetchall()
 
 conn_old.close()
@@ -39,9 +40,17 @@ for row in delivery_info_data_to_transfer:
     cursor_new.execute('INSERT INTO delivery_user_info (id, owner_id, post, city,'
     'branch_name, address) VALUES (?, ?, ?, ?, ?, ?)', row)
 
+# name_normalized is case-folded like Shop.name, names that already collide
+# get an id suffix as in the shops name normalized migration
+seen_shop_names = set()
 for row in shops_data_to_transfer:
-    cursor_new.execute('INSERT INTO shops (id, owner_id, name, description,'
-    'photo_shop,banner_shop, phone_number, link) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', row)
+    name_normalized = row[2].casefold()
+    if name_normalized in seen_shop_names:
+        name_normalized = f"{name_normalized}#{row[0]}"
+    seen_shop_names.add(name_normalized)
+    cursor_new.execute('INSERT INTO shops (id, owner_id, name, name_normalized, description,'
+    'photo_shop,banner_shop, phone_number, link) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                       row[:3] + (name_normalized,) + row[3:])
 
 conn_new.commit()
 conn_new.close()
@@ -7,10 +7,17 @@ from flask_jwt_extended import JWTManager
 from flask_caching import Cache
 from prometheus_client import CollectorRegistry
 
+from utils.hashing import PasswordHasher
+from utils.images import ImagePipeline
+from utils.metrics import RequestMetrics
+
 
 db = SQLAlchemy()
 migrate = Migrate()
 ma = Marshmallow()
 jwt = JWTManager()
-cache = Cache(config={'CACHE_TYPE': 'SimpleCache'})
-registry = CollectorRegistry()
\ No newline at end of file
+cache = Cache()
+registry = CollectorRegistry()
+request_metrics = RequestMetrics(registry)
+password_hasher = PasswordHasher(registry)
+image_pipeline = ImagePipeline()
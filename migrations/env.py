@@ -7,6 +7,8 @@ from flask import current_app
 
 from alembic import context
 
+from models.products import PRODUCT_SEARCH_TABLE
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -53,6 +55,14 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_name(name, type_, parent_names):
+    # The FTS5 search table and its shadow tables are created by migrations,
+    # they are not part of the metadata and must not be dropped by autogenerate
+    if type_ == 'table':
+        return not name.startswith(PRODUCT_SEARCH_TABLE)
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -67,7 +77,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_name=include_name
     )
 
     with context.begin_transaction():
@@ -98,6 +109,7 @@ def run_migrations_online():
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
+            include_name=include_name,
             process_revision_directives=process_revision_directives,
             **current_app.extensions['migrate'].configure_args
         )
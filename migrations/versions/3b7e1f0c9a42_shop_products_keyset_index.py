@@ -0,0 +1,26 @@
+"""shop products keyset index
+
+Revision ID: 3b7e1f0c9a42
+Revises: 688129d2d02c
+Create Date: 2026-10-18 10:12:41.204913
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7e1f0c9a42'
+down_revision = '688129d2d02c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index('ix_products_shop_id_time_added_id',
+                              ['shop_id', 'time_added', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_shop_id_time_added_id')
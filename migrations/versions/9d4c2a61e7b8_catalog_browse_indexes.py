@@ -0,0 +1,42 @@
+"""catalog browse indexes
+
+Revision ID: 9d4c2a61e7b8
+Revises: 3b7e1f0c9a42
+Create Date: 2026-10-18 11:03:17.528301
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4c2a61e7b8'
+down_revision = '3b7e1f0c9a42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index('ix_products_is_active_time_added_id',
+                              ['is_active', 'time_added', 'id'], unique=False)
+        batch_op.create_index('ix_products_is_active_category_id_time_added_id',
+                              ['is_active', 'category_id', 'time_added', 'id'], unique=False)
+        batch_op.create_index('ix_products_is_active_sub_category_name_time_added_id',
+                              ['is_active', 'sub_category_name', 'time_added', 'id'], unique=False)
+
+    with op.batch_alter_table('product_details', schema=None) as batch_op:
+        batch_op.create_index('ix_product_details_product_id_price',
+                              ['product_id', 'price'], unique=False)
+        batch_op.create_index('ix_product_details_price_product_id',
+                              ['price', 'product_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product_details', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_details_price_product_id')
+        batch_op.drop_index('ix_product_details_product_id_price')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_is_active_sub_category_name_time_added_id')
+        batch_op.drop_index('ix_products_is_active_category_id_time_added_id')
+        batch_op.drop_index('ix_products_is_active_time_added_id')
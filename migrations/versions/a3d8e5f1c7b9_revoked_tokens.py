@@ -0,0 +1,33 @@
+"""revoked tokens
+
+Revision ID: a3d8e5f1c7b9
+Revises: f7a9c1e3b5d2
+Create Date: 2026-10-18 16:12:40.318552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d8e5f1c7b9'
+down_revision = 'f7a9c1e3b5d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('revoked_tokens',
+                    sa.Column('jti', sa.String(), nullable=False),
+                    sa.Column('expires_at', sa.Integer(), nullable=False),
+                    sa.PrimaryKeyConstraint('jti')
+                    )
+    with op.batch_alter_table('revoked_tokens', schema=None) as batch_op:
+        batch_op.create_index('ix_revoked_tokens_expires_at', ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('revoked_tokens', schema=None) as batch_op:
+        batch_op.drop_index('ix_revoked_tokens_expires_at')
+
+    op.drop_table('revoked_tokens')
@@ -0,0 +1,42 @@
+"""media files
+
+Revision ID: b6c2e9d4a1f7
+Revises: a3d8e5f1c7b9
+Create Date: 2026-10-18 17:05:21.540917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6c2e9d4a1f7'
+down_revision = 'a3d8e5f1c7b9'
+branch_labels = None
+depends_on = None
+
+# media folder -> (table, column) holding stored image names
+MEDIA_REFERENCES = {
+    'products': ('product_photos', 'product_photo'),
+    'shops': ('shops', 'photo_shop'),
+    'banner_shops': ('shops', 'banner_shop'),
+    'profile': ('users', 'profile_picture'),
+}
+
+
+def upgrade():
+    op.create_table('media_files',
+                    sa.Column('path', sa.String(), nullable=False),
+                    sa.Column('ref_count', sa.Integer(), nullable=False),
+                    sa.PrimaryKeyConstraint('path')
+                    )
+    # Existing uuid-named files start with the number of rows referencing them
+    for folder, (table, column) in MEDIA_REFERENCES.items():
+        op.execute(
+            f"INSERT INTO media_files (path, ref_count) "
+            f"SELECT '{folder}/' || {column}, COUNT(*) FROM {table} "
+            f"WHERE {column} IS NOT NULL GROUP BY {column}")
+
+
+def downgrade():
+    op.drop_table('media_files')
@@ -0,0 +1,51 @@
+"""products full text search
+
+Revision ID: c5a81d3f20e4
+Revises: 9d4c2a61e7b8
+Create Date: 2026-10-18 12:26:05.913847
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a81d3f20e4'
+down_revision = '9d4c2a61e7b8'
+branch_labels = None
+depends_on = None
+
+# Copy of utils.utils._SEARCH_TEXT_FOLDING as of this revision, so the
+# revision keeps indexing the same way whatever the helper becomes
+_SEARCH_TEXT_FOLDING = str.maketrans({
+    "'": None, "ʼ": None, "’": None, "‘": None, "`": None,
+    "ґ": "г", "є": "е", "і": "и", "ї": "и",
+})
+
+
+def _normalize_search_text(value):
+    if not value:
+        return ''
+    return value.casefold().translate(_SEARCH_TEXT_FOLDING)
+
+
+def upgrade():
+    op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS products_fts "
+               "USING fts5(product_name, product_description, "
+               "tokenize='unicode61 remove_diacritics 2')")
+
+    connection = op.get_bind()
+    products = connection.execute(
+        sa.text("SELECT id, product_name, product_description FROM products")).fetchall()
+    if products:
+        connection.execute(
+            sa.text("INSERT INTO products_fts(rowid, product_name, product_description) "
+                    "VALUES (:id, :product_name, :product_description)"),
+            [{"id": product_id,
+              "product_name": _normalize_search_text(product_name),
+              "product_description": _normalize_search_text(product_description)}
+             for product_id, product_name, product_description in products])
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS products_fts")
@@ -0,0 +1,51 @@
+"""foreign key lookup indexes
+
+Revision ID: e2f4b6a8c013
+Revises: c5a81d3f20e4
+Create Date: 2026-10-18 14:41:52.077164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f4b6a8c013'
+down_revision = 'c5a81d3f20e4'
+branch_labels = None
+depends_on = None
+
+
+# products.shop_id and product_details.product_id are the leading columns of
+# ix_products_shop_id_time_added_id and ix_product_details_product_id_price.
+def upgrade():
+    with op.batch_alter_table('product_photos', schema=None) as batch_op:
+        batch_op.create_index('ix_product_photos_product_detail_id',
+                              ['product_detail_id'], unique=False)
+        batch_op.create_index('ix_product_photos_product_detail_id_main',
+                              ['product_detail_id'], unique=False,
+                              sqlite_where=sa.text('main = 1'))
+
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.create_index('ix_shops_owner_id', ['owner_id'], unique=False)
+
+    with op.batch_alter_table('delivery_user_info', schema=None) as batch_op:
+        batch_op.create_index('ix_delivery_user_info_owner_id', ['owner_id'], unique=False)
+
+    with op.batch_alter_table('product_comment', schema=None) as batch_op:
+        batch_op.create_index('ix_product_comment_product_id', ['product_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product_comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_comment_product_id')
+
+    with op.batch_alter_table('delivery_user_info', schema=None) as batch_op:
+        batch_op.drop_index('ix_delivery_user_info_owner_id')
+
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.drop_index('ix_shops_owner_id')
+
+    with op.batch_alter_table('product_photos', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_photos_product_detail_id_main')
+        batch_op.drop_index('ix_product_photos_product_detail_id')
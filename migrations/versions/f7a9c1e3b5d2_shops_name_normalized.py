@@ -0,0 +1,48 @@
+"""shops name normalized
+
+Revision ID: f7a9c1e3b5d2
+Revises: e2f4b6a8c013
+Create Date: 2026-10-18 15:37:09.664218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7a9c1e3b5d2'
+down_revision = 'e2f4b6a8c013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('name_normalized', sa.String(), nullable=True))
+
+    # SQLite lower() folds ASCII only, so names are case-folded in Python.
+    # Shops whose names already collide keep them, the later ones get an
+    # id suffix in name_normalized so the unique index can be built.
+    connection = op.get_bind()
+    shops = connection.execute(sa.text("SELECT id, name FROM shops ORDER BY id")).fetchall()
+    seen = set()
+    rows = []
+    for shop_id, name in shops:
+        name_normalized = name.casefold()
+        if name_normalized in seen:
+            name_normalized = f"{name_normalized}#{shop_id}"
+        seen.add(name_normalized)
+        rows.append({"id": shop_id, "name_normalized": name_normalized})
+    if rows:
+        connection.execute(
+            sa.text("UPDATE shops SET name_normalized = :name_normalized WHERE id = :id"), rows)
+
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.alter_column('name_normalized', existing_type=sa.String(), nullable=False)
+        batch_op.create_index('ix_shops_name_normalized', ['name_normalized'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.drop_index('ix_shops_name_normalized')
+        batch_op.drop_column('name_normalized')
@@ -6,24 +6,29 @@
 # 8. Пошукати код який повторюється і винести  в окрему функцію у файл helpers або utils
 
 import os
+import time
+from collections import namedtuple
 from datetime import datetime
 
-from flask import url_for
+from flask import g, has_app_context, url_for
 from flask_jwt_extended import (create_access_token, create_refresh_token,
                                 get_jwt_identity)
 from itsdangerous import BadSignature, SignatureExpired
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, select
 from sqlalchemy.orm import mapped_column, relationship
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from config import Config
-from dependencies import db
+from dependencies import cache, db, password_hasher
 from models.errors import NotFoundError, UserError
-from models.shops import Shop
-from utils.utils import load_and_save_image, serialize_pydantic_response_error
+from models.shops import IDENTITY_CACHE_KEY, IDENTITY_CACHE_TIMEOUT, Shop
+from models.media import MediaFile
+from models.views import View
+from utils.utils import load_and_save_image
 
 PROFILE_PHOTOS_PATH = os.path.join(Config.MEDIA_PATH, 'profile')
 
+Identity = namedtuple("Identity", ["user_id", "shop_id"])
+
 
 class User(db.Model):
     __tablename__ = "users"
@@ -47,7 +52,9 @@ class User(db.Model):
 
     @classmethod
     def get_user_by_id(cls, user_id):
-        return User.query.filter_by(id=user_id).first()
+        if get_identity(user_id) is None:
+            return None
+        return db.session.get(cls, user_id)
 
     @classmethod
     def create_user(cls, email: str, full_name: str, password: str):
@@ -63,7 +70,7 @@ class User(db.Model):
     def sign_in(cls, email: str, password: str):
         user = cls.query.filter_by(email=email).first()
         if user:
-            if user is None or not check_password_hash(
+            if user is None or not password_hasher.check(
                     Security.query.filter_by(user_id=user.id).first().password_hash, password):
                 raise UserError("Incorrect password")
 
@@ -107,24 +114,22 @@ class User(db.Model):
 
     # TODO: rename: get_user_info+++
     @classmethod
-    def get_user_info(cls, user_id: int):
-        user = cls.get_user_by_id(user_id)
-        if user is not None:
-            delivery_info = DeliveryUserInfo.get_delivery_info_by_owner_id(user.id)
-            user_full_data = serialize_pydantic_response_error(user)
-            delivery_info_data = serialize_pydantic_response_error(delivery_info)
-            if user_full_data["profile_picture"] is not None:
-                profile_picture_path = url_for('static',
-                                               filename=f'media/profile/'
-                                                        f'{user_full_data["profile_picture"]}',
-                                               _external=True)
-                user_full_data['profile_picture'] = profile_picture_path
-            user_full_info = {**user_full_data, **delivery_info_data}
-            shop = Shop.query.filter_by(owner_id=user.id).first()
-            if shop or shop is not None:
-                user_full_info['shop_id'] = shop.id
-                user_full_info['have_a_shop'] = True
-            return user_full_info
+    def get_user_info(cls, user_id: int) -> dict:
+        """User, delivery and shop fields of the account page, read in one query"""
+        identity = get_identity(user_id)
+        if identity is not None:
+            row = db.session.execute(
+                select(*UserView.columns, *DeliveryView.columns)
+                .outerjoin(DeliveryUserInfo, DeliveryUserInfo.owner_id == cls.id)
+                .where(cls.id == user_id)
+                .limit(1)
+            ).first()
+            if row is not None:
+                user_columns = len(UserView.columns)
+                return {**UserView(*row[:user_columns]).to_dict(),
+                        **DeliveryView(*row[user_columns:]).to_dict(),
+                        'shop_id': identity.shop_id,
+                        'have_a_shop': identity.shop_id is not None}
         raise NotFoundError('User not found')
 
     # TODO: combine with change_profile_photo (make 1 function)++++++
@@ -147,9 +152,7 @@ class User(db.Model):
 
             if action == 'delete':
                 if user.profile_picture:
-                    file_path = os.path.join(PROFILE_PHOTOS_PATH, user.profile_picture)
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
+                    MediaFile.release(PROFILE_PHOTOS_PATH, user.profile_picture)
                     user.profile_picture = None
                     db.session.commit()
                     return {'message': 'Profile photo deleted successfully'}
@@ -190,6 +193,47 @@ class User(db.Model):
             raise exc from exc
 
 
+def get_identity(user_id) -> Identity | None:
+    """
+        Returns ids of an existing user and of the shop they own.
+
+        Resolved once per request. Owners of a shop are cached across requests
+        for IDENTITY_CACHE_TIMEOUT seconds in the cache shared by all workers,
+        models.shops.invalidate_identity drops the entry for every worker when
+        the shop changes. A missing shop is never cached beyond the request,
+        so a shop created by another worker is seen at once.
+        The user row loaded on a miss is kept for User.get_user_by_id.
+    """
+    identities = g.setdefault('identities', {}) if has_app_context() else {}
+    identity = identities.get(user_id)
+    if identity is None:
+        key = IDENTITY_CACHE_KEY.format(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            row = db.session.query(User, Shop.id) \
+                .outerjoin(Shop, Shop.owner_id == User.id) \
+                .filter(User.id == user_id) \
+                .first()
+            if row is None:
+                return None
+            user, shop_id = row
+            if has_app_context():
+                g.setdefault('identity_users', {})[user_id] = user
+            cached = (user.id, shop_id)
+            if shop_id is not None:
+                cache.set(key, cached, timeout=IDENTITY_CACHE_TIMEOUT)
+        identity = identities[user_id] = Identity(*cached)
+    return identity
+
+
+def get_current_shop(user_id) -> Shop | None:
+    """Returns the shop owned by the user, loaded at most once per request"""
+    identity = get_identity(user_id)
+    if identity is None or identity.shop_id is None:
+        return None
+    return db.session.get(Shop, identity.shop_id)
+
+
 class Security(db.Model):
     __tablename__ = "security"
 
@@ -209,7 +253,7 @@ class Security(db.Model):
 
     @classmethod
     def create_security(cls, user_id, password):
-        security = cls(user_id=user_id, password=generate_password_hash(password))
+        security = cls(user_id=user_id, password=password_hasher.generate(password))
         db.session.add(security)
         db.session.commit()
         return security
@@ -218,8 +262,8 @@ class Security(db.Model):
     def change_password(user_id, current_password, new_password):
         security = Security.query.filter_by(user_id=user_id).first()
         if security:
-            if check_password_hash(security.password_hash, current_password):
-                hashed_password = generate_password_hash(new_password)
+            if password_hasher.check(security.password_hash, current_password):
+                hashed_password = password_hasher.generate(new_password)
                 security.password_hash = hashed_password
                 db.session.commit()
                 return {'message': 'Password updated successfully'}
@@ -229,6 +273,9 @@ class Security(db.Model):
 
 class DeliveryUserInfo(db.Model):
     __tablename__ = "delivery_user_info"
+    __table_args__ = (
+        Index('ix_delivery_user_info_owner_id', 'owner_id'),
+    )
 
     id = mapped_column(Integer, primary_key=True)
     owner_id = mapped_column(Integer, ForeignKey("users.id"))
@@ -292,3 +339,55 @@ class DeliveryUserInfo(db.Model):
                 return {'message': 'Delivery address removed successfully'}
             raise NotFoundError('Delivery address not found')
         raise NotFoundError('User not found')
+
+
+class UserView(View):
+    __slots__ = ('id', 'full_name', 'email', 'joined_at', 'is_active', 'profile_picture',
+                 'phone_number')
+    model = User
+    id: int
+    full_name: str | None
+    email: str
+    joined_at: datetime
+    is_active: bool
+    profile_picture: str | None
+    phone_number: str | None
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        if self.profile_picture is not None:
+            data['profile_picture'] = url_for('static',
+                                              filename=f'media/profile/{self.profile_picture}',
+                                              _external=True)
+        return data
+
+
+class DeliveryView(View):
+    __slots__ = ('post', 'city', 'branch_name', 'address')
+    model = DeliveryUserInfo
+    post: str | None
+    city: str | None
+    branch_name: str | None
+    address: str | None
+
+
+class RevokedToken(db.Model):
+    """JWT revoked by logout or refresh, kept until the token's own expiry"""
+    __tablename__ = "revoked_tokens"
+    __table_args__ = (
+        Index('ix_revoked_tokens_expires_at', 'expires_at'),
+    )
+
+    jti = mapped_column(String, primary_key=True)
+    expires_at = mapped_column(Integer, nullable=False)
+
+    @classmethod
+    def get_expires_at(cls, jti: str):
+        """Returns expiry of the revoked token or None if it isn't revoked"""
+        return db.session.query(cls.expires_at).filter_by(jti=jti).scalar()
+
+    @classmethod
+    def revoke(cls, jti: str, expires_at: int):
+        cls.query.filter(cls.expires_at < int(time.time())).delete()
+        db.session.merge(cls(jti=jti, expires_at=expires_at))
+        db.session.commit()
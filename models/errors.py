@@ -25,6 +25,10 @@ class NoImageError(Exception):
     pass
 
 
+class ServiceBusyError(Exception):
+    pass
+
+
 def serialize_validation_error(e: ValidationError) -> dict:
     error_messages = []
     for error in e.errors():
@@ -0,0 +1,80 @@
+import os
+
+from sqlalchemy import Integer, String, delete, event, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, mapped_column
+
+from dependencies import db
+from utils.images import remove_image
+
+MEDIA_UNLINK_KEY = 'media_unlink'
+
+
+def media_key(photo_path: str, filename: str) -> str:
+    """Key of a media file: its media folder and file name, e.g. products/<sha256>.png"""
+    return f"{os.path.basename(photo_path)}/{filename}"
+
+
+class MediaFile(db.Model):
+    """
+        Reference count of a content-addressed media file.
+
+        Every model field holding a stored image name (ProductPhoto.product_photo,
+        Shop.photo_shop, Shop.banner_shop, User.profile_picture) holds one
+        reference. Counts change in the same transaction as the fields, the
+        file is removed after the commit that drops its last reference.
+    """
+    __tablename__ = "media_files"
+
+    path = mapped_column(String, primary_key=True)
+    ref_count = mapped_column(Integer, nullable=False)
+
+    @classmethod
+    def acquire(cls, photo_path: str, filename: str) -> int:
+        """Adds a reference to the file and returns its new reference count"""
+        return db.session.execute(
+            insert(cls)
+            .values(path=media_key(photo_path, filename), ref_count=1)
+            .on_conflict_do_update(index_elements=[cls.path],
+                                   set_={'ref_count': cls.ref_count + 1})
+            .returning(cls.ref_count)).scalar()
+
+    @classmethod
+    def release(cls, photo_path: str, filename: str):
+        key = media_key(photo_path, filename)
+        db.session.execute(update(cls).where(cls.path == key)
+                           .values(ref_count=cls.ref_count - 1))
+        remaining = db.session.execute(select(cls.ref_count).where(cls.path == key)).scalar()
+        if remaining is None or remaining <= 0:
+            db.session.execute(delete(cls).where(cls.path == key))
+            db.session.info.setdefault(MEDIA_UNLINK_KEY, {})[key] = \
+                os.path.join(photo_path, filename)
+
+    @classmethod
+    def get_ref_count(cls, photo_path: str, filename: str) -> int:
+        return db.session.execute(
+            select(cls.ref_count).where(cls.path == media_key(photo_path, filename))
+        ).scalar() or 0
+
+
+@event.listens_for(Session, 'after_commit')
+def _unlink_released_media(session):
+    released = session.info.pop(MEDIA_UNLINK_KEY, None)
+    if not released:
+        return
+    # Files are removed inside a write transaction, so they are never removed between
+    # the acquire() of an upload of the same content and its commit. The DELETE takes
+    # the database write lock, then files acquired again since the release are kept.
+    with session.get_bind().begin() as connection:
+        connection.execute(delete(MediaFile).where(MediaFile.path.in_(list(released)),
+                                                   MediaFile.ref_count <= 0))
+        acquired = set(connection.execute(
+            select(MediaFile.path).where(MediaFile.path.in_(list(released)))).scalars())
+        for key, path in released.items():
+            if key not in acquired:
+                remove_image(path)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _keep_released_media(session):
+    session.info.pop(MEDIA_UNLINK_KEY, None)
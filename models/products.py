@@ -1,25 +1,60 @@
 import os
+import re
+from collections import namedtuple
 from datetime import datetime
-
-from sqlalchemy import (Boolean, DateTime, Float, ForeignKey, Integer, String,
-                        Text)
-from sqlalchemy.orm import mapped_column, relationship
+from typing import Any, Callable
+
+from sqlalchemy import (DDL, Boolean, DateTime, Float, ForeignKey, Index,
+                        Integer, String, Text, and_, delete, event, func, insert, inspect,
+                        literal, literal_column, or_, select, text, update)
+from sqlalchemy.orm import mapped_column, relationship, selectinload
+from sqlalchemy.sql import column, table
+from sqlalchemy.sql.expression import UnaryExpression
+from sqlalchemy.sql.operators import custom_op
 from werkzeug.datastructures import FileStorage
 
 from config import Config
-from dependencies import db
-from models.accounts import User
+from dependencies import cache, db
+from models.accounts import get_identity
 from models.errors import NotFoundError, UserError, ProductPhotoLimitError, BadFileTypeError
-from models.shops import Shop
-from utils.utils import product_info_serialize, product_info_serialize_by_id, load_and_save_image
-from validation.products import get_subcategory_name
-from validation.shops import ShopWithProductsSchema
+from models.media import MediaFile
+from models.shops import Shop, invalidate_shop_products
+from utils.utils import (decode_cursor, encode_cursor, load_and_save_image,
+                         normalize_search_text, product_info_serialize,
+                         product_info_serialize_by_id)
+from validation.products import (CatalogSortEnum, PaginatedProductSchema,
+                                 ProductInfoSchema, category_index,
+                                 get_subcategory_name)
+from validation.shops import ShopSchema
 
 PRODUCT_PHOTOS_PATH = os.path.join(Config.MEDIA_PATH, 'products')
+SHOP_PRODUCTS_PAGE_SIZE = 30
+SHOP_PRODUCTS_MAX_PAGE_SIZE = 100
+CATALOG_MAX_PAGE_SIZE = 100
+PRODUCT_INFO_CACHE_KEY = 'product_info:{}'
+PRODUCT_INFO_CACHE_TIMEOUT = 3600
+PRODUCT_SEARCH_TABLE = 'products_fts'
+# BM25 weights of product_name and product_description
+PRODUCT_SEARCH_WEIGHTS = (10.0, 1.0)
+MAX_PRODUCT_PHOTOS = 4
+# Fields update_product never changes
+PRODUCT_FIXED_FIELDS = {'id', 'shop_id', 'category_id', 'sub_category_name', 'time_added'}
+
+# detail_id is None for a product without details, num_photos counts its photos
+ProductOwnership = namedtuple("ProductOwnership",
+                              ["product_id", "detail_id", "shop_id", "owner_id", "num_photos"])
 
 
 class Product(db.Model):
     __tablename__ = "products"
+    __table_args__ = (
+        Index('ix_products_shop_id_time_added_id', 'shop_id', 'time_added', 'id'),
+        Index('ix_products_is_active_time_added_id', 'is_active', 'time_added', 'id'),
+        Index('ix_products_is_active_category_id_time_added_id',
+              'is_active', 'category_id', 'time_added', 'id'),
+        Index('ix_products_is_active_sub_category_name_time_added_id',
+              'is_active', 'sub_category_name', 'time_added', 'id'),
+    )
 
     id = mapped_column(Integer, primary_key=True)
     category_id = mapped_column(Integer, ForeignKey('categories.id'))
@@ -54,18 +89,18 @@ class Product(db.Model):
     # TODO: jsonify should be called in route+++++++++
     @classmethod
     def add_product(cls, user_id: int, **kwargs):
-        user = User.get_user_by_id(user_id)
-        if user is not None:
+        identity = get_identity(user_id)
+        if identity is not None:
             kwargs['sub_category_name'] = get_subcategory_name(kwargs.get('category_id'),
                                                                kwargs.get('sub_category_id'))
 
-            shop = Shop.get_shop_by_owner_id(user.id)
-            if shop is not None:
-                product = cls(shop_id=shop.id, **kwargs)
+            if identity.shop_id is not None:
+                product = cls(shop_id=identity.shop_id, **kwargs)
                 db.session.add(product)
                 db.session.flush()
                 ProductDetail.add_product_detail(
                     product_id=product.id, **kwargs)
+                invalidate_shop_products(identity.shop_id)
                 return product.id
             raise NotFoundError('Shop not found')
         raise UserError('User not found')
@@ -74,14 +109,15 @@ class Product(db.Model):
     # TODO: jsonify should be called in route++++++
     @staticmethod
     def delete_product(user_id: int, product_id: int):
-        user = User.get_user_by_id(user_id)
-        if user is not None:
-            shop = Shop.get_shop_by_owner_id(user.id)
-            if shop is not None:
-                product = Product.get_product_by_id(product_id)
-                if product is not None and product.shop_id == shop.id:
-                    product.is_active = False
+        identity = get_identity(user_id)
+        if identity is not None:
+            if identity.shop_id is not None:
+                ownership = get_product_ownership(product_id)
+                if ownership is not None and ownership.shop_id == identity.shop_id:
+                    db.session.execute(update(Product).where(Product.id == product_id)
+                                       .values(is_active=False))
                     db.session.commit()
+                    invalidate_product_caches(product_id, identity.shop_id)
                     return {"message": "Ok"}
                 raise UserError('Product not found or permission not granted')
             raise NotFoundError('Shop not found')
@@ -94,20 +130,30 @@ class Product(db.Model):
     # TODO: return success or error message. Remove all flask imports in this file++++
     # TODO: jsonify should be called in route++++
     @staticmethod
-    def update_product(user_id: int, **kwargs):
-        user = User.get_user_by_id(user_id)
-        if user is not None:
-            product = Product.query.get(kwargs.get('product_id'))
-            shop = Shop.get_shop_by_owner_id(user.id)
-            if shop is not None and product is not None:
-                if product and product.shop_id == shop.id:
-                    kwargs.pop("category_id", None)
-                    kwargs.pop("sub_category_id", None)
-                    kwargs.pop("sub_category_name", None)
-                    for key, value in kwargs.items():
-                        setattr(product, key, value)
-                    product.time_modified = datetime.now()
-                    ProductDetail.update_product_detail(**kwargs)
+    def update_product(user_id: int, product_id: int, **kwargs):
+        identity = get_identity(user_id)
+        if identity is not None:
+            ownership = get_product_ownership(product_id)
+            if identity.shop_id is not None and ownership is not None:
+                if ownership.shop_id == identity.shop_id:
+                    if ownership.detail_id is None:
+                        raise NotFoundError("Product detail not found")
+                    product_values = {key: value for key, value in kwargs.items()
+                                      if key in Product.__table__.columns
+                                      and key not in PRODUCT_FIXED_FIELDS}
+                    detail_values = {key: value for key, value in kwargs.items()
+                                     if key in ProductDetail.__table__.columns
+                                     and key not in ('id', 'product_id')}
+                    db.session.execute(update(Product)
+                                       .where(Product.id == ownership.product_id)
+                                       .values(time_modifeid=datetime.now(), **product_values))
+                    if detail_values:
+                        db.session.execute(update(ProductDetail)
+                                           .where(ProductDetail.id == ownership.detail_id)
+                                           .values(**detail_values))
+                    _reindex_product_text(ownership.product_id, product_values)
+                    db.session.commit()
+                    invalidate_product_caches(ownership.product_id, identity.shop_id)
                     return {"message": "Product updated successfully"}
                 raise UserError('Product not found or not belong to shop')
 
@@ -116,8 +162,82 @@ class Product(db.Model):
         raise NotFoundError('User not found')
 
 
+def get_product_ownership(product_id: int) -> ProductOwnership | None:
+    """
+    Resolves product -> detail -> shop -> owner and the photo count in one indexed join.
+
+    Mutations check the caller against this record instead of loading the user,
+    shop, product and detail entities one by one.
+    """
+    num_photos = select(func.count(ProductPhoto.id)) \
+        .where(ProductPhoto.product_detail_id == ProductDetail.id) \
+        .scalar_subquery()
+    row = db.session.execute(
+        select(Product.id, ProductDetail.id, Product.shop_id, Shop.owner_id, num_photos)
+        .join(Shop, Shop.id == Product.shop_id)
+        .outerjoin(ProductDetail, ProductDetail.product_id == Product.id)
+        .where(Product.id == product_id)
+        .limit(1)
+    ).first()
+    return ProductOwnership(*row) if row is not None else None
+
+
+# FTS5 index over the folded product_name and product_description, rowid is products.id
+products_fts = table(PRODUCT_SEARCH_TABLE,
+                     column('rowid'), column('product_name'), column('product_description'))
+
+event.listen(Product.__table__, 'after_create', DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {PRODUCT_SEARCH_TABLE} "
+    "USING fts5(product_name, product_description, tokenize='unicode61 remove_diacritics 2')"
+).execute_if(dialect='sqlite'))
+event.listen(Product.__table__, 'before_drop', DDL(
+    f"DROP TABLE IF EXISTS {PRODUCT_SEARCH_TABLE}"
+).execute_if(dialect='sqlite'))
+
+
+def _index_product(connection, product: Product):
+    connection.execute(products_fts.delete().where(products_fts.c.rowid == product.id))
+    connection.execute(products_fts.insert().values(
+        rowid=product.id,
+        product_name=normalize_search_text(product.product_name),
+        product_description=normalize_search_text(product.product_description)))
+
+
+def _reindex_product_text(product_id: int, values: dict):
+    """Updates the search index for product_name/product_description written without the ORM"""
+    text_values = {key: normalize_search_text(values[key])
+                   for key in ('product_name', 'product_description') if key in values}
+    if text_values:
+        db.session.execute(products_fts.update()
+                           .where(products_fts.c.rowid == product_id)
+                           .values(**text_values))
+
+
+@event.listens_for(Product, 'after_insert')
+def _index_inserted_product(_mapper, connection, target):
+    _index_product(connection, target)
+
+
+@event.listens_for(Product, 'after_update')
+def _index_updated_product(_mapper, connection, target):
+    attrs = inspect(target).attrs
+    if attrs.product_name.history.has_changes() or \
+            attrs.product_description.history.has_changes():
+        _index_product(connection, target)
+
+
+@event.listens_for(Product, 'after_delete')
+def _unindex_deleted_product(_mapper, connection, target):
+    connection.execute(products_fts.delete().where(products_fts.c.rowid == target.id))
+
+
 class ProductPhoto(db.Model):
     __tablename__ = "product_photos"
+    __table_args__ = (
+        Index('ix_product_photos_product_detail_id', 'product_detail_id'),
+        Index('ix_product_photos_product_detail_id_main', 'product_detail_id',
+              sqlite_where=text('main = 1')),
+    )
 
     id = mapped_column(Integer, primary_key=True)
     product_detail_id = mapped_column(
@@ -140,37 +260,47 @@ class ProductPhoto(db.Model):
 
     @classmethod
     def add_product_photo(cls, user_id: int, product_id: int, photo: FileStorage, main: bool):
-        user = User.get_user_by_id(user_id)
-        if user is None:
+        identity = get_identity(user_id)
+        if identity is None:
             raise NotFoundError('User not found')
 
-        product = Product.get_product_by_id(product_id)  # noqa
-        if product is None:
+        ownership = get_product_ownership(product_id)
+        if ownership is None or ownership.detail_id is None:
             raise NotFoundError("Product not found")
+        if ownership.shop_id != identity.shop_id:
+            raise UserError('Product not found or permission not granted')
 
-        product_detail = ProductDetail.get_product_detail_by_product_id(product.id)  # noqa
-        if product_detail is None:
-            raise NotFoundError('Product not found')
-
-        num_photos = ProductPhoto.get_num_photos_by_product_detail_id(product_detail.id)  # noqa
-        if num_photos >= 4:
+        if ownership.num_photos >= MAX_PRODUCT_PHOTOS:
             raise ProductPhotoLimitError(
-                'The maximum number of photos for a product is 4')
+                f'The maximum number of photos for a product is {MAX_PRODUCT_PHOTOS}')
 
         try:
             filename = load_and_save_image(None, photo,
                                            photo_path=PRODUCT_PHOTOS_PATH)
             if main:
-                old_photos = cls.query.filter_by(
-                    product_detail_id=product_detail.id).all()
-                for ph in old_photos:
-                    if ph.main is True:
-                        ph.main = False
-
-            new_photo = cls(product_detail_id=product_detail.id,
-                            product_photo=filename, main=main)
-            db.session.add(new_photo)
+                db.session.execute(update(cls)
+                                   .where(cls.product_detail_id == ownership.detail_id,
+                                          cls.main == True)  # noqa
+                                   .values(main=False))
+
+            # The count is checked again by the insert, so concurrent uploads stay in the limit
+            num_photos = select(func.count(cls.id)) \
+                .where(cls.product_detail_id == ownership.detail_id) \
+                .scalar_subquery()
+            inserted = db.session.execute(
+                insert(cls)
+                .from_select(['product_detail_id', 'product_photo', 'main', 'timestamp'],
+                             select(literal(ownership.detail_id), literal(filename),
+                                    literal(bool(main)), literal(datetime.now()))
+                             .where(num_photos < MAX_PRODUCT_PHOTOS))
+                .returning(cls.id)
+            ).scalar()
+            if inserted is None:
+                db.session.rollback()
+                raise ProductPhotoLimitError(
+                    f'The maximum number of photos for a product is {MAX_PRODUCT_PHOTOS}')
             db.session.commit()
+            invalidate_product_caches(ownership.product_id, ownership.shop_id)
             return {"message": "Photo product uploaded successfully"}
         except AttributeError as ex:
             if "'str' object has no attribute 'filename'" in str(ex):
@@ -185,17 +315,21 @@ class ProductPhoto(db.Model):
     @classmethod
     def remove_product_photo_by_product_id(cls, product_id: int, product_photo_id: int,
                                            user_id: int):
-        photo: ProductPhoto = db.session.query(ProductPhoto) \
-            .join(Product, ProductPhoto.product_detail_id == Product.id) \
-            .join(Shop, Product.shop_id == Shop.id) \
-            .filter(ProductPhoto.id == product_photo_id,
-                    Product.id == product_id,
-                    Shop.owner_id == user_id) \
-            .first()
-
-        if photo:
-            photo.remove_product_photo()
-            return
+        ownership = get_product_ownership(product_id)
+        # Without a detail row the filter would match every photo with no detail
+        if ownership is not None and ownership.owner_id == user_id \
+                and ownership.detail_id is not None:
+            filename = db.session.execute(
+                delete(cls)
+                .where(cls.id == product_photo_id,
+                       cls.product_detail_id == ownership.detail_id)
+                .returning(cls.product_photo)
+            ).scalar()
+            if filename is not None:
+                MediaFile.release(PRODUCT_PHOTOS_PATH, filename)
+                db.session.commit()
+                invalidate_product_caches(ownership.product_id, ownership.shop_id)
+                return
 
         raise NotFoundError("Product photo is not found")
 
@@ -204,11 +338,11 @@ class ProductPhoto(db.Model):
         return cls.query.filter_by(product_detail_id=product_detail_id).count()
 
     def remove_product_photo(self):
-        file_path = os.path.join(PRODUCT_PHOTOS_PATH, self.product_photo)
-        if os.path.isfile(file_path):
-            os.remove(file_path)
+        MediaFile.release(PRODUCT_PHOTOS_PATH, self.product_photo)
+        product = self.product_image.product_detail
         db.session.delete(self)
         db.session.commit()
+        invalidate_product_caches(product.id, product.shop_id)
 
     def serialize(self):
         return {
@@ -221,6 +355,10 @@ class ProductPhoto(db.Model):
 
 class ProductDetail(db.Model):
     __tablename__ = "product_details"
+    __table_args__ = (
+        Index('ix_product_details_product_id_price', 'product_id', 'price'),
+        Index('ix_product_details_price_product_id', 'price', 'product_id'),
+    )
 
     id = mapped_column(Integer, primary_key=True)
     product_id = mapped_column(Integer, ForeignKey("products.id"))
@@ -235,7 +373,6 @@ class ProductDetail(db.Model):
     product_detail = relationship(
         "Product", back_populates="product_to_detail")
     product_to_photo = relationship("ProductPhoto", back_populates="product_image",
-                                    lazy="joined",
                                     uselist=True
                                     )
 
@@ -273,11 +410,16 @@ class ProductDetail(db.Model):
             setattr(product_detail, key, value)
 
         db.session.commit()
+        product = product_detail.product_detail
+        invalidate_product_caches(product.id, product.shop_id)
         return {"message": "Product detail updated"}
 
 
 class ProductComment(db.Model):
     __tablename__ = "product_comment"
+    __table_args__ = (
+        Index('ix_product_comment_product_id', 'product_id'),
+    )
 
     id = mapped_column(Integer, primary_key=True)
     product_id = mapped_column(Integer, ForeignKey("products.id"))
@@ -323,64 +465,250 @@ class Categories(db.Model):
         return categories
 
 
+def _parse_cursor(after: str, parse_value) -> tuple:
+    """Unpacks a (sort value, product id) cursor. Raises ValueError if it is malformed"""
+    sort_value, product_id = decode_cursor(after, 2)
+    try:
+        return parse_value(sort_value), int(product_id)
+    except (TypeError, ValueError) as ex:
+        raise ValueError('Invalid cursor') from ex
+
+
+def _after_cursor(after: str, sort_column, parse_value, descending: bool,
+                  id_column=Product.id):
+    """Builds the keyset condition selecting rows after the (sort_column, id_column) cursor"""
+    sort_value, product_id = _parse_cursor(after, parse_value)
+    if descending:
+        return or_(sort_column < sort_value,
+                   and_(sort_column == sort_value, id_column < product_id))
+    return or_(sort_column > sort_value,
+               and_(sort_column == sort_value, id_column > product_id))
+
+
 # TODO: return success or error message. Remove all flask imports in this file++++++++
 # TODO: jsonify should be called in route+++++++++
-def get_all_shop_products(user_id: int) -> list[dict] | list[Product]:
-    user = User.get_user_by_id(user_id)
-    if user is not None:
-        shop = Shop.get_shop_by_owner_id(user.id)
-        if not shop:
+def get_all_shop_products(user_id: int, limit: int = SHOP_PRODUCTS_PAGE_SIZE,
+                          after: str | None = None) -> dict:
+    """Returns one page of the user's shop products, newest first.
+
+    Pages are addressed by a keyset cursor on (time_added, id), so the cost
+    of a page does not depend on how deep into the shop it is.
+    """
+    if limit < 1:
+        raise ValueError('Limit must be a positive number')
+    limit = min(limit, SHOP_PRODUCTS_MAX_PAGE_SIZE)
+
+    identity = get_identity(user_id)
+    if identity is not None:
+        if identity.shop_id is None:
             raise NotFoundError('Shop not found')
-        shop_products = db.session.query(Product, ProductDetail, ProductPhoto) \
+        query = db.session.query(Product, ProductDetail) \
             .join(ProductDetail, Product.id == ProductDetail.product_id) \
-            .outerjoin(ProductPhoto, ProductDetail.id == ProductPhoto.product_detail_id) \
-            .filter(Product.shop_id == shop.id) \
+            .options(selectinload(ProductDetail.product_to_photo)) \
+            .filter(Product.shop_id == identity.shop_id)
+        if after is not None:
+            query = query.filter(_after_cursor(after, Product.time_added, datetime.fromisoformat,
+                                               descending=True))
+        shop_products = query \
+            .order_by(Product.time_added.desc(), Product.id.desc()) \
+            .limit(limit + 1) \
             .all()
-        response = product_info_serialize(shop_products)
-        return response
+
+        has_next = len(shop_products) > limit
+        shop_products = shop_products[:limit]
+        next_cursor = None
+        if has_next:
+            last_product = shop_products[-1][0]
+            next_cursor = encode_cursor(last_product.time_added, last_product.id)
+        return {
+            "has_previous": after is not None,
+            "has_next": has_next,
+            "next_cursor": next_cursor,
+            "data": product_info_serialize(shop_products)
+        }
     raise NotFoundError('User not found')
 
 
-def get_all_shop_products_by_shop_id(shop_id: int) -> ShopWithProductsSchema:
-    """Returns shop data as ShopWithProductsSchema using shop_id"""
+def get_shop_header(shop_id: int) -> ShopSchema:
+    """Returns the public header of the shop"""
     shop = Shop.get_shop_by_id(shop_id)
     if not shop:
         raise NotFoundError('Shop not found')
-    shop_products = db.session.query(
+    return ShopSchema.model_validate(shop)
+
+
+def get_shop_product_cards(shop_id: int, limit: int = SHOP_PRODUCTS_PAGE_SIZE,
+                           after: str | None = None) -> PaginatedProductSchema:
+    """Returns one page of the shop's active product cards, newest first"""
+    if limit < 1:
+        raise ValueError('Limit must be a positive number')
+    limit = min(limit, SHOP_PRODUCTS_MAX_PAGE_SIZE)
+    query = _active_product_cards_query(Product.time_added) \
+        .filter(Product.shop_id == shop_id)
+    if after is not None:
+        query = query.filter(_after_cursor(after, Product.time_added, datetime.fromisoformat,
+                                           descending=True))
+    rows = query.order_by(Product.time_added.desc(), Product.id.desc()).limit(limit + 1).all()
+
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][6], rows[-1][0]) if has_next else None
+    return PaginatedProductSchema(has_previous=after is not None, has_next=has_next,
+                                  next_cursor=next_cursor, data=_product_cards(rows))
+
+
+def normalize_shop_product_page(limit: int, after: str | None) -> tuple[int, str | None]:
+    """
+        Returns the limit and cursor of a public shop product page in canonical form,
+        so requests for the same page share one cache entry.
+        Raises ValueError if either of them is invalid.
+    """
+    if limit < 1:
+        raise ValueError('Limit must be a positive number')
+    if after is not None:
+        after = encode_cursor(*_parse_cursor(after, datetime.fromisoformat))
+    return min(limit, SHOP_PRODUCTS_MAX_PAGE_SIZE), after
+
+
+def invalidate_product_caches(product_id: int, shop_id: int):
+    """Drops cached responses that show the product"""
+    invalidate_product_info(product_id)
+    invalidate_shop_products(shop_id)
+
+
+def invalidate_product_info(product_id: int):
+    """Drops the cached /products/product_info response of the product"""
+    cache.delete(PRODUCT_INFO_CACHE_KEY.format(product_id))
+
+
+def get_product_info_by_id(product_id: int):
+    product_info = db.session.query(Product, ProductDetail) \
+        .join(ProductDetail, Product.id == ProductDetail.product_id) \
+        .options(selectinload(ProductDetail.product_to_photo)) \
+        .filter(Product.id == product_id) \
+        .first()
+    if product_info is not None:
+        return product_info_serialize_by_id(*product_info)
+    raise NotFoundError('Product not found')
+
+
+def _without_index(products_column):
+    """Prefixes the column with unary +, which keeps SQLite from using an index for the term"""
+    return UnaryExpression(products_column, operator=custom_op('+'), type_=products_column.type)
+
+
+def _active_product_cards_query(*extra_columns, products_indexes: bool = True):
+    """
+    Selects the product card columns of active products, joined to their main photo.
+
+    Without products_indexes the active filter cannot use a products index, so
+    SQLite drives the query from product_details instead.
+    """
+    is_active = Product.is_active if products_indexes else _without_index(Product.is_active)
+    return db.session.query(
         Product.id,
         Product.product_name,
         ProductDetail.price,
         ProductDetail.product_status,
         ProductDetail.is_unique,
-        ProductPhoto
+        ProductPhoto,
+        *extra_columns
     ).join(
         ProductDetail, Product.id == ProductDetail.product_id
     ).outerjoin(
-        ProductPhoto, ProductDetail.id == ProductPhoto.product_detail_id
+        ProductPhoto, and_(ProductDetail.id == ProductPhoto.product_detail_id,
+                           ProductPhoto.main == True)  # noqa
     ).filter(
-        Product.shop_id == shop.id
-    ).filter(
-        ProductPhoto.main == True  # noqa
-    ).with_entities(
-        Product.id,
-        Product.product_name,
-        ProductDetail.price,
-        ProductDetail.product_status,
-        ProductDetail.is_unique,
-        ProductPhoto
-    ).all()
-    products = ShopWithProductsSchema.load_list(
-        shop=shop, item_list=shop_products)
-    return products
-
-
-def get_product_info_by_id(product_id: int):
-    product = Product.query.filter_by(id=product_id).first()
-    if product is not None:
-        product_info = db.session.query(Product, ProductDetail, ProductPhoto) \
-            .join(ProductDetail, Product.id == ProductDetail.product_id) \
-            .outerjoin(ProductPhoto, ProductDetail.id == ProductPhoto.product_detail_id) \
-            .filter(Product.id == product_id) \
-            .first()
-        return product_info_serialize_by_id(*product_info)
-    raise NotFoundError('Product not found')
+        is_active == True  # noqa
+    )
+
+
+def _product_cards(rows) -> list[ProductInfoSchema]:
+    return [ProductInfoSchema(id=row[0],
+                              product_name=row[1],
+                              price=row[2],
+                              product_status=row[3],
+                              is_unique=row[4],
+                              photo=row[5])
+            for row in rows]
+
+
+def get_catalog_products(category_id: int | None = None, sub_category_id: int | None = None,
+                         sort: CatalogSortEnum = CatalogSortEnum.newest,
+                         limit: int = SHOP_PRODUCTS_PAGE_SIZE,
+                         after: str | None = None) -> PaginatedProductSchema:
+    """Returns one page of active products across all shops as product cards.
+
+    Filtering by category or subcategory and ordering by time_added are
+    served by the composite products indexes. Price lives on product_details,
+    so price ordered pages walk its (price, product_id) index instead, look up
+    each product by id and stop after one page of matches, with no sort step.
+    """
+    if limit < 1:
+        raise ValueError('Limit must be a positive number')
+    limit = min(limit, CATALOG_MAX_PAGE_SIZE)
+    parse_value: Callable[[str], Any]
+    if sort == CatalogSortEnum.newest:
+        sort_column, id_column, parse_value = Product.time_added, Product.id, \
+            datetime.fromisoformat
+    else:
+        # (price, product_id) of product_details, so pages walk its index
+        sort_column, id_column, parse_value = ProductDetail.price, ProductDetail.product_id, \
+            float
+    descending = sort != CatalogSortEnum.price_asc
+    # A products index used for a filter would make SQLite sort by price
+    by_price = sort != CatalogSortEnum.newest
+
+    def products_filter(products_column):
+        return _without_index(products_column) if by_price else products_column
+
+    query = _active_product_cards_query(sort_column, products_indexes=not by_price)
+    if sub_category_id is not None:
+        if category_id is not None:
+            sub_category_name = category_index.get_subcategory_name(category_id, sub_category_id)
+        else:
+            sub_category_name = category_index.get_subcategory_name_by_id(sub_category_id)
+        query = query.filter(products_filter(Product.sub_category_name) == sub_category_name)
+    elif category_id is not None:
+        query = query.filter(products_filter(Product.category_id) == category_id)
+    if after is not None:
+        query = query.filter(_after_cursor(after, sort_column, parse_value, descending,
+                                           id_column))
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    rows = query.limit(limit + 1).all()
+
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][6], rows[-1][0]) if has_next else None
+    return PaginatedProductSchema(has_previous=after is not None, has_next=has_next,
+                                  next_cursor=next_cursor, data=_product_cards(rows))
+
+
+def search_products(query: str, limit: int = SHOP_PRODUCTS_PAGE_SIZE,
+                    offset: int = 0) -> PaginatedProductSchema:
+    """Returns active products matching every word of the query, best BM25 match first.
+
+    Words are matched as prefixes, with the same Ukrainian folding that is
+    applied when products are indexed.
+    """
+    terms = re.findall(r'\w+', normalize_search_text(query))
+    if not terms:
+        raise ValueError('Search query must contain at least one word')
+    limit = min(limit, CATALOG_MAX_PAGE_SIZE)
+    match = ' '.join(f'"{term}"*' for term in terms)
+    rank = func.bm25(literal_column(PRODUCT_SEARCH_TABLE), *PRODUCT_SEARCH_WEIGHTS)
+
+    rows = _active_product_cards_query(rank) \
+        .join(products_fts, products_fts.c.rowid == Product.id) \
+        .filter(literal_column(PRODUCT_SEARCH_TABLE).op('MATCH')(match)) \
+        .order_by(rank, Product.id) \
+        .offset(offset) \
+        .limit(limit + 1) \
+        .all()
+
+    has_next = len(rows) > limit
+    return PaginatedProductSchema(has_previous=offset > 0, has_next=has_next,
+                                  data=_product_cards(rows[:limit]))
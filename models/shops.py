@@ -1,23 +1,41 @@
 import os
 
-from sqlalchemy import ForeignKey, Integer, String
-from sqlalchemy.orm import mapped_column, relationship
+from flask import g, has_app_context
+from sqlalchemy import ForeignKey, Index, Integer, String, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import mapped_column, relationship, validates
 
 from config import Config
-from dependencies import db
-from models.errors import NotFoundError
-from utils.utils import load_and_save_image, serialize_pydantic_response_error
+from dependencies import cache, db
+from models.errors import NotFoundError, UserError
+from models.media import MediaFile
+from models.views import View
+from utils.cache import get_cache_version
+from utils.images import image_variant_urls, media_url
+from utils.utils import load_and_save_image
 
 SHOPS_PHOTOS_PATH = os.path.join(Config.MEDIA_PATH, 'shops')
 SHOPS_BANNER_PHOTOS_PATH = os.path.join(Config.MEDIA_PATH, 'banner_shops')
+SHOP_PAGE_CACHE_TIMEOUT = 600
+SHOP_HEADER_CACHE_KEY = 'shop_header:{}'
+# shop_id, products version, limit, cursor
+SHOP_PRODUCTS_CACHE_KEY = 'shop_products:{}:{}:{}:{}'
+SHOP_PRODUCTS_VERSION_KEY = 'shop_products_version:{}'
+IDENTITY_CACHE_KEY = 'identity:{}'
+IDENTITY_CACHE_TIMEOUT = 60
 
 
 class Shop(db.Model):
     __tablename__ = "shops"
+    __table_args__ = (
+        Index('ix_shops_owner_id', 'owner_id'),
+        Index('ix_shops_name_normalized', 'name_normalized', unique=True),
+    )
 
     id = mapped_column(Integer, primary_key=True)
     owner_id = mapped_column(Integer, ForeignKey("users.id"))
     name = mapped_column(String, nullable=False)
+    name_normalized = mapped_column(String, nullable=False)
     description = mapped_column(String, default=None)
     photo_shop = mapped_column(String, default=None)
     banner_shop = mapped_column(String, default=None)
@@ -36,6 +54,11 @@ class Shop(db.Model):
     owner = relationship("User", back_populates="shops")
     shop_to_products = relationship("Product", back_populates="owner_shop")
 
+    @validates('name')
+    def _set_name_normalized(self, _key, name):
+        self.name_normalized = normalize_shop_name(name)
+        return name
+
     @classmethod
     def get_shop_by_owner_id(cls, owner_id):
         return cls.query.filter_by(owner_id=owner_id).first()
@@ -44,11 +67,17 @@ class Shop(db.Model):
     def get_shop_by_id(cls, shop_id: int):
         return cls.query.get(shop_id)
 
+    @classmethod
+    def get_shop_by_name(cls, name: str):
+        """Case-insensitive lookup through the unique name_normalized index"""
+        return cls.query.filter_by(name_normalized=normalize_shop_name(name)).first()
+
     @classmethod
     def create_shop(cls, **data):
         new_shop = cls(**data)
         db.session.add(new_shop)
-        db.session.commit()
+        _commit_shop_name()
+        invalidate_identity(new_shop.owner_id)
         return new_shop
 
     def update_shop_details(self, **data):
@@ -60,38 +89,98 @@ class Shop(db.Model):
             self.phone_number = data['phone_number']
         if data.get('link'):
             self.link = data['link']
-        db.session.commit()
+        _commit_shop_name()
+        invalidate_shop_header(self.id)
 
     def add_photo(self, photo):
         image_path = load_and_save_image(self.photo_shop, photo, SHOPS_PHOTOS_PATH)
         self.photo_shop = image_path
         db.session.commit()
+        invalidate_shop_header(self.id)
         return image_path
 
     def add_banner(self, banner):
         image_path = load_and_save_image(self.banner_shop, banner, SHOPS_BANNER_PHOTOS_PATH)
         self.banner_shop = image_path
         db.session.commit()
+        invalidate_shop_header(self.id)
         return image_path
 
     def remove_photo(self):
-        file_path = os.path.join(SHOPS_PHOTOS_PATH, self.photo_shop)
-        if os.path.isfile(file_path):
-            os.remove(file_path)
+        MediaFile.release(SHOPS_PHOTOS_PATH, self.photo_shop)
         self.photo_shop = None
         db.session.commit()
+        invalidate_shop_header(self.id)
 
     def remove_banner(self):
-        file_path = os.path.join(SHOPS_BANNER_PHOTOS_PATH, self.banner_shop)
-        if os.path.isfile(file_path):
-            os.remove(file_path)
+        MediaFile.release(SHOPS_BANNER_PHOTOS_PATH, self.banner_shop)
         self.banner_shop = None
         db.session.commit()
+        invalidate_shop_header(self.id)
 
     @classmethod
-    def get_shop_user_info(cls, user_id):
-        shop = cls.get_shop_by_owner_id(owner_id=user_id)
-        if shop is not None:
-            shop_info = serialize_pydantic_response_error(shop)
-            return shop_info
+    def get_shop_user_info(cls, user_id) -> 'ShopView':
+        row = db.session.execute(
+            select(*ShopView.columns).where(cls.owner_id == user_id).limit(1)).first()
+        if row is not None:
+            return ShopView(*row)
         raise NotFoundError('Shop not found')
+
+
+class ShopView(View):
+    __slots__ = ('id', 'owner_id', 'name', 'description', 'photo_shop', 'banner_shop',
+                 'phone_number', 'link')
+    model = Shop
+    id: int
+    owner_id: int
+    name: str
+    description: str | None
+    photo_shop: str | None
+    banner_shop: str | None
+    phone_number: str
+    link: str | None
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data['photo_shop'] = media_url('shops', self.photo_shop)
+        data['banner_shop'] = media_url('banner_shops', self.banner_shop)
+        data['photo_shop_variants'] = image_variant_urls(data['photo_shop'])
+        data['banner_shop_variants'] = image_variant_urls(data['banner_shop'])
+        return data
+
+
+def normalize_shop_name(name: str | None) -> str | None:
+    return name.casefold() if name is not None else None
+
+
+def _commit_shop_name():
+    """Commits the session, reporting a lost race for a shop name as UserError"""
+    try:
+        db.session.commit()
+    except IntegrityError as ex:
+        db.session.rollback()
+        if 'UNIQUE' in str(ex.orig) and 'name_normalized' in str(ex.orig):
+            raise UserError('Shop with this name already exists') from ex
+        raise
+
+
+def invalidate_shop_header(shop_id: int):
+    """Drops the cached header of the public shop page"""
+    cache.delete(SHOP_HEADER_CACHE_KEY.format(shop_id))
+
+
+def get_shop_products_version(shop_id: int) -> str:
+    """Returns the token that cached product pages of the shop are keyed by"""
+    return get_cache_version(SHOP_PRODUCTS_VERSION_KEY.format(shop_id), SHOP_PAGE_CACHE_TIMEOUT)
+
+
+def invalidate_shop_products(shop_id: int):
+    """Makes every cached product page of the public shop page unreachable"""
+    cache.delete(SHOP_PRODUCTS_VERSION_KEY.format(shop_id))
+
+
+def invalidate_identity(user_id: int):
+    """Drops the cached identity of the user, see models.accounts.get_identity"""
+    cache.delete(IDENTITY_CACHE_KEY.format(user_id))
+    if has_app_context():
+        g.get('identities', {}).pop(user_id, None)
@@ -0,0 +1,32 @@
+from operator import attrgetter
+from typing import Callable, ClassVar
+
+
+class View:
+    """
+    Read-only projection of a model row, serialized without pydantic.
+
+    Subclasses set model and __slots__ (column names of model, in select
+    order) and may narrow json_fields, the slots written by to_dict. The
+    selected columns and the getter of the JSON values are computed once per
+    class, so building and serializing a view costs a tuple unpack. Views
+    are built from column rows, which never enter the session identity map.
+    """
+    __slots__ = ()
+    model: ClassVar[type | None] = None
+    json_fields: ClassVar[tuple[str, ...]] = ()
+    columns: ClassVar[tuple] = ()
+    _json_values: ClassVar[Callable[..., tuple]]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.json_fields = cls.json_fields or cls.__slots__
+        cls.columns = tuple(getattr(cls.model, name) for name in cls.__slots__)
+        cls._json_values = attrgetter(*cls.json_fields)
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def to_dict(self) -> dict:
+        return dict(zip(self.json_fields, self._json_values(self)))
@@ -12,15 +12,18 @@ from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
 from pydantic import ValidationError
 
 from config import Config
-from dependencies import cache, db, jwt
+from dependencies import db, jwt
 from models.accounts import DeliveryUserInfo, User
 from models.errors import NotFoundError, UserError, serialize_validation_error, \
-    FileTooLargeError, BadFileTypeError
+    FileTooLargeError, BadFileTypeError, ServiceBusyError
 from validation.accounts import (ChangePasswordSchema, DeliveryPostValid,
                                  FullNameValid, GoogleAuthValid,
                                  PhoneNumberValid, SigninValid, SignupValid,
                                  UserInfoSchema, UserSchema, UserSignupReturnSchema)
 from routes.responses import ServerResponse
+from utils.revocation import get_revocation_store
+from utils.serialization import json_response
+from utils.uploads import PHOTO_MAX_FILE_SIZE, limit_upload
 
 ACCESS_EXPIRES = timedelta(hours=1)
 
@@ -33,9 +36,7 @@ CORS(accounts, supports_credentials=True)
 
 @jwt.token_in_blocklist_loader
 def check_if_token_is_revoked(jwt_header, jwt_payload: dict):  # pylint: disable=unused-argument
-    jti = jwt_payload["jti"]
-    token_in_redis = cache.get(jti)
-    return token_in_redis is not None
+    return get_revocation_store().is_revoked(jwt_payload["jti"])
 
 
 @accounts.route("/signup", methods=["POST"])
@@ -61,9 +62,11 @@ def signup() -> Response:
             profile_picture=user.profile_picture
         )
         response = UserSignupReturnSchema(link=verification_link, user=user_schema)
-        return Response(response.model_dump_json(indent=4), mimetype="application/json", status=201)
+        return json_response(response, status=201)
     except UserError as e:
         return jsonify({"error": str(e)}), 400
+    except ServiceBusyError:
+        return ServerResponse.SERVICE_BUSY
     except Exception as e:
         logging.error(e)
         return ServerResponse.INTERNAL_SERVER_ERROR
@@ -117,6 +120,8 @@ def signin() -> Response:
         return make_response(response, 200)
     except UserError as e:
         return jsonify({"error": str(e)}), 400
+    except ServiceBusyError:
+        return ServerResponse.SERVICE_BUSY
     except Exception as e:
         logging.error(e)
         return ServerResponse.INTERNAL_SERVER_ERROR
@@ -147,8 +152,8 @@ def refresh():
     user = get_jwt_identity()
     new_refresh_token = create_refresh_token(identity=user)
     token = create_access_token(identity=user, fresh=False)
-    jti = get_jwt()["jti"]
-    cache.set(jti, "1", timeout=86400)
+    revoked = get_jwt()
+    get_revocation_store().revoke(revoked["jti"], revoked["exp"])
     response = {"access_token": token, "refresh_token": new_refresh_token}
 
     return make_response(response, 200)
@@ -160,7 +165,7 @@ def logout():
     token = get_jwt()
     jti = token["jti"]
     ttype = token["type"]
-    cache.set(jti, "1", timeout=86400)
+    get_revocation_store().revoke(jti, token["exp"])
     return jsonify(msg=f"{ttype.capitalize()} token successfully revoked")
 
 
@@ -216,8 +221,7 @@ def user_info():
     try:
         user_id = get_jwt_identity()
         user_data = User.get_user_info(user_id)
-        response = UserInfoSchema(**user_data)
-        return Response(response.model_dump_json(indent=4), mimetype="application/json", status=200)
+        return json_response(UserInfoSchema(**user_data))
     except NotFoundError as e:
         return jsonify({"error": str(e)}), 404
     except Exception as e:
@@ -227,6 +231,7 @@ def user_info():
 
 @accounts.route('/profile_photo', methods=['POST', 'DELETE'])
 @jwt_required()
+@limit_upload(PHOTO_MAX_FILE_SIZE)
 def profile_photo():
     if request.method == 'POST':
         if 'image' not in request.files:
@@ -282,6 +287,8 @@ def change_password():
         return jsonify({"error": str(e)}), 400
     except NotFoundError as e:
         return jsonify({"error": str(e)}), 404
+    except ServiceBusyError:
+        return ServerResponse.SERVICE_BUSY
     except Exception as e:
         logging.error(e)
         return ServerResponse.INTERNAL_SERVER_ERROR
@@ -1,9 +1,7 @@
-import os
-
-from flask import (Blueprint, current_app, jsonify, make_response,
-                   send_from_directory)
+from flask import Blueprint, jsonify, make_response
 from flask_cors import CORS
-from werkzeug.exceptions import NotFound
+
+from validation.products import category_index
 
 categories = Blueprint("categories", __name__, url_prefix="/categories")
 CORS(categories, supports_credentials=True)
@@ -11,11 +9,9 @@ CORS(categories, supports_credentials=True)
 
 @categories.route('/categories', methods=['GET'])
 def get_static_categories():
-    static_dir = os.path.join(current_app.root_path, 'static')
     try:
-        d = send_from_directory(static_dir, 'categories/categories.json', as_attachment=True)
-        return d
-    except NotFound:
+        return category_index.make_response(download_name='categories.json')
+    except FileNotFoundError:
         error_message = {'error': 'File not found in the specified location'}
         return make_response(jsonify(error_message), 404)
     except Exception as ex:
@@ -1,19 +1,34 @@
 import os
+from pathlib import Path
 
-from flask import (Blueprint, current_app, jsonify, make_response,
-                   send_from_directory)
+from flask import Blueprint, jsonify, make_response, request
 from flask_cors import CORS
+from pydantic import ValidationError
+
+from models.errors import NotFoundError, serialize_validation_error
+from routes.responses import ServerResponse
+from utils.delivery import DeliveryIndex
+from utils.precompressed import PrecompressedFile
+from validation.accounts import DeliveryPostEnum
+from validation.orders import BranchQueryValid, CityQueryValid
 
 orders = Blueprint("orders", __name__, url_prefix="/orders")
 
 CORS(orders, supports_credentials=True)
 
+DELIVERY_PATH = os.path.join(Path(__file__).parent.parent, 'static', 'delivery')
+nova_post_file = PrecompressedFile(os.path.join(DELIVERY_PATH, 'nova_post.json'))
+ukr_post_file = PrecompressedFile(os.path.join(DELIVERY_PATH, 'ukr_post.json'))
+delivery_indexes = {
+    carrier.value: DeliveryIndex(os.path.join(DELIVERY_PATH, f'{carrier.value}.json'))
+    for carrier in DeliveryPostEnum
+}
+
 
 @orders.route("/nova_post", methods=["GET"])
 def get_nova_post_json():
-    static_dir = os.path.join(current_app.root_path, 'static')
     try:
-        return send_from_directory(static_dir, 'delivery/nova_post.json', as_attachment=True)
+        return nova_post_file.make_response(download_name='nova_post.json')
     except Exception:
         error_message = {'error': 'File not found in the specified location'}
         return make_response(jsonify(error_message), 404)
@@ -21,9 +36,43 @@ def get_nova_post_json():
 
 @orders.route("/ukr_post", methods=["GET"])
 def get_ukr_post_json():
-    static_dir = os.path.join(current_app.root_path, 'static')
     try:
-        return send_from_directory(static_dir, 'delivery/ukr_post.json', as_attachment=True)
+        return ukr_post_file.make_response(download_name='ukr_post.json')
     except Exception:
         error_message = {'error': 'File not found in the specified location'}
         return make_response(jsonify(error_message), 404)
+
+
+@orders.route("/<carrier>/cities", methods=["GET"])
+def get_delivery_cities(carrier):
+    index = delivery_indexes.get(carrier)
+    if index is None:
+        return ServerResponse.CARRIER_NOT_FOUND
+    try:
+        query = CityQueryValid(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify(serialize_validation_error(e)), 400
+    try:
+        cities = index.find_cities(query.prefix, query.limit)
+    except NotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify({"cities": cities})
+
+
+@orders.route("/<carrier>/branches", methods=["GET"])
+def get_delivery_branches(carrier):
+    index = delivery_indexes.get(carrier)
+    if index is None:
+        return ServerResponse.CARRIER_NOT_FOUND
+    try:
+        query = BranchQueryValid(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify(serialize_validation_error(e)), 400
+    try:
+        found = index.get_branches(query.city, query.limit)
+    except NotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    if found is None:
+        return ServerResponse.CITY_NOT_FOUND
+    city, branches = found
+    return jsonify({"city": city, "branches": branches})
@@ -1,6 +1,6 @@
 import logging
 
-from flask import Blueprint, Response, jsonify, request
+from flask import Blueprint, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from pydantic import ValidationError
@@ -8,13 +8,19 @@ from pydantic import ValidationError
 from models.errors import (BadFileTypeError, FileTooLargeError, NotFoundError,
                            ProductPhotoLimitError, UserError,
                            serialize_validation_error)
-from models.products import (Product, ProductPhoto, get_all_shop_products,
-                             get_product_info_by_id)
+from models.products import (PRODUCT_INFO_CACHE_KEY, PRODUCT_INFO_CACHE_TIMEOUT,
+                             SHOP_PRODUCTS_PAGE_SIZE, Product, ProductPhoto,
+                             get_all_shop_products, get_catalog_products,
+                             get_product_info_by_id, search_products)
 from routes.responses import ServerResponse
+from utils.cache import get_or_build_for_host
+from utils.serialization import json_body_response, json_response
+from utils.uploads import PHOTO_MAX_FILE_SIZE, limit_upload
 from utils.utils import serialize_product
-from validation.products import (CreateProductValid, DetailProductInfoSchema,
+from validation.products import (CatalogQueryValid, CreateProductValid,
+                                 DetailProductInfoSchema,
                                  PaginatedDetailProductSchema,
-                                 UpdateProductValid)
+                                 SearchQueryValid, UpdateProductValid)
 
 products = Blueprint("products_route", __name__, url_prefix="/products")
 
@@ -48,6 +54,7 @@ def create_product():
 
 @products.route("/product_photo/<int:product_id>", methods=["POST"])
 @jwt_required()
+@limit_upload(PHOTO_MAX_FILE_SIZE)
 def add_product_photo(product_id):
     if 'image' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
@@ -85,9 +92,10 @@ def remove_product_photo(product_id):
 @jwt_required()
 def get_shop_products():
     try:
-        shop_products = get_all_shop_products(get_jwt_identity())
-        response = PaginatedDetailProductSchema(data=shop_products).model_dump_json(indent=4)
-        return Response(response, mimetype="application/json", status=200)
+        limit = request.args.get('limit', SHOP_PRODUCTS_PAGE_SIZE, type=int)
+        after = request.args.get('after')
+        shop_products = get_all_shop_products(get_jwt_identity(), limit=limit, after=after)
+        return json_response(PaginatedDetailProductSchema(**shop_products))
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except NotFoundError as e:
@@ -97,6 +105,38 @@ def get_shop_products():
         return ServerResponse.INTERNAL_SERVER_ERROR
 
 
+@products.route("/catalog", methods=["GET"])
+def get_catalog():
+    try:
+        catalog_query = CatalogQueryValid(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify(serialize_validation_error(e)), 400
+    try:
+        return json_response(get_catalog_products(**catalog_query.model_dump()))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(e)
+        return ServerResponse.INTERNAL_SERVER_ERROR
+
+
+@products.route("/search", methods=["GET"])
+def search():
+    try:
+        search_query = SearchQueryValid(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify(serialize_validation_error(e)), 400
+    try:
+        response = search_products(search_query.q, limit=search_query.limit,
+                                   offset=search_query.offset)
+        return json_response(response)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(e)
+        return ServerResponse.INTERNAL_SERVER_ERROR
+
+
 @products.route("/update/<int:product_id>", methods=["PUT"])
 @jwt_required()
 def update_product(product_id):
@@ -137,9 +177,12 @@ def deactivate_product(product_id):
 @products.route("/product_info/<int:product_id>", methods=["GET"])
 def get_product_info(product_id):
     try:
-        response = get_product_info_by_id(product_id)
-        response = DetailProductInfoSchema(**response).model_dump_json(indent=4)
-        return Response(response, mimetype="application/json", status=200)
+        response = get_or_build_for_host(
+            PRODUCT_INFO_CACHE_KEY.format(product_id),
+            lambda: DetailProductInfoSchema(
+                **get_product_info_by_id(product_id)).model_dump_json().encode(),
+            PRODUCT_INFO_CACHE_TIMEOUT)
+        return json_body_response(response)
     except NotFoundError as e:
         return jsonify({'error': str(e)}), 404
     except ValidationError as e:
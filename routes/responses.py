@@ -26,5 +26,10 @@ class ServerResponse:
     # Products responses
     PRODUCT_CREATED = {'message': 'Product created successfully'}, 201
 
+    # Delivery responses
+    CARRIER_NOT_FOUND = {'error': 'Delivery carrier not found'}, 404
+    CITY_NOT_FOUND = {'error': 'City not found'}, 404
+
     # Other responses:
     INTERNAL_SERVER_ERROR = {'error': 'Internal Server Error. Please, contact administrator'}, 500
+    SERVICE_BUSY = {'error': 'Server is busy. Please, retry later'}, 503, {'Retry-After': '1'}
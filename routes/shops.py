@@ -1,18 +1,23 @@
 import logging
 
-from flask import (Blueprint, jsonify, make_response, request,
-                   url_for, Response)
+from flask import Blueprint, jsonify, make_response, request, url_for
 from flask_cors import CORS
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from pydantic import ValidationError
 
-from models.accounts import User
+from models.accounts import User, get_current_shop
 from models.errors import (serialize_validation_error, NotFoundError, FileTooLargeError,
-                           BadFileTypeError)
-from models.products import get_all_shop_products_by_shop_id
-from models.shops import Shop
+                           BadFileTypeError, UserError)
+from models.products import (SHOP_PRODUCTS_PAGE_SIZE, get_shop_header,
+                             get_shop_product_cards, normalize_shop_product_page)
+from models.shops import (SHOP_HEADER_CACHE_KEY, SHOP_PAGE_CACHE_TIMEOUT,
+                          SHOP_PRODUCTS_CACHE_KEY, Shop,
+                          get_shop_products_version)
 from routes.responses import ServerResponse
-from validation.shops import ShopCreateValid, ShopSchema, ShopUpdateValid
+from utils.cache import get_or_build_for_host
+from utils.serialization import json_body_response, json_response
+from utils.uploads import BANNER_MAX_FILE_SIZE, PHOTO_MAX_FILE_SIZE, limit_upload
+from validation.shops import ShopCreateValid, ShopUpdateValid
 
 shops = Blueprint("shops_route", __name__, url_prefix="/shops")
 
@@ -28,29 +33,36 @@ def create_shops():
     user = User.get_user_by_id(get_jwt_identity())
     if not user:
         return ServerResponse.USER_NOT_FOUND
-    existing_shop = Shop.get_shop_by_owner_id(user.id)
+    existing_shop = get_current_shop(user.id)
     data['owner_id'] = user.id
     if existing_shop:
         try:
             update_shop_data = ShopUpdateValid(**data).model_dump()
         except ValidationError as e:
             return jsonify(serialize_validation_error(e)), 400
-        existing_shop.update_shop_details(**update_shop_data)
+        try:
+            existing_shop.update_shop_details(**update_shop_data)
+        except UserError as e:
+            return jsonify({"error": str(e)}), 400
         return ServerResponse.SHOP_UPDATED
     if not existing_shop or existing_shop is None:
         try:
             create_shop_data = ShopCreateValid(**data).model_dump()
         except ValidationError as e:
             return jsonify(serialize_validation_error(e)), 400
-        Shop.create_shop(**create_shop_data)
+        try:
+            Shop.create_shop(**create_shop_data)
+        except UserError as e:
+            return jsonify({"error": str(e)}), 400
         return ServerResponse.SHOP_CREATED
     return ServerResponse.USER_NOT_FOUND
 
 
 @shops.route('/shop_photo', methods=['POST', 'DELETE', 'GET'])
 @jwt_required()
+@limit_upload(PHOTO_MAX_FILE_SIZE)
 def shop_photo():
-    shop = Shop.get_shop_by_owner_id(get_jwt_identity())
+    shop = get_current_shop(get_jwt_identity())
     if not shop:
         return ServerResponse.SHOP_NOT_FOUND
 
@@ -85,8 +97,9 @@ def shop_photo():
 
 @shops.route('/shop_banner', methods=['POST', 'DELETE', 'GET'])
 @jwt_required()
+@limit_upload(BANNER_MAX_FILE_SIZE)
 def shop_banner():
-    shop = Shop.get_shop_by_owner_id(get_jwt_identity())
+    shop = get_current_shop(get_jwt_identity())
     if not shop:
         return ServerResponse.SHOP_NOT_FOUND
 
@@ -132,8 +145,7 @@ def get_shop_info():
         return ServerResponse.USER_NOT_FOUND
     try:
         shop_info = Shop.get_shop_user_info(user.id)
-        response = ShopSchema(**shop_info).model_dump_json(indent=4)
-        return Response(response, mimetype="application/json", status=200)
+        return json_response(shop_info.to_dict())
 
     except NotFoundError as e:
         return jsonify({"error": str(e)}), 404
@@ -145,11 +157,27 @@ def get_shop_info():
 
 @shops.route("/shop_info/<int:shop_id>", methods=["GET"])
 def get_specific_shop_products(shop_id):
+    limit = request.args.get('limit', SHOP_PRODUCTS_PAGE_SIZE, type=int)
+    after = request.args.get('after')
     try:
-        products = get_all_shop_products_by_shop_id(shop_id)
-        return Response(products.model_dump_json(indent=4), mimetype="application/json", status=200)
+        # Only validated, canonical values end up in the cache key
+        limit, after = normalize_shop_product_page(limit, after)
+        # Header and product pages are cached apart, so shop edits keep product pages
+        # and product edits keep the header. The body is glued from both fragments.
+        shop = get_or_build_for_host(
+            SHOP_HEADER_CACHE_KEY.format(shop_id),
+            lambda: get_shop_header(shop_id).model_dump_json().encode(),
+            SHOP_PAGE_CACHE_TIMEOUT)
+        products = get_or_build_for_host(
+            SHOP_PRODUCTS_CACHE_KEY.format(shop_id, get_shop_products_version(shop_id),
+                                           limit, after),
+            lambda: get_shop_product_cards(shop_id, limit, after).model_dump_json().encode(),
+            SHOP_PAGE_CACHE_TIMEOUT)
+        return json_body_response(b'{"shop":' + shop + b',"products":' + products + b'}')
     except NotFoundError:
         return ServerResponse.SHOP_NOT_FOUND
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logging.error(e)
         return ServerResponse.INTERNAL_SERVER_ERROR
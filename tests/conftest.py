@@ -8,10 +8,12 @@ from pprint import pprint
 
 import pytest
 from flask import json
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
 from werkzeug.datastructures import FileStorage
 
 from app import create_testing_app
+from config import Config
 from dependencies import db
 from models.accounts import User
 from models.products import Product, ProductDetail, ProductPhoto
@@ -91,10 +93,13 @@ class TestValidData:
         TEST_PRODUCT_METHOD_OF_PAYMENT)
 
     # Files
+    # JPEG signature followed by filler, enough for the upload type check
+    TEST_IMAGE_BYTES = b'\xff\xd8\xff\xe0file_mock'
+
     @classmethod
     def get_image(cls):
         return FileStorage(
-            stream=BytesIO(b'file_mock'),
+            stream=BytesIO(cls.TEST_IMAGE_BYTES),
             filename='example.jpg',
             content_type='image/jpeg'
         )
@@ -180,9 +185,10 @@ def create_test_user(email=TestValidData.TEST_EMAIL,
     return u
 
 
-def create_user_and_shop(session, email=TestValidData.TEST_EMAIL) -> UserShop:
+def create_user_and_shop(session, email=TestValidData.TEST_EMAIL,
+                         shop_name=TestValidData.TEST_SHOP_NAME) -> UserShop:
     user = create_test_user(email=email)
-    shop = Shop(owner_id=user.id, **TestValidData.get_shop_payload())
+    shop = Shop(owner_id=user.id, **{**TestValidData.get_shop_payload(), "name": shop_name})
     session.add(shop)
     session.commit()
     session.refresh(shop)
@@ -213,6 +219,21 @@ def open_mock(filename: str):
         yield csv.DictReader(file)
 
 
+@contextmanager
+def capture_statements():
+    """Collects (statement, parameters) of every SQL statement executed inside the block"""
+    statements = []
+
+    def before_cursor_execute(_conn, _cursor, statement, parameters, *_):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
 def authorize(client, refresh=False, inject=True, **kwargs) -> dict:
     """Registers user and returns authorization header after successful signin"""
     valid_signup_data = TestValidData.get_user_signup_payload(**kwargs)
@@ -244,6 +265,18 @@ def orint(*args):
     print("-------------------------------------------")
 
 
+@pytest.fixture(autouse=True)
+def media_path(tmp_path, monkeypatch):
+    """Stores uploaded images in a temporary media folder instead of static/media"""
+    media = tmp_path / "media"
+    monkeypatch.setattr(Config, "MEDIA_PATH", str(media))
+    monkeypatch.setattr("models.accounts.PROFILE_PHOTOS_PATH", str(media / "profile"))
+    monkeypatch.setattr("models.products.PRODUCT_PHOTOS_PATH", str(media / "products"))
+    monkeypatch.setattr("models.shops.SHOPS_PHOTOS_PATH", str(media / "shops"))
+    monkeypatch.setattr("models.shops.SHOPS_BANNER_PHOTOS_PATH", str(media / "banner_shops"))
+    return media
+
+
 @pytest.fixture()
 def app():
     app = create_testing_app()
@@ -0,0 +1,85 @@
+from app import create_testing_app
+from config.config import TestConfig, _get_cached_response_hosts
+from dependencies import cache
+from models.products import invalidate_product_info
+from models.shops import (IDENTITY_CACHE_KEY, get_shop_products_version, invalidate_identity,
+                          invalidate_shop_header, invalidate_shop_products)
+from utils.cache import get_or_build_for_host
+
+
+def create_workers(tmp_path):
+    """Two apps sharing a FileSystemCache, like gunicorn workers on one machine"""
+    class SharedCacheConfig(TestConfig):
+        CACHE_TYPE = "FileSystemCache"
+        CACHE_DIR = str(tmp_path)
+
+    return create_testing_app(SharedCacheConfig), create_testing_app(SharedCacheConfig)
+
+
+def test_cached_body_invalidated_across_workers(tmp_path):
+    """Test an invalidation made by one worker reaches the bodies cached by another"""
+    # Given
+    worker_a, worker_b = create_workers(tmp_path)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return f"body {len(builds)}".encode()
+
+    with worker_a.test_request_context():
+        assert get_or_build_for_host("product_info:1", build, 60) == b"body 1"
+    with worker_b.test_request_context():
+        assert get_or_build_for_host("product_info:1", build, 60) == b"body 1"
+
+    # When
+    with worker_b.app_context():
+        invalidate_product_info(1)
+
+    # Then
+    with worker_a.test_request_context():
+        assert get_or_build_for_host("product_info:1", build, 60) == b"body 2"
+
+
+def test_shop_page_invalidated_across_workers(tmp_path):
+    """Test shop page fragments cached by one worker are dropped by changes on another"""
+    # Given
+    worker_a, worker_b = create_workers(tmp_path)
+    with worker_a.test_request_context():
+        version = get_shop_products_version(1)
+        get_or_build_for_host("shop_header:1", lambda: b"old header", 60)
+
+    # When
+    with worker_b.app_context():
+        invalidate_shop_products(1)
+        invalidate_shop_header(1)
+
+    # Then
+    with worker_a.test_request_context():
+        assert get_shop_products_version(1) != version
+        assert get_or_build_for_host("shop_header:1", lambda: b"new header", 60) == b"new header"
+
+
+def test_identity_invalidated_across_workers(tmp_path):
+    """Test an identity cached by one worker is dropped when another changes the shop"""
+    # Given
+    worker_a, worker_b = create_workers(tmp_path)
+    with worker_a.app_context():
+        cache.set(IDENTITY_CACHE_KEY.format(1), (1, 7))
+
+    # When
+    with worker_b.app_context():
+        invalidate_identity(1)
+
+    # Then
+    with worker_a.app_context():
+        assert cache.get(IDENTITY_CACHE_KEY.format(1)) is None
+
+
+def test_cached_response_hosts_default(monkeypatch):
+    """Test responses are cached for SERVER_NAME unless CACHED_RESPONSE_HOSTS is set"""
+    monkeypatch.delenv("CACHED_RESPONSE_HOSTS", raising=False)
+    monkeypatch.setenv("SERVER_NAME", "api.example.com")
+    assert _get_cached_response_hosts() == ["api.example.com"]
+
+    monkeypatch.setenv("CACHED_RESPONSE_HOSTS", "a.example.com, b.example.com")
+    assert _get_cached_response_hosts() == ["a.example.com", "b.example.com"]
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+
+import pytest
+from flask import Flask
+from prometheus_client import CollectorRegistry
+
+from models.errors import ServiceBusyError
+from utils.hashing import PasswordHasher
+
+
+@pytest.fixture()
+def hash_registry():
+    return CollectorRegistry()
+
+
+@pytest.fixture()
+def hasher(hash_registry):
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=1,
+                      PASSWORD_HASH_TIMEOUT=30)
+    hasher = PasswordHasher(hash_registry)
+    hasher.init_app(app)
+    yield hasher
+    if hasher._executor is not None:
+        hasher._executor.shutdown()
+
+
+def wait_for_queue_depth(registry, depth, timeout=10):
+    """Polls the queue depth gauge until it reaches depth, failing after timeout seconds"""
+    deadline = time.monotonic() + timeout
+    while registry.get_sample_value("password_hash_queue_depth") != depth:
+        if time.monotonic() > deadline:
+            pytest.fail(f"Password hash queue depth did not reach {depth} in {timeout}s")
+        time.sleep(0.01)
+
+
+def test_password_hasher_process_pool(hasher, hash_registry):
+    """Test password hasher hashes in the pool and rejects work over the queue bound"""
+    # Given
+    password_hash = hasher.generate("1_qwerty1S")
+    worker = threading.Thread(target=hasher._run, args=("sleep", time.sleep, 1))
+
+    # When
+    worker.start()
+    wait_for_queue_depth(hash_registry, 1)
+    with pytest.raises(ServiceBusyError):
+        hasher.check(password_hash, "1_qwerty1S")
+    worker.join(timeout=30)
+
+    # Then
+    assert not worker.is_alive()
+    assert hasher.check(password_hash, "1_qwerty1S")
+    assert not hasher.check(password_hash, "wrong")
+    assert hash_registry.get_sample_value("password_hash_queue_depth") == 0
+    assert hash_registry.get_sample_value("password_hash_seconds_sum", {"operation": "check"}) > 0
+
+
+def test_password_hasher_broken_pool(hasher, hash_registry):
+    """Test password hasher replaces a pool broken by a dead worker process"""
+    # Given
+    password_hash = hasher.generate("1_qwerty1S")
+    for process in list(hasher._executor._processes.values()):
+        process.kill()
+        process.join()
+
+    # When
+    checked = hasher.check(password_hash, "1_qwerty1S")
+
+    # Then
+    assert checked
+    with pytest.raises(ServiceBusyError, match="unavailable"):
+        hasher._run("exit", os._exit, 1)
+    assert hasher.generate("1_qwerty1S")
+    assert hash_registry.get_sample_value("password_hash_queue_depth") == 0
+
+
+def test_password_hasher_timeout(hasher):
+    """Test password hasher names the timed out operation"""
+    # Given
+    hasher.timeout = 0.01
+
+    # When / Then
+    with pytest.raises(ServiceBusyError, match="Password hashing timed out"):
+        hasher.generate("1_qwerty1S")
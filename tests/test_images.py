@@ -0,0 +1,124 @@
+import os
+from io import BytesIO
+
+import pytest
+from flask import Flask
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from tests import status
+from utils.images import (IMAGE_VARIANT_FORMATS, IMAGE_VARIANTS, ImagePipeline,
+                          image_variant_name, image_variant_urls, remove_image,
+                          store_image)
+from utils.uploads import detect_image_type
+
+
+def test_image_pipeline_variants(tmp_path):
+    """Test image pipeline writes variants in the background, removed with the original"""
+    # Given
+    app = Flask(__name__)
+    app.config["IMAGE_VARIANT_WORKERS"] = 1
+    pipeline = ImagePipeline()
+    pipeline.init_app(app)
+    path = str(tmp_path / "photo.png")
+    Image.new("RGBA", (2000, 1000), (200, 10, 10, 128)).save(path)
+
+    # When
+    pipeline.submit(path).result()
+
+    # Then
+    for variant, size in IMAGE_VARIANTS.items():
+        for image_format in IMAGE_VARIANT_FORMATS:
+            with Image.open(image_variant_name(path, variant, image_format)) as image:
+                assert image.format == image_format.upper()
+                assert image.size == (size, size // 2)
+    assert sorted(p.name for p in tmp_path.iterdir())[:2] == ["photo.png", "photo_detail.jpg"]
+    assert not list(tmp_path.glob("*.tmp"))
+    remove_image(path)
+    assert not list(tmp_path.iterdir())
+
+
+def test_image_pipeline_bad_image(tmp_path):
+    """Test image pipeline skips files that are not images"""
+    # Given
+    pipeline = ImagePipeline()
+    path = tmp_path / "photo.png"
+    path.write_bytes(b"not an image")
+
+    # When
+    pipeline.submit(str(path))
+
+    # Then
+    assert [p.name for p in tmp_path.iterdir()] == ["photo.png"]
+
+
+def test_store_image_deduplicated_refreshes_variants(tmp_path):
+    """Test storing a stored image again refreshes the mtime of the file and its variants"""
+    # Given
+    name, _created = store_image(FileStorage(BytesIO(b"image")), str(tmp_path), "png")
+    thumb = image_variant_name(str(tmp_path / name), "thumb", "webp")
+    with open(thumb, "wb") as file:
+        file.write(b"thumb")
+    for path in (str(tmp_path / name), thumb):
+        os.utime(path, (0, 0))
+
+    # When
+    again, created = store_image(FileStorage(BytesIO(b"image")), str(tmp_path), "png")
+
+    # Then
+    assert (again, created) == (name, False)
+    assert os.stat(tmp_path / name).st_mtime > 0
+    assert os.stat(thumb).st_mtime > 0
+
+
+def test_image_variant_urls():
+    """Test variant URLs are derived from the URL of the original image"""
+    # When
+    urls = image_variant_urls("http://localhost/static/media/products/abc.png")
+
+    # Then
+    assert urls["thumb"] == {"webp": "http://localhost/static/media/products/abc_thumb.webp",
+                             "jpeg": "http://localhost/static/media/products/abc_thumb.jpg"}
+    assert set(urls) == set(IMAGE_VARIANTS)
+    assert image_variant_urls(None) is None
+
+
+def test_content_addressed_media_cache_headers(app, client, tmp_path):
+    """Test content-addressed media is served with far-future immutable cache headers"""
+    # Given
+    app.static_folder = str(tmp_path)
+    name = "a" * 64
+    (tmp_path / "media" / "products").mkdir(parents=True)
+    for filename in (f"{name}.png", f"{name}_thumb.webp", "logo.png"):
+        (tmp_path / "media" / "products" / filename).write_bytes(b"image")
+
+    # When
+    original = client.get(f"/static/media/products/{name}.png")
+    variant = client.get(f"/static/media/products/{name}_thumb.webp")
+    other = client.get("/static/media/products/logo.png")
+
+    # Then
+    for response in (original, variant):
+        assert response.status_code == status.HTTP_200_OK
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == 365 * 24 * 3600
+    assert not other.cache_control.immutable
+
+
+@pytest.mark.parametrize("image_format, expected", [
+    ("PNG", "png"), ("JPEG", "jpeg"), ("WEBP", "webp"), ("GIF", None), ("BMP", None),
+])
+def test_detect_image_type(image_format, expected):
+    """Test upload type is read from the file signature and the stream is rewound"""
+    # Given
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8)).save(buffer, format=image_format)
+    buffer.seek(0)
+    photo = FileStorage(stream=buffer, filename="photo.png", content_type="image/png")
+
+    # When
+    detected = detect_image_type(photo)
+
+    # Then
+    assert detected == expected
+    assert photo.stream.tell() == 0
@@ -0,0 +1,175 @@
+import os
+import time
+
+from PIL import Image
+
+from models.media import MediaFile
+from models.products import ProductPhoto
+from tests.conftest import create_user_shop_product
+
+
+def test_media_shard(runner, session, media_path):
+    """Test media shard moves flat files into the sharded layout in resumable batches"""
+    # Given
+    data = create_user_shop_product(session)
+    photo_path = media_path / "products"
+    photo_path.mkdir(parents=True)
+    names = ["ab" * 32 + ".png", "cd" * 32 + ".png"]
+    for name in names:
+        (photo_path / name).write_bytes(name.encode())
+        session.add(ProductPhoto(data.detail.id, name, False))
+        session.add(MediaFile(path=f"products/{name}", ref_count=1))
+    (photo_path / ("ab" * 32 + "_thumb.webp")).write_bytes(b"thumb")
+    session.commit()
+
+    # When
+    result = runner.invoke(args=["media", "shard", "--batch-size", "1"])
+
+    # Then
+    assert result.exit_code == 0, result.output
+    assert "products: 2 files sharded" in result.output
+    sharded = sorted(photo.product_photo for photo in ProductPhoto.query.all())
+    assert sharded == [f"ab/ab/{names[0]}", f"cd/cd/{names[1]}"]
+    assert (photo_path / "ab" / "ab" / ("ab" * 32 + "_thumb.webp")).read_bytes() == b"thumb"
+    assert MediaFile.get_ref_count(str(photo_path), sharded[0]) == 1
+    # Flat names keep working until pruned
+    assert (photo_path / names[0]).exists()
+
+    # When
+    result = runner.invoke(args=["media", "shard", "--prune"])
+
+    # Then
+    assert result.exit_code == 0, result.output
+    assert "products: 0 files sharded" in result.output
+    assert "products: 3 flat files removed" in result.output
+    assert sorted(p.name for p in photo_path.iterdir()) == ["ab", "cd"]
+    assert (photo_path / sharded[1]).read_bytes() == names[1].encode()
+
+
+def test_media_gc(runner, session, media_path):
+    """Test media gc removes old unreferenced files and keeps referenced and recent ones"""
+    # Given
+    data = create_user_shop_product(session)
+    photo_path = media_path / "products"
+    (photo_path / "ab" / "ab").mkdir(parents=True)
+    referenced = "ab/ab/" + "ab" * 32 + ".png"
+    session.add(ProductPhoto(data.detail.id, referenced, False))
+    session.commit()
+    old = time.time() - 3600
+    for name in (referenced, referenced.replace(".png", "_thumb.webp"), "orphan.png",
+                 "ab/ab/orphan.png", "recent.png"):
+        (photo_path / name).write_bytes(b"image")
+        if name != "recent.png":
+            os.utime(photo_path / name, (old, old))
+
+    # When
+    result = runner.invoke(args=["media", "gc", "--grace-period", "60"])
+
+    # Then
+    assert result.exit_code == 0, result.output
+    assert "products: 2 unreferenced files, 10 bytes reclaimed" in result.output
+    remaining = sorted(p.relative_to(photo_path).as_posix()
+                       for p in photo_path.rglob("*") if p.is_file())
+    assert remaining == [referenced, referenced.replace(".png", "_thumb.webp"), "recent.png"]
+
+
+def test_media_gc_inactive_product(runner, session, media_path, tmp_path):
+    """Test media gc keeps photos of soft deleted products and quarantines orphans"""
+    # Given
+    data = create_user_shop_product(session)
+    photo_path = media_path / "products"
+    photo_path.mkdir(parents=True)
+    session.add(ProductPhoto(data.detail.id, "photo.png", False))
+    session.add(MediaFile(path="products/orphan.png", ref_count=1))
+    data.product.is_active = False
+    session.commit()
+    for name in ("photo.png", "orphan.png"):
+        (photo_path / name).write_bytes(b"image")
+        os.utime(photo_path / name, (0, 0))
+
+    # When
+    result = runner.invoke(args=["media", "gc", "--quarantine", str(tmp_path / "quarantine")])
+
+    # Then
+    assert result.exit_code == 0, result.output
+    assert (photo_path / "photo.png").exists()
+    assert not (photo_path / "orphan.png").exists()
+    assert (tmp_path / "quarantine" / "products" / "orphan.png").read_bytes() == b"image"
+    assert MediaFile.get_ref_count(str(photo_path), "orphan.png") == 0
+
+
+def test_media_gc_keeps_other_files(runner, session, media_path):
+    """Test media gc only collects images, dotfiles and other files are kept"""
+    # Given
+    photo_path = media_path / "shops"
+    (photo_path / ".cache").mkdir(parents=True)
+    names = (".gitkeep", "README.txt", ".cache/orphan.png", "orphan.jpg")
+    for name in names:
+        (photo_path / name).write_bytes(b"image")
+        os.utime(photo_path / name, (0, 0))
+
+    # When
+    result = runner.invoke(args=["media", "gc"])
+
+    # Then
+    assert result.exit_code == 0, result.output
+    assert "shops: 1 unreferenced files, 5 bytes reclaimed" in result.output
+    remaining = sorted(p.relative_to(photo_path).as_posix()
+                       for p in photo_path.rglob("*") if p.is_file())
+    assert remaining == sorted(names[:3])
+
+
+def test_media_gc_keeps_flat_files_until_pruned(runner, session, media_path):
+    """Test media gc keeps flat files linked by media shard, only --prune removes them"""
+    # Given
+    data = create_user_shop_product(session)
+    photo_path = media_path / "products"
+    photo_path.mkdir(parents=True)
+    name = "ab" * 32 + ".png"
+    thumb = "ab" * 32 + "_thumb.webp"
+    for file_name in (name, thumb):
+        (photo_path / file_name).write_bytes(b"image")
+        os.utime(photo_path / file_name, (0, 0))
+    session.add(ProductPhoto(data.detail.id, name, False))
+    session.commit()
+    result = runner.invoke(args=["media", "shard"])
+    assert result.exit_code == 0, result.output
+
+    # When
+    result = runner.invoke(args=["media", "gc"])
+
+    # Then
+    assert result.exit_code == 0, result.output
+    assert "products: 0 unreferenced files, 0 bytes reclaimed" in result.output
+    assert (photo_path / name).read_bytes() == b"image"
+    assert (photo_path / thumb).read_bytes() == b"image"
+    assert (photo_path / "ab" / "ab" / name).exists()
+
+
+def test_media_variants(runner, session, media_path):
+    """Test media variants generates the variants of images stored without them"""
+    # Given
+    data = create_user_shop_product(session)
+    photo_path = media_path / "products"
+    photo_path.mkdir(parents=True)
+    Image.new("RGB", (2000, 1000), (200, 10, 10)).save(photo_path / "legacy.jpg")
+    (photo_path / "broken.png").write_bytes(b"image")
+    session.add(ProductPhoto(data.detail.id, "legacy.jpg", False))
+    session.add(ProductPhoto(data.detail.id, "broken.png", False))
+    session.add(ProductPhoto(data.detail.id, "missing.png", False))
+    session.commit()
+
+    # When
+    result = runner.invoke(args=["media", "variants"])
+
+    # Then
+    assert result.exit_code == 0, result.output
+    assert "products: variants generated for 1 images, 1 failed" in result.output
+    assert all((photo_path / f"legacy_{variant}.{extension}").is_file()
+               for variant in ("thumb", "detail", "full") for extension in ("webp", "jpg"))
+
+    # When
+    result = runner.invoke(args=["media", "variants"])
+
+    # Then
+    assert "products: variants generated for 0 images, 1 failed" in result.output
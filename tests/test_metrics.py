@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from flask import Flask
+from prometheus_client import CollectorRegistry, generate_latest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from tests.conftest import BASE_DIR
+from utils.metrics import RequestMetrics, SystemMetricsSampler
+
+
+def test_system_metrics_sampler():
+    """Test system metrics sampler exports worker gauges and scrapes without blocking"""
+    # Given
+    registry = CollectorRegistry()
+    sampler = SystemMetricsSampler(registry, interval=0.05)
+
+    # When
+    sampler.start()
+    try:
+        time.sleep(0.2)
+        start = time.perf_counter()
+        output = generate_latest(registry).decode()
+        elapsed = time.perf_counter() - start
+    finally:
+        sampler.stop()
+
+    # Then
+    assert elapsed < 0.1
+    for name in ("cpu_usage_percent", "memory_usage_percent", "worker_resident_memory_bytes",
+                 "worker_open_fds", "worker_threads"):
+        assert f"\n{name} " in output
+    assert registry.get_sample_value("worker_resident_memory_bytes") > 0
+    assert registry.get_sample_value("worker_threads") >= 2
+    assert sampler._thread is None
+
+
+def test_metrics_app_multiprocess(tmp_path):
+    """Test healthcheck aggregates counters of every worker in multiprocess mode"""
+    # Given
+    worker = (
+        "from app import create_testing_app\n"
+        "client = create_testing_app().test_client()\n"
+        "for _ in range(3):\n"
+        "    client.get('/categories/categories')\n"
+        "print(client.get('/healthcheck').data.decode())\n"
+    )
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+    # When
+    outputs = [subprocess.run([sys.executable, "-c", worker], env=env, cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout
+               for _ in range(2)]
+
+    # Then
+    sample = ('http_request_duration_seconds_count{endpoint="categories.get_static_categories",'
+              'method="GET",status="200"}')
+    assert f"{sample} 3.0" in outputs[0]
+    assert f"{sample} 6.0" in outputs[1]
+
+
+def test_request_metrics_failed_statement():
+    """Test failed SQL statements do not leave their start time on the connection"""
+    # Given
+    RequestMetrics(CollectorRegistry()).init_app(Flask(__name__))
+    engine = create_engine("sqlite://")
+
+    # When
+    with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+
+        # Then
+        assert connection.connection.info["query_start_time"] == []
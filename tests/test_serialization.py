@@ -0,0 +1,67 @@
+import json
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from utils.serialization import get_type_adapter, json_body_response, json_response
+
+
+class Item(BaseModel):
+    name: str
+    note: Optional[str] = None
+
+
+def test_json_response_compact_by_default(app):
+    """Test responses are compact JSON unless ?pretty=1 is requested"""
+    # Given
+    item = Item(name="Заколка")
+
+    # When
+    with app.test_request_context():
+        compact = json_response(item, status=201)
+    with app.test_request_context("/?pretty=1"):
+        pretty = json_response(item)
+
+    # Then
+    assert compact.status_code == 201
+    assert compact.mimetype == "application/json"
+    assert compact.get_data() == '{"name":"Заколка","note":null}'.encode()
+    assert pretty.get_data() == item.model_dump_json(indent=4).encode()
+
+
+def test_json_body_response_pretty(app):
+    """Test a compact body encoded earlier is indented only with ?pretty=1"""
+    # Given
+    body = b'{"shop":{"id":1},"products":[]}'
+
+    # When
+    with app.test_request_context():
+        compact = json_body_response(body)
+    with app.test_request_context("/?pretty=1"):
+        pretty = json_body_response(body)
+
+    # Then
+    assert compact.get_data() == body
+    assert pretty.get_data().decode() == json.dumps(json.loads(body), indent=4)
+
+
+def test_type_adapter_cached():
+    """Test one TypeAdapter is built per serialized type"""
+    assert get_type_adapter(Item) is get_type_adapter(Item)
+    assert get_type_adapter(dict) is not get_type_adapter(Item)
+
+
+def test_json_response_msgpack(app):
+    """Test MessagePack is returned when the Accept header prefers it"""
+    # Given
+    msgpack = pytest.importorskip("msgpack")
+
+    # When
+    with app.test_request_context(headers={"Accept": "application/msgpack"}):
+        response = json_response({"name": "Заколка"})
+
+    # Then
+    assert response.mimetype == "application/msgpack"
+    assert "Accept" in response.vary
+    assert msgpack.unpackb(response.get_data()) == {"name": "Заколка"}
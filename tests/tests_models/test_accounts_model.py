@@ -2,13 +2,16 @@ from datetime import datetime
 from unittest import mock
 
 import pytest
-from flask import current_app
+from flask import current_app, g
 from itsdangerous import URLSafeTimedSerializer, BadSignature
 from sqlalchemy.exc import IntegrityError
 
-from models.accounts import User, Security
+from dependencies import db
+from models.accounts import User, Security, get_current_shop, get_identity
 from models.errors import UserError, NotFoundError
-from tests.conftest import TestValidData as Data, open_mock, create_test_user
+from models.shops import Shop
+from tests.conftest import (TestValidData as Data, open_mock, capture_statements,
+                            create_test_user, create_user_and_shop)
 
 
 def create_mock_users():
@@ -211,6 +214,8 @@ def test_get_user_info_1(session):
     assert type(result.get("joined_at")) is datetime
     assert result.get("phone_number") is None
     assert result.get("is_active") is False
+    assert result.get("shop_id") is None
+    assert result.get("have_a_shop") is False
 
 
 def test_get_user_info_2(prepopulated_session):
@@ -305,3 +310,69 @@ def test_verify_email_3(session):
     # Then
     with pytest.raises(UnboundLocalError):
         assert result
+
+
+def test_get_identity_1(session):
+    """Test get identity: shop id appears once the user creates a shop"""
+    # Given
+    user = create_test_user()
+    assert get_identity(user.id) == (user.id, None)
+
+    # When
+    shop = Shop.create_shop(owner_id=user.id, **Data.get_shop_payload())
+
+    # Then
+    assert get_identity(user.id) == (user.id, shop.id)
+    assert get_current_shop(user.id).id == shop.id
+    assert get_identity(user.id + 1) is None
+
+
+def test_get_identity_2(session):
+    """Test get identity: user and shop are looked up once across requests"""
+    # Given
+    user, shop = create_user_and_shop(session)
+    get_identity(user.id)
+    g.pop('identities')
+
+    # When
+    with capture_statements() as statements:
+        identity = get_identity(user.id)
+        users = [User.get_user_by_id(user.id) for _ in range(3)]
+
+    # Then
+    assert identity == (user.id, shop.id)
+    assert all(u is users[0] for u in users)
+    assert statements == []
+
+
+def test_get_identity_3(session):
+    """Test get identity: a missing shop is not cached beyond the request"""
+    # Given
+    user = create_test_user()
+    assert get_identity(user.id) == (user.id, None)
+    g.pop('identities')
+
+    # When
+    shop = Shop(owner_id=user.id, **Data.get_shop_payload())
+    session.add(shop)
+    session.commit()
+
+    # Then
+    assert get_identity(user.id) == (user.id, shop.id)
+
+
+def test_get_identity_4(session):
+    """Test get user by id: a cold lookup loads the user in one query"""
+    # Given
+    user = create_test_user()
+    user_id = user.id
+    db.session.expunge_all()
+    g.pop('identities', None)
+
+    # When
+    with capture_statements() as statements:
+        found = User.get_user_by_id(user_id)
+
+    # Then
+    assert found.id == user_id
+    assert len(statements) == 1
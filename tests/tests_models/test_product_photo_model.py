@@ -1,12 +1,19 @@
+import hashlib
+import os
 from io import BytesIO
 from unittest.mock import patch
 
 import pytest
 from werkzeug.datastructures.file_storage import FileStorage
 
-from models.errors import NotFoundError, BadFileTypeError, ProductPhotoLimitError, NoImageError
-from models.products import ProductPhoto
-from tests.conftest import create_user_shop_product, TestValidData
+from models.errors import (NotFoundError, BadFileTypeError, ProductPhotoLimitError, NoImageError,
+                           UserError)
+from dependencies import db
+from models.media import MEDIA_UNLINK_KEY, MediaFile
+from models.products import Product, ProductDetail, ProductPhoto, get_product_ownership
+from tests.conftest import create_user_and_shop, create_user_shop_product, TestValidData
+from utils.images import shard_name, store_image
+from utils.utils import load_and_save_image
 
 
 def test_add_product_photo_1(session):
@@ -51,7 +58,7 @@ def test_add_product_photo_3(session):
     # Given
     data = create_user_shop_product(session)
     file_storage = FileStorage(
-        stream=BytesIO(b'file_mock'),
+        stream=BytesIO(TestValidData.TEST_IMAGE_BYTES),
         filename='example.jpg',
         content_type='image/jpeg'
     )
@@ -81,6 +88,31 @@ def test_add_product_photo_3(session):
     assert len(added) == 4
 
 
+def test_add_product_photo_limit_concurrent(session):
+    """Test the photo limit holds for uploads whose ownership read was before another insert"""
+    # Given
+    data = create_user_shop_product(session)
+    with patch("werkzeug.datastructures.file_storage.FileStorage.save"):
+        for _ in range(4):
+            ProductPhoto.add_product_photo(data.user.id, data.product.id,
+                                           TestValidData.get_image(), False)
+
+    def stale_ownership(product_id):
+        return get_product_ownership(product_id)._replace(num_photos=3)
+
+    # When
+    with patch("models.products.get_product_ownership", side_effect=stale_ownership), \
+            patch("werkzeug.datastructures.file_storage.FileStorage.save"):
+        with pytest.raises(ProductPhotoLimitError):
+            ProductPhoto.add_product_photo(data.user.id, data.product.id,
+                                           TestValidData.get_image(), True)
+
+    # Then
+    photos = ProductPhoto.query.filter_by(product_detail_id=data.detail.id).all()
+    assert len(photos) == 4
+    assert not any(photo.main for photo in photos)
+
+
 @pytest.mark.parametrize(
     "user_id, product_id, photo, main, expected_exception, expected_message",
     [
@@ -122,6 +154,83 @@ def test_add_product_photo_negative(session, user_id, product_id, photo, main, e
             assert func.call_count == 0
 
 
+def test_add_product_photo_not_owner(session):
+    """Test add product photo scenario negative: product of another shop"""
+    # Given
+    data = create_user_shop_product(session)
+    other_user, _other_shop = create_user_and_shop(session, email="other@mail.com",
+                                                   shop_name="Other shop")
+
+    # When
+    with pytest.raises(UserError, match="permission not granted"):
+        ProductPhoto.add_product_photo(other_user.id, data.product.id,
+                                       TestValidData.get_image(), True)
+
+    # Then
+    assert ProductPhoto.get_num_photos_by_product_detail_id(data.detail.id) == 0
+
+
+def test_remove_product_photo_by_product_id(session, media_path):
+    """Test remove product photo scenario success: detail id differs from product id"""
+    # Given
+    user, shop = create_user_and_shop(session)
+    session.add(ProductDetail(**TestValidData.get_product_detail_payload(None)))
+    product = Product(shop_id=shop.id, **TestValidData.get_product_payload())
+    session.add(product)
+    session.commit()
+    detail = ProductDetail(**TestValidData.get_product_detail_payload(product.id))
+    session.add(detail)
+    session.commit()
+    ProductPhoto.add_product_photo(user.id, product.id, TestValidData.get_image(), True)
+    photo = ProductPhoto.query.filter_by(product_detail_id=detail.id).first()
+
+    # When
+    ProductPhoto.remove_product_photo_by_product_id(product.id, photo.id, user.id)
+
+    # Then
+    assert detail.id != product.id
+    assert ProductPhoto.get_num_photos_by_product_detail_id(detail.id) == 0
+    assert MediaFile.get_ref_count(str(media_path / "products"), photo.product_photo) == 0
+
+
+def test_remove_product_photo_by_product_id_not_owner(session):
+    """Test remove product photo scenario negative: photo of another owner's product"""
+    # Given
+    data = create_user_shop_product(session)
+    other_user, _other_shop = create_user_and_shop(session, email="other@mail.com",
+                                                   shop_name="Other shop")
+    with patch("werkzeug.datastructures.file_storage.FileStorage.save"):
+        ProductPhoto.add_product_photo(data.user.id, data.product.id,
+                                       TestValidData.get_image(), True)
+    photo = ProductPhoto.query.filter_by(product_detail_id=data.detail.id).first()
+
+    # When
+    with pytest.raises(NotFoundError, match="Product photo is not found"):
+        ProductPhoto.remove_product_photo_by_product_id(data.product.id, photo.id,
+                                                        other_user.id)
+
+    # Then
+    assert ProductPhoto.get_num_photos_by_product_detail_id(data.detail.id) == 1
+
+
+def test_remove_product_photo_by_product_id_without_detail(session):
+    """Test remove product photo scenario negative: product without detail keeps other photos"""
+    # Given
+    user, shop = create_user_and_shop(session)
+    product = Product(shop_id=shop.id, **TestValidData.get_product_payload())
+    session.add(product)
+    photo = ProductPhoto(None, "orphan.png", False)
+    session.add(photo)
+    session.commit()
+
+    # When
+    with pytest.raises(NotFoundError, match="Product photo is not found"):
+        ProductPhoto.remove_product_photo_by_product_id(product.id, photo.id, user.id)
+
+    # Then
+    assert db.session.get(ProductPhoto, photo.id) is not None
+
+
 def test_get_num_photos(session):
     """Test get photos count for product using detail_id scenario success"""
     # Given
@@ -132,3 +241,88 @@ def test_get_num_photos(session):
     # Then
     assert ProductPhoto.get_num_photos_by_product_detail_id(
         data.detail.id) == 0
+
+
+def test_add_product_photo_deduplicated(session, media_path):
+    """Test identical uploads share one file that is removed with its last reference"""
+    # Given
+    data = create_user_shop_product(session)
+    for _ in range(2):
+        ProductPhoto.add_product_photo(data.user.id, data.product.id,
+                                       TestValidData.get_image(), False)
+    first, second = ProductPhoto.query.filter_by(product_detail_id=data.detail.id).all()
+    photo_path = media_path / "products"
+
+    # When
+    first.remove_product_photo()
+
+    # Then
+    assert first.product_photo == second.product_photo
+    assert first.product_photo == shard_name(
+        f"{hashlib.sha256(TestValidData.TEST_IMAGE_BYTES).hexdigest()}.jpeg")
+    assert [p.relative_to(photo_path).as_posix() for p in photo_path.rglob("*.jpeg")] == \
+        [second.product_photo]
+    assert MediaFile.get_ref_count(str(photo_path), second.product_photo) == 1
+
+    second.remove_product_photo()
+    assert not [p for p in photo_path.rglob("*") if p.is_file()]
+    assert MediaFile.get_ref_count(str(photo_path), second.product_photo) == 0
+
+
+def test_load_and_save_image_released_meanwhile(session, media_path):
+    """Test a stored file removed after store_image found it is written again"""
+    # Given
+    photo_path = str(media_path / "products")
+    name, _created = store_image(TestValidData.get_image(), photo_path, "jpeg")
+    calls = []
+
+    def unlink_after_lookup(*args):
+        calls.append(store_image(*args))
+        if len(calls) == 1:
+            os.remove(os.path.join(photo_path, name))
+        return calls[-1]
+
+    # When
+    with patch("utils.utils.store_image", side_effect=unlink_after_lookup), \
+            patch("utils.utils.image_pipeline.submit") as submit:
+        stored = load_and_save_image(None, TestValidData.get_image(), photo_path)
+
+    # Then
+    assert calls == [(name, False), (name, True)]
+    assert stored == name
+    assert os.path.isfile(os.path.join(photo_path, name))
+    submit.assert_called_once_with(os.path.join(photo_path, name))
+
+
+def test_load_and_save_image_missing_variants(session, media_path):
+    """Test a deduplicated upload regenerates variants missing next to the stored file"""
+    # Given
+    photo_path = str(media_path / "products")
+    with patch("utils.utils.image_pipeline.submit"):
+        name = load_and_save_image(None, TestValidData.get_image(), photo_path)
+
+    # When
+    with patch("utils.utils.image_pipeline.submit") as submit:
+        load_and_save_image(None, TestValidData.get_image(), photo_path)
+
+    # Then
+    submit.assert_called_once_with(os.path.join(photo_path, name))
+
+
+def test_release_reacquired_in_transaction(session, media_path):
+    """Test a released file acquired again before the commit is not removed"""
+    # Given
+    photo_path = str(media_path / "products")
+    with patch("utils.utils.image_pipeline.submit"):
+        name = load_and_save_image(None, TestValidData.get_image(), photo_path)
+    db.session.commit()
+
+    # When
+    MediaFile.release(photo_path, name)
+    assert MEDIA_UNLINK_KEY in db.session.info
+    MediaFile.acquire(photo_path, name)
+    db.session.commit()
+
+    # Then
+    assert os.path.isfile(os.path.join(photo_path, name))
+    assert MediaFile.get_ref_count(photo_path, name) == 1
@@ -1,9 +1,11 @@
 import pytest
 
+from models.accounts import get_identity
 from models.errors import NotFoundError, UserError
-from models.products import Product, get_all_shop_products
-from tests.conftest import (create_test_user, create_user_and_shop, create_user_shop_product,
-                            TestValidData)
+from models.products import (Product, ProductDetail, ProductPhoto, get_all_shop_products,
+                             get_catalog_products, get_product_info_by_id, search_products)
+from tests.conftest import (capture_statements, create_test_user, create_user_and_shop,
+                            create_user_shop_product, TestValidData)
 
 
 def test_create_product_1(session):
@@ -95,7 +97,8 @@ def test_delete_product_3(session):
     """Test delete product scenario negative: User is not owner / Has no permission"""
     # Given
     user, _shop, product, detail = create_user_shop_product(session)
-    invalid_user, _shop = create_user_and_shop(session, email="invalid@user.com")
+    invalid_user, _shop = create_user_and_shop(session, email="invalid@user.com",
+                                               shop_name="Invalid user shop")
 
     # When
     with pytest.raises(UserError, match="Product not found or permission not granted"):
@@ -201,7 +204,8 @@ def test_update_product_2(session):
     """Test update product scenario negative: Product not found or not belong to shop"""
     # Given
     user, shop, product, detail = create_user_shop_product(session)
-    invalid_user, _shop = create_user_and_shop(session, email="invalid@user.com")
+    invalid_user, _shop = create_user_and_shop(session, email="invalid@user.com",
+                                               shop_name="Invalid user shop")
 
     # When
     new_payload = {"product_id": product.id,
@@ -268,6 +272,25 @@ def test_update_product_4(session):
     assert not_edited.is_active == product.is_active
 
 
+def test_update_product_5(session):
+    """Test update product scenario success: one read, writes in one transaction"""
+    # Given
+    user, shop, product, detail = create_user_shop_product(session)
+    get_identity(user.id)
+
+    # When
+    with capture_statements() as statements:
+        Product.update_product(user_id=user.id, product_id=product.id,
+                               product_name="New Product Name", price=99.5)
+
+    # Then
+    assert sum(statement.lstrip().upper().startswith("SELECT") for statement, _ in statements) == 1
+    edited = Product.query.filter_by(id=product.id).first()
+    assert edited.product_name == "New Product Name"
+    assert edited.time_modifeid is not None
+    assert ProductDetail.query.filter_by(id=detail.id).first().price == 99.5
+
+
 def test_get_all_shop_products_1(session):
     """Test to get all shop products scenario negative: No photo and detail"""
     # Given
@@ -283,7 +306,7 @@ def test_get_all_shop_products_1(session):
 
     # Then
     assert len(Product.query.filter_by(shop_id=shop.id).all()) == 15
-    assert len(result) == 0
+    assert len(result["data"]) == 0
 
 
 def test_get_all_shop_products_2(session):
@@ -304,3 +327,173 @@ def test_get_all_shop_products_3(session):
     # When
     with pytest.raises(NotFoundError, match="User not found"):
         get_all_shop_products(invalid_user_id)
+
+
+def test_get_all_shop_products_4(session):
+    """Test to get all shop products scenario success: keyset pages cover every product once"""
+    # Given
+    user, shop = create_user_and_shop(session)
+    for _ in range(0, 7):
+        product = Product(shop_id=shop.id, **TestValidData.get_product_payload(
+            sub_category_name=TestValidData.TEST_SUB_CATEGORY_NAME))
+        session.add(product)
+        session.flush()
+        session.add(ProductDetail(**TestValidData.get_product_detail_payload(product.id)))
+    session.commit()
+
+    # When
+    pages = [get_all_shop_products(user.id, limit=3)]
+    while pages[-1]["has_next"]:
+        pages.append(get_all_shop_products(user.id, limit=3,
+                                           after=pages[-1]["next_cursor"]))
+
+    # Then
+    assert [len(page["data"]) for page in pages] == [3, 3, 1]
+    assert pages[0]["has_previous"] is False
+    assert pages[1]["has_previous"] is True
+    assert pages[-1]["next_cursor"] is None
+    product_ids = [product["id"] for page in pages for product in page["data"]]
+    assert product_ids == sorted(product_ids, reverse=True)
+    assert len(set(product_ids)) == 7
+
+
+@pytest.mark.parametrize("limit, after", ((0, None), (10, "not a cursor")))
+def test_get_all_shop_products_5(session, limit, after):
+    """Test to get all shop products scenario negative: Bad limit or cursor"""
+    # Given
+    user, _shop = create_user_and_shop(session)
+
+    # When
+    with pytest.raises(ValueError):
+        get_all_shop_products(user.id, limit=limit, after=after)
+
+
+def _add_products_with_photos(session, shop, count, photos_per_product):
+    for _ in range(0, count):
+        product = Product(shop_id=shop.id, **TestValidData.get_product_payload(
+            sub_category_name=TestValidData.TEST_SUB_CATEGORY_NAME))
+        session.add(product)
+        session.flush()
+        detail = ProductDetail(**TestValidData.get_product_detail_payload(product.id))
+        session.add(detail)
+        session.flush()
+        for index in range(0, photos_per_product):
+            session.add(ProductPhoto(product_detail_id=detail.id,
+                                     product_photo=f"{index}.jpg", main=index == 0))
+    session.commit()
+
+
+def _count_queries(func, *args, **kwargs):
+    with capture_statements() as statements:
+        result = func(*args, **kwargs)
+    return result, len(statements)
+
+
+def test_get_all_shop_products_6(session):
+    """Test to get all shop products: fixed number of queries and no duplicated products"""
+    # Given
+    user, shop = create_user_and_shop(session)
+    get_identity(user.id)
+    _add_products_with_photos(session, shop, count=2, photos_per_product=1)
+    _small, small_queries = _count_queries(get_all_shop_products, user.id)
+    _add_products_with_photos(session, shop, count=6, photos_per_product=4)
+
+    # When
+    result, queries = _count_queries(get_all_shop_products, user.id)
+
+    # Then
+    assert queries == small_queries
+    assert len(result["data"]) == 8
+    assert len({product["id"] for product in result["data"]}) == 8
+    assert sorted(len(product["photos"]) for product in result["data"]) == [1, 1] + [4] * 6
+
+
+def test_get_product_info_by_id_1(session):
+    """Test get product info scenario success: every photo returned once"""
+    # Given
+    user, shop = create_user_and_shop(session)
+    _add_products_with_photos(session, shop, count=1, photos_per_product=3)
+    product = Product.query.first()
+
+    # When
+    result, queries = _count_queries(get_product_info_by_id, product.id)
+
+    # Then
+    assert queries == 2
+    assert result["id"] == product.id
+    assert len(result["photos"]) == 3
+
+
+def _add_named_product(session, shop, product_name, product_description=None):
+    product = Product(shop_id=shop.id, **TestValidData.get_product_payload(
+        sub_category_name=TestValidData.TEST_SUB_CATEGORY_NAME,
+        product_name=product_name,
+        product_description=product_description))
+    session.add(product)
+    session.flush()
+    session.add(ProductDetail(**TestValidData.get_product_detail_payload(product.id)))
+    session.commit()
+    return product
+
+
+@pytest.mark.parametrize("limit", (0, -1))
+def test_get_catalog_products_invalid_limit(session, limit):
+    """Test catalog products scenario negative: limit below one"""
+    # When / Then
+    with pytest.raises(ValueError, match="Limit must be a positive number"):
+        get_catalog_products(limit=limit)
+
+
+def test_search_products_1(session):
+    """Test search products scenario success: name matches rank above description matches"""
+    # Given
+    _user, shop = create_user_and_shop(session)
+    in_description = _add_named_product(session, shop, "Намисто", "Пара до срібних сережок")
+    in_name = _add_named_product(session, shop, "Срібні сережки", "Ручна робота")
+    _add_named_product(session, shop, "Браслет", "Шкіра")
+
+    # When
+    result = search_products("сереж")
+
+    # Then
+    assert [product.id for product in result.data] == [in_name.id, in_description.id]
+    assert result.has_next is False
+
+
+@pytest.mark.parametrize("query", ("пʼять", "п'ять", "ПЯТЬ", "ґердан", "гердан", "гердан єдиний",
+                                   "иван"))
+def test_search_products_2(session, query):
+    """Test search products scenario success: apostrophes and ґ/г, є/е, і/и are folded"""
+    # Given
+    _user, shop = create_user_and_shop(session)
+    product = _add_named_product(session, shop, "Ґердан п'ять", "Єдиний Іван")
+
+    # When
+    result = search_products(query)
+
+    # Then
+    assert [found.id for found in result.data] == [product.id]
+
+
+def test_search_products_3(session):
+    """Test search products scenario success: index follows updates and deactivation"""
+    # Given
+    user, shop = create_user_and_shop(session)
+    product = _add_named_product(session, shop, "Обруч", "Дерево")
+
+    # When
+    Product.update_product(user_id=user.id, product_id=product.id, product_name="Кольє")
+
+    # Then
+    assert search_products("обруч").data == []
+    assert [found.id for found in search_products("кольє").data] == [product.id]
+
+    Product.delete_product(user_id=user.id, product_id=product.id)
+    assert search_products("кольє").data == []
+
+
+def test_search_products_4(session):
+    """Test search products scenario negative: Query without words"""
+    # When
+    with pytest.raises(ValueError):
+        search_products("' - \"")
@@ -0,0 +1,83 @@
+import pytest
+
+from dependencies import db
+from models.accounts import DeliveryUserInfo
+from models.products import (Product, ProductDetail, ProductPhoto, get_catalog_products,
+                             get_product_ownership, get_shop_product_cards)
+from models.shops import Shop
+from tests.conftest import capture_statements
+from utils.utils import encode_cursor
+from validation.products import CatalogSortEnum
+
+
+def explain_query_plans(func, *args, **kwargs) -> list[str]:
+    """Runs func and returns the EXPLAIN QUERY PLAN details of every SELECT it issued"""
+    with capture_statements() as statements:
+        func(*args, **kwargs)
+
+    plans = []
+    with db.engine.connect() as connection:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.append(" | ".join(row[3] for row in rows))
+    return plans
+
+
+@pytest.mark.parametrize("func, args, expected_index", (
+    (Shop.get_shop_by_owner_id, (1,), "ix_shops_owner_id"),
+    (ProductDetail.get_product_detail_by_product_id, (1,), "ix_product_details_product_id_price"),
+    (ProductPhoto.get_num_photos_by_product_detail_id, (1,),
+     "ix_product_photos_product_detail_id"),
+    (DeliveryUserInfo.get_delivery_info_by_owner_id, (1,), "ix_delivery_user_info_owner_id"),
+    (lambda: Product.query.filter_by(shop_id=1).all(), (), "ix_products_shop_id_time_added_id"),
+))
+def test_lookup_uses_index(session, func, args, expected_index):
+    """Test hot model lookups search an index instead of scanning the table"""
+    # When
+    plans = explain_query_plans(func, *args)
+
+    # Then
+    assert len(plans) == 1
+    assert f"INDEX {expected_index} " in plans[0]
+    assert "SCAN" not in plans[0]
+
+
+@pytest.mark.parametrize("func, kwargs", (
+    (get_catalog_products, {}),
+    (get_shop_product_cards, {"shop_id": 1}),
+))
+def test_main_photo_join_uses_partial_index(session, func, kwargs):
+    """Test product cards find the main photo through the partial index"""
+    # When
+    plans = explain_query_plans(func, **kwargs)
+
+    # Then
+    assert "INDEX ix_product_photos_product_detail_id_main " in plans[0]
+
+
+@pytest.mark.parametrize("kwargs", ({}, {"category_id": 1},
+                                    {"category_id": 1, "sub_category_id": 11},
+                                    {"after": encode_cursor(100.0, 5)}))
+@pytest.mark.parametrize("sort", (CatalogSortEnum.price_asc, CatalogSortEnum.price_desc))
+def test_catalog_price_pages_walk_price_index(session, sort, kwargs):
+    """Test price ordered catalog pages walk the price index instead of sorting"""
+    # When
+    plans = explain_query_plans(get_catalog_products, sort=sort, **kwargs)
+
+    # Then
+    assert "INDEX ix_product_details_price_product_id" in plans[0]
+    assert "TEMP B-TREE" not in plans[0]
+
+
+def test_product_ownership_uses_indexes(session):
+    """Test the ownership check of product mutations is one query without table scans"""
+    # When
+    plans = explain_query_plans(get_product_ownership, 1)
+
+    # Then
+    assert len(plans) == 1
+    assert "INDEX ix_product_details_product_id_price " in plans[0]
+    assert "INDEX ix_product_photos_product_detail_id " in plans[0]
+    assert "SCAN" not in plans[0]
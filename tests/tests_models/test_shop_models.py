@@ -1,7 +1,8 @@
 import pytest
 from sqlalchemy.exc import IntegrityError
+from dependencies import db
 from models.accounts import User
-from models.errors import NotFoundError
+from models.errors import NotFoundError, UserError
 from models.shops import Shop
 from tests.conftest import TestValidData as Data
 
@@ -147,11 +148,11 @@ def test_get_shop_user_info_1(session):
     s = create_test_shop()
 
     # When
-    result = Shop.get_shop_user_info(s.owner_id)
+    result = Shop.get_shop_user_info(s.owner_id).to_dict()
 
     # Then
     assert result
-    assert result.get("id")
+    assert result.get("id") == s.id
     assert result.get("name") == Data.TEST_SHOP_NAME
     assert result.get("description") == Data.TEST_SHOP_DESCRIPTION
     assert result.get("photo_shop") is None
@@ -160,6 +161,28 @@ def test_get_shop_user_info_1(session):
     assert result.get("link") == Data.TEST_SHOP_LINK
 
 
+def test_get_shop_user_info_view(app, session):
+    """Test shop info is read as a view from columns, without loading a Shop entity"""
+    # Given
+    s = create_test_shop()
+    s.photo_shop = "ab/cd/abcd.png"
+    db.session.commit()
+    owner_id = s.owner_id
+    db.session.expunge_all()
+
+    # When
+    with app.test_request_context():
+        result = Shop.get_shop_user_info(owner_id).to_dict()
+
+    # Then
+    assert not any(isinstance(obj, Shop) for obj in db.session.identity_map.values())
+    assert result["photo_shop"] == "http://localhost/static/media/shops/ab/cd/abcd.png"
+    assert result["photo_shop_variants"]["thumb"]["webp"] == \
+        "http://localhost/static/media/shops/ab/cd/abcd_thumb.webp"
+    assert result["banner_shop"] is None
+    assert result["banner_shop_variants"] is None
+
+
 def test_get_shop_user_info_negative(session):
     """Test get shop info scenario negative: Non-existent user"""
     # Given
@@ -168,3 +191,33 @@ def test_get_shop_user_info_negative(session):
     # When
     with pytest.raises(NotFoundError, match="Shop not found"):
         Shop.get_shop_user_info(non_existent_user_id)
+
+
+def test_create_shop_4(session):
+    """Test create shop scenario negative: Name taken in another case is rejected by the DB"""
+    # Given
+    create_test_shop(name="Срібна Крамниця")
+    other_owner = create_test_user(email="other@mail.com")
+
+    # When
+    with pytest.raises(UserError, match="Shop with this name already exists"):
+        Shop.create_shop(owner_id=other_owner.id,
+                         name="СРІБНА крамниця",
+                         phone_number=Data.TEST_SHOP_PHONE_NUMBER)
+
+    # Then
+    assert Shop.query.count() == 1
+
+
+def test_get_shop_by_name_1(session):
+    """Test get shop by name is case-insensitive and follows renames"""
+    # Given
+    s = create_test_shop(name="Срібна Крамниця")
+
+    # When
+    s.update_shop_details(name="Золота Крамниця")
+
+    # Then
+    assert s.name_normalized == "золота крамниця"
+    assert Shop.get_shop_by_name("ЗОЛОТА крамниця").id == s.id
+    assert Shop.get_shop_by_name("Срібна Крамниця") is None
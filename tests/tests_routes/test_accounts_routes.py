@@ -1,13 +1,16 @@
+import time
 from unittest.mock import patch
 
 import pytest
 from flask import json
-from flask_jwt_extended import get_jwt_identity
+from flask_jwt_extended import decode_token, get_jwt_identity
 
-from models.accounts import User
+from dependencies import password_hasher, registry
+from models.accounts import RevokedToken, User
 from tests import status
 
 from tests.conftest import create_test_user, TestValidData, authorize, get_payload
+from utils.revocation import DatabaseRevocationStore
 
 signin_negative_payload = [
     {
@@ -443,6 +446,8 @@ def test_get_info_success(client, session):
     assert data.get("post") is None
     assert data.get("phone_number") is None
     assert data.get("profile_photo") is None
+    assert set(data) == {"full_name", "email", "profile_picture", "phone_number", "post", "city",
+                         "branch_name", "address", "shop_id", "have_a_shop"}
 
 
 def test_change_password_successful(client, session):
@@ -579,3 +584,60 @@ def test_upload_profile_photo_success(client, session):
         assert response.status_code == status.HTTP_200_OK
         user_data = User.get_user_by_id(user_id)
         assert user_data.profile_picture is None
+
+
+@pytest.mark.parametrize("refresh", (False, True))
+def test_revoked_token_rejected_on_every_worker(app, client, session, refresh):
+    """Test token revoked on one worker is rejected by another worker's store"""
+    # Given
+    headers = authorize(client, refresh=refresh, inject=False)
+    other_worker = DatabaseRevocationStore(negative_ttl=0)
+    token = decode_token(headers["Authorization"].split()[1])
+    assert not other_worker.is_revoked(token["jti"])
+
+    # When
+    if refresh:
+        response = client.post("/accounts/refresh", headers=headers)
+    else:
+        response = client.delete("/accounts/logout", headers=headers)
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert other_worker.is_revoked(token["jti"])
+    assert RevokedToken.get_expires_at(token["jti"]) == token["exp"]
+    response = client.delete("/accounts/logout", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_revoked_tokens_expire_with_token(client, session):
+    """Test revoked tokens are purged once the tokens themselves expired"""
+    # Given
+    RevokedToken.revoke("expired", int(time.time()) - 1)
+
+    # When
+    RevokedToken.revoke("active", int(time.time()) + 60)
+
+    # Then
+    assert RevokedToken.get_expires_at("expired") is None
+    assert RevokedToken.get_expires_at("active") is not None
+
+
+@pytest.mark.parametrize("url, payload", (
+    ("/accounts/signin", TestValidData.get_user_signin_payload()),
+    ("/accounts/signup", TestValidData.get_user_signup_payload(email="busy@mail.com")),
+))
+def test_password_hashing_busy(app, client, session, url, payload):
+    """Test signin and signup answer 503 right away when password hashing is saturated"""
+    # Given
+    authorize(client, inject=False)
+    app.config["PASSWORD_HASH_MAX_PENDING"] = 0
+    password_hasher.init_app(app)
+    rejected = registry.get_sample_value("password_hash_rejected_total")
+
+    # When
+    response = client.post(url, json=payload)
+
+    # Then
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+    assert registry.get_sample_value("password_hash_rejected_total") == rejected + 1
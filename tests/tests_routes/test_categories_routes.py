@@ -0,0 +1,111 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from tests import status
+from tests.conftest import BASE_DIR
+from utils.precompressed import PrecompressedFile
+from validation.products import CategoryIndex
+
+
+def test_get_categories(client, session):
+    """Test get categories scenario success"""
+    # When
+    response = client.get("/categories/categories")
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    with open(os.path.join(BASE_DIR, "static/categories/categories.json"),
+              encoding="utf-8") as file:
+        categories_json = json.load(file)
+    assert response.get_json() == categories_json
+
+
+def test_category_index_lookups(tmp_path):
+    """Test category index lookups in both directions"""
+    # Given
+    path = tmp_path / "categories.json"
+    path.write_text(json.dumps({"1": {"label": "Head", "subcategories": {"11": "Заколки"}}}),
+                    encoding="utf-8")
+    index = CategoryIndex(str(path))
+
+    # Then
+    assert index.get_subcategory_name(1, 11) == "Заколки"
+    assert index.get_subcategory_name("1", "11") == "Заколки"
+    assert index.get_subcategory_id("Заколки") == 11
+    with pytest.raises(ValueError, match="The category with the specified ID does not exist"):
+        index.get_subcategory_name(2, 11)
+    with pytest.raises(ValueError, match="does not belong to the category"):
+        index.get_subcategory_name(1, 12)
+    with pytest.raises(ValueError, match="The subcategory with the specified name does not exist"):
+        index.get_subcategory_id("Обручі")
+
+
+def test_category_index_reload_on_change(app, tmp_path):
+    """Test category index lookups and response are rebuilt together after the mtime changes"""
+    # Given
+    path = tmp_path / "categories.json"
+    path.write_text(json.dumps({"1": {"label": "Head", "subcategories": {"11": "Заколки"}}}),
+                    encoding="utf-8")
+    index = CategoryIndex(str(path))
+    index.CHECK_INTERVAL = 0
+    assert index.get_subcategory_id("Заколки") == 11
+
+    # When
+    new_categories = {"1": {"label": "Head", "subcategories": {"12": "Обручі"}}}
+    path.write_text(json.dumps(new_categories), encoding="utf-8")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))
+
+    # Then
+    assert index.get_subcategory_id("Обручі") == 12
+    with pytest.raises(ValueError):
+        index.get_subcategory_id("Заколки")
+    with app.test_request_context():
+        assert json.loads(index.make_response().data) == new_categories
+
+
+@pytest.mark.parametrize("route", ("/categories/categories", "/orders/nova_post",
+                                   "/orders/ukr_post"))
+def test_reference_data_compressed_and_validated(client, route):
+    """Test reference data is served gzip encoded with an ETag answered by 304"""
+    # Given
+    plain = client.get(route)
+
+    # When
+    response = client.get(route, headers={"Accept-Encoding": "gzip"})
+    revalidated = client.get(route, headers={"Accept-Encoding": "gzip",
+                                             "If-None-Match": response.headers["ETag"]})
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.vary
+    assert gzip.decompress(response.data) == plain.data
+    assert len(response.data) * 3 < len(plain.data)
+    assert plain.get_json()
+    assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not revalidated.data
+
+
+def test_precompressed_file_reload_on_change(app, tmp_path):
+    """Test precompressed file gets a new ETag after the file mtime changes"""
+    # Given
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps({"post": "first"}), encoding="utf-8")
+    precompressed = PrecompressedFile(str(path))
+    precompressed.CHECK_INTERVAL = 0
+    with app.test_request_context():
+        first = precompressed.make_response()
+
+    # When
+    path.write_text(json.dumps({"post": "second"}), encoding="utf-8")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))
+    with app.test_request_context(headers={"If-None-Match": first.headers["ETag"]}):
+        second = precompressed.make_response()
+
+    # Then
+    assert second.status_code == status.HTTP_200_OK
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert json.loads(second.data) == {"post": "second"}
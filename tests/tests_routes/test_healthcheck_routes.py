@@ -0,0 +1,36 @@
+from dependencies import registry
+from tests import status
+
+
+def _sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0
+
+
+def test_healthcheck_request_metrics(client, prepopulated_session):
+    """Test healthcheck exposes request latency and SQL usage per endpoint"""
+    # Given
+    endpoint = "products_route.get_catalog"
+    requests_before = _sample("http_request_duration_seconds_count",
+                              endpoint=endpoint, method="GET", status="200")
+    queries_before = _sample("db_queries_per_request_sum", endpoint=endpoint)
+    missing_before = _sample("http_request_duration_seconds_count",
+                             endpoint="unmatched", method="GET", status="404")
+
+    # When
+    client.get("/products/catalog")
+    client.get("/products/catalog?limit=5")
+    client.get("/products/no_such_route")
+    response = client.get("/healthcheck")
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    body = response.data.decode()
+    assert "http_request_duration_seconds_bucket{" in body
+    assert f'endpoint="{endpoint}"' in body
+    assert _sample("http_request_duration_seconds_count",
+                   endpoint=endpoint, method="GET", status="200") == requests_before + 2
+    assert _sample("db_queries_per_request_sum", endpoint=endpoint) > queries_before
+    assert _sample("db_query_seconds_per_request_count", endpoint=endpoint) >= 2
+    assert _sample("http_request_duration_seconds_count",
+                   endpoint="unmatched", method="GET", status="404") == missing_before + 1
+    assert _sample("http_requests_in_progress", endpoint=endpoint, method="GET") == 0
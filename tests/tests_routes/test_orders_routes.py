@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from routes.orders import delivery_indexes
+from tests import status
+from utils.delivery import DeliveryIndex
+
+
+@pytest.mark.parametrize("carrier, prefix, expected", [
+    ("nova_post", "х", ["Харків", "Хмельницький"]),
+    ("nova_post", "ХМЕЛЬ", ["Хмельницький"]),
+    ("nova_post", "Киї", ["Київ"]),
+    ("ukr_post", "в", ["Вінниця"]),
+    ("nova_post", "Париж", []),
+])
+def test_get_delivery_cities(client, carrier, prefix, expected):
+    """Test city lookup by case-insensitive name prefix"""
+    # When
+    response = client.get(f"/orders/{carrier}/cities", query_string={"prefix": prefix})
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert response.get_json() == {"cities": expected}
+
+
+def test_get_delivery_branches(client):
+    """Test branch lookup by city name, limited to the requested number"""
+    # When
+    response = client.get("/orders/nova_post/branches", query_string={"city": "київ", "limit": 2})
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert response.get_json() == {"city": "Київ", "branches": [
+        {"branch_name": "Відділення 1", "address": "вул. Хрещатик, 1"},
+        {"branch_name": "Відділення 2", "address": "просп. Перемоги, 20"},
+    ]}
+
+
+@pytest.mark.parametrize("route, query, expected_status", [
+    ("/orders/pigeon_post/cities", {"prefix": "к"}, status.HTTP_404_NOT_FOUND),
+    ("/orders/nova_post/branches", {"city": "Париж"}, status.HTTP_404_NOT_FOUND),
+    ("/orders/nova_post/branches", {}, status.HTTP_400_BAD_REQUEST),
+    ("/orders/nova_post/cities", {"limit": 0}, status.HTTP_400_BAD_REQUEST),
+    ("/orders/nova_post/cities", {"limit": 101}, status.HTTP_400_BAD_REQUEST),
+])
+def test_delivery_lookup_negative(client, route, query, expected_status):
+    """Test delivery lookups with unknown carrier, unknown city or bad query"""
+    # When
+    response = client.get(route, query_string=query)
+
+    # Then
+    assert response.status_code == expected_status
+    assert response.get_json()["error"]
+
+
+@pytest.mark.parametrize("route, query", [
+    ("/orders/nova_post/cities", {"prefix": "к"}),
+    ("/orders/nova_post/branches", {"city": "Київ"}),
+])
+def test_delivery_lookup_missing_file(client, monkeypatch, tmp_path, route, query):
+    """Test delivery lookups answer 404 while the carrier's data file is missing"""
+    # Given
+    monkeypatch.setitem(delivery_indexes, "nova_post", DeliveryIndex(str(tmp_path / "none.json")))
+
+    # When
+    response = client.get(route, query_string=query)
+
+    # Then
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.get_json() == {"error": "Delivery data not found"}
+
+
+def test_delivery_index_folds_apostrophes(tmp_path):
+    """Test delivery index matches names regardless of apostrophe style and case"""
+    # Given
+    path = tmp_path / "post.json"
+    path.write_text(json.dumps([
+        {"city_name": "Кам'янське", "branches": [{"branch_number": "1"}]},
+        {"city_name": "Камʼянець-Подільський", "branches": []},
+        {"city_name": "Канів", "branches": []},
+    ]), encoding="utf-8")
+    index = DeliveryIndex(str(path))
+
+    # Then
+    assert index.find_cities("камʼян", 10) == ["Камʼянець-Подільський", "Кам'янське"]
+    assert index.find_cities("ка", 1) == ["Камʼянець-Подільський"]
+    assert index.get_branches("КАМ’ЯНСЬКЕ", 10) == ("Кам'янське", [{"branch_number": "1"}])
@@ -3,7 +3,9 @@ from unittest.mock import patch
 import pytest
 from flask import json
 
-from models.products import Product, ProductDetail
+from dependencies import cache
+from models.products import (PRODUCT_INFO_CACHE_KEY, Product, ProductDetail,
+                             get_product_info_by_id, invalidate_product_info)
 from tests import status
 from tests.conftest import (TestValidData, authorize, create_user_and_shop,
                             create_user_shop_product)
@@ -150,6 +152,99 @@ def test_create_product_success_1(client, prepopulated_session):
         assert response.get_json().get("time_added") is not None
 
 
+def test_get_product_info_photo_variants(client, prepopulated_session):
+    """Test product info exposes URLs of the generated photo variants"""
+    # When
+    response = client.get("/products/product_info/1")
+
+    # Then
+    photo = response.get_json()["photos"][0]
+    stem = photo["product_photo"].rsplit(".", 1)[0]
+    assert photo["variants"]["thumb"] == {"webp": f"{stem}_thumb.webp",
+                                          "jpeg": f"{stem}_thumb.jpg"}
+    assert set(photo["variants"]) == {"thumb", "detail", "full"}
+
+
+def test_get_product_info_cached(client, prepopulated_session):
+    """Test repeated product info reads are served from cache without touching the DB"""
+    # Given
+    first = client.get("/products/product_info/1")
+
+    # When
+    with patch("routes.products.get_product_info_by_id") as get_product_info_by_id:
+        second = client.get("/products/product_info/1")
+
+    # Then
+    assert get_product_info_by_id.call_count == 0
+    assert second.status_code == status.HTTP_200_OK
+    assert second.data == first.data
+
+
+def test_get_product_info_cache_unknown_host(client, prepopulated_session):
+    """Test product info for a host outside CACHED_RESPONSE_HOSTS is built, not cached"""
+    # Given
+    client.get("/products/product_info/1")
+
+    # When
+    response = client.get("/products/product_info/1", headers={"Host": "other.example"})
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert "http://other.example/" in response.get_json()["photos"][0]["product_photo"]
+    key = PRODUCT_INFO_CACHE_KEY.format(1)
+    version = cache.get(key)
+    assert cache.get(f"{key}:{version}:http://localhost/") is not None
+    assert cache.get(f"{key}:{version}:http://other.example/") is None
+
+
+def test_get_product_info_cache_invalidated_while_built(client, prepopulated_session):
+    """Test a body built while the product changed is not served after the invalidation"""
+    # Given
+    build = get_product_info_by_id
+
+    def build_during_edit(product_id):
+        product_info = build(product_id)
+        invalidate_product_info(product_id)
+        return product_info
+
+    with patch("routes.products.get_product_info_by_id", side_effect=build_during_edit):
+        client.get("/products/product_info/1")
+
+    # When
+    with patch("routes.products.get_product_info_by_id", side_effect=build) as rebuild:
+        response = client.get("/products/product_info/1")
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert rebuild.call_count == 1
+
+
+def test_get_product_info_cache_invalidation(client, prepopulated_session):
+    """Test product info cache is dropped by product and photo writes"""
+    # Given
+    headers = authorize(client, email="1_test@mail.com", password="1_qwerty1S")
+    assert client.get("/products/product_info/1").get_json()["product_name"] != "new name"
+
+    # When / Then: update
+    client.put("/products/update/1", json={"product_name": "new name"}, headers=headers)
+    assert client.get("/products/product_info/1").get_json()["product_name"] == "new name"
+
+    # When / Then: photo upload and removal
+    with patch("werkzeug.datastructures.file_storage.FileStorage.save"):
+        client.post('/products/product_photo/1',
+                    data={"image": TestValidData.get_image(), "main": True},
+                    content_type='multipart/form-data', headers=headers)
+    photos = client.get("/products/product_info/1").get_json()["photos"]
+    assert len(photos) == 2
+    client.patch('/products/product_photo/1', json={"product_photo_id": photos[0]["id"]},
+                 headers=headers)
+    assert len(client.get("/products/product_info/1").get_json()["photos"]) == 1
+
+    # When / Then: deactivation
+    client.delete("/products/deactivate/1", headers=headers)
+    assert client.get("/products/product_info/1").get_json()["is_active"] is False
+
+
 def test_get_product_by_id_fail_1(client, prepopulated_session):
     """Test getting product negative (product not found)"""
     # Given
@@ -236,6 +331,117 @@ def test_get_shop_products_success(client, prepopulated_session):
     assert len(json_data.get("data")) == 25
 
 
+def test_get_shop_products_pagination(client, prepopulated_session):
+    """Test get shop products page by page using the cursor from the previous page"""
+    # Given
+    headers = authorize(client, email="1_test@mail.com", password="1_qwerty1S")
+
+    # When
+    first_page = client.get("/products/shop_products?limit=10", headers=headers).get_json()
+    second_page = client.get(f"/products/shop_products?limit=10&after={first_page['next_cursor']}",
+                             headers=headers).get_json()
+
+    # Then
+    assert len(first_page["data"]) == 10
+    assert first_page["has_next"] is True
+    assert first_page["has_previous"] is False
+    assert len(second_page["data"]) == 10
+    assert second_page["has_previous"] is True
+    first_ids = {product["id"] for product in first_page["data"]}
+    second_ids = {product["id"] for product in second_page["data"]}
+    assert not first_ids & second_ids
+
+
+def test_get_shop_products_bad_cursor(client, prepopulated_session):
+    """Test get shop products negative (malformed cursor)"""
+    # Given
+    headers = authorize(client, email="1_test@mail.com", password="1_qwerty1S")
+
+    # When
+    response = client.get("/products/shop_products?after=broken", headers=headers)
+
+    # Then
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_catalog_by_category(client, prepopulated_session):
+    """Test catalog returns only active products of the requested category, newest first"""
+    # Given
+    deactivated = Product.query.filter_by(category_id=1).first()
+    deactivated.is_active = False
+    prepopulated_session.merge(deactivated)
+    prepopulated_session.commit()
+
+    # When
+    response = client.get("/products/catalog?category_id=1")
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    json_data = response.get_json()
+    expected = Product.query.filter_by(category_id=1, is_active=True) \
+        .order_by(Product.time_added.desc(), Product.id.desc()).all()
+    assert [product["id"] for product in json_data["data"]] == [product.id for product in expected]
+    assert deactivated.id not in [product["id"] for product in json_data["data"]]
+    assert json_data["has_next"] is False
+
+
+def test_get_catalog_by_subcategory_price_pages(client, prepopulated_session):
+    """Test catalog pages sorted by price cover the subcategory exactly once"""
+    # Given
+    expected = Product.query.filter_by(sub_category_name="Сережки").count()
+
+    # When
+    pages = [client.get("/products/catalog?sub_category_id=21&sort=price_asc&limit=2").get_json()]
+    while pages[-1]["has_next"]:
+        pages.append(client.get(f"/products/catalog?sub_category_id=21&sort=price_asc&limit=2"
+                                f"&after={pages[-1]['next_cursor']}").get_json())
+
+    # Then
+    prices = [product["price"] for page in pages for product in page["data"]]
+    assert len(prices) == expected
+    assert prices == sorted(prices)
+    assert pages[0]["has_previous"] is False
+    assert all(page["has_previous"] for page in pages[1:])
+
+
+@pytest.mark.parametrize("query", (
+    "sort=cheapest",
+    "limit=0",
+    "category_id=1&sub_category_id=21",
+    "sub_category_id=99",
+    "after=broken",
+))
+def test_get_catalog_negative(client, prepopulated_session, query):
+    """Test catalog negative (bad filters, sort, limit or cursor)"""
+    # When
+    response = client.get(f"/products/catalog?{query}")
+
+    # Then
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_search_products(client, prepopulated_session):
+    """Test search products by name using prepopulated products"""
+    # When
+    response = client.get("/products/search?q=12_Test&limit=5")
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    json_data = response.get_json()
+    assert json_data["data"][0]["product_name"] == "12_Test Product Name"
+    assert len(json_data["data"]) == 1
+
+
+@pytest.mark.parametrize("query", ("", "q=", "q=%20", "q=test&limit=0", "q=test&offset=-1"))
+def test_search_products_negative(client, prepopulated_session, query):
+    """Test search products negative (missing query, bad limit or offset)"""
+    # When
+    response = client.get(f"/products/search?{query}")
+
+    # Then
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 def test_create_product_success_2(client, session):
     """Test create product scenario success"""
     # Given
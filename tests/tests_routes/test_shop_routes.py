@@ -1,12 +1,16 @@
+import base64
 import json
+from io import BytesIO
 from unittest.mock import patch
 
 import pytest
+from werkzeug.datastructures import FileStorage
 
 from models.shops import Shop
 from tests import status
 from tests.conftest import (authorize, TestValidData, create_user_shop_product,
                             create_user_and_shop, create_test_user)
+from utils.uploads import UploadRequest
 
 shop_routes = (
     {"route": "/shops/shop", "method": "POST"},
@@ -77,6 +81,25 @@ def test_create_update_shop_negative(client, session, payload, method):
     assert 'link' not in keys
 
 
+@pytest.mark.parametrize("method", ("create", "update"))
+def test_create_update_shop_name_taken(client, session, method):
+    """Test create and update shop scenario negative: Name taken by another shop in any case"""
+    # Given
+    create_user_and_shop(session, email="other@mail.com", shop_name="Срібна Крамниця")
+    if method == "update":
+        create_user_and_shop(session)
+    headers = authorize(client)
+    payload = {**TestValidData.get_shop_payload(), "name": "срібна КРАМНИЦЯ"}
+
+    # When
+    response = client.post('/shops/shop', json=payload, headers=headers)
+
+    # Then
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.get_json()["error"][0]["msg"] == \
+        "Value error, Shop with this name already exists"
+
+
 def test_update_shop_success(client, session):
     """Test update shop scenario success"""
     # Given
@@ -263,6 +286,93 @@ def test_get_shop_info_negative(client, session):
     assert json_data.get("error") == "Shop not found"
 
 
+def test_get_public_shop_page_success(client, prepopulated_session):
+    """Test public shop page returns the shop header and paginated product cards"""
+    # When
+    first_page = client.get('/shops/shop_info/1?limit=10').get_json()
+    second_page = client.get(f'/shops/shop_info/1?limit=10'
+                             f'&after={first_page["products"]["next_cursor"]}').get_json()
+
+    # Then
+    assert first_page["shop"]["id"] == 1
+    assert second_page["shop"] == first_page["shop"]
+    assert len(first_page["products"]["data"]) == 10
+    assert first_page["products"]["has_next"] is True
+    assert second_page["products"]["has_previous"] is True
+    first_ids = {product["id"] for product in first_page["products"]["data"]}
+    second_ids = {product["id"] for product in second_page["products"]["data"]}
+    assert len(first_ids | second_ids) == 20
+
+
+def test_get_public_shop_page_cached(client, prepopulated_session):
+    """Test repeated public shop page reads are served from cache"""
+    # Given
+    first = client.get('/shops/shop_info/1')
+
+    # When
+    with patch("routes.shops.get_shop_header") as get_shop_header, \
+            patch("routes.shops.get_shop_product_cards") as get_shop_product_cards:
+        second = client.get('/shops/shop_info/1')
+
+    # Then
+    assert get_shop_header.call_count == 0
+    assert get_shop_product_cards.call_count == 0
+    assert second.data == first.data
+
+
+def test_get_public_shop_page_cache_key(client, prepopulated_session):
+    """Test equal public shop pages share one cache entry whatever the query spelling"""
+    # Given
+    cursor = client.get('/shops/shop_info/1?limit=1').get_json()["products"]["next_cursor"]
+    time_added, product_id = json.loads(base64.urlsafe_b64decode(cursor))
+    spelled = base64.urlsafe_b64encode(json.dumps([time_added, str(product_id)]).encode())
+    first = client.get(f'/shops/shop_info/1?limit=100&after={cursor}')
+
+    # When
+    with patch("routes.shops.get_shop_product_cards") as get_shop_product_cards:
+        second = client.get(f'/shops/shop_info/1?limit=1000&after={spelled.decode()}')
+
+    # Then
+    assert get_shop_product_cards.call_count == 0
+    assert second.data == first.data
+
+
+def test_get_public_shop_page_invalidation(client, prepopulated_session):
+    """Test public shop page cache is dropped by shop and product writes"""
+    # Given
+    headers = authorize(client, email="1_test@mail.com", password="1_qwerty1S")
+    page = client.get('/shops/shop_info/1').get_json()
+    product_id = page["products"]["data"][0]["id"]
+
+    # When / Then: shop update
+    client.post('/shops/shop', json={"name": "Renamed shop"}, headers=headers)
+    assert client.get('/shops/shop_info/1').get_json()["shop"]["name"] == "Renamed shop"
+
+    # When / Then: product update and deactivation
+    client.put(f"/products/update/{product_id}", json={"product_name": "new name"},
+               headers=headers)
+    page = client.get('/shops/shop_info/1').get_json()
+    assert page["products"]["data"][0]["product_name"] == "new name"
+    client.delete(f"/products/deactivate/{product_id}", headers=headers)
+    page = client.get('/shops/shop_info/1').get_json()
+    assert product_id not in [product["id"] for product in page["products"]["data"]]
+
+
+@pytest.mark.parametrize("shop_id, query, expected_code", (
+    (1000, "", status.HTTP_404_NOT_FOUND),
+    (1, "?limit=0", status.HTTP_400_BAD_REQUEST),
+    (1, "?after=broken", status.HTTP_400_BAD_REQUEST),
+))
+def test_get_public_shop_page_negative(client, prepopulated_session, shop_id, query,
+                                       expected_code):
+    """Test public shop page negative: Shop not found, bad limit or cursor"""
+    # When
+    response = client.get(f'/shops/shop_info/{shop_id}{query}')
+
+    # Then
+    assert response.status_code == expected_code
+
+
 @pytest.mark.parametrize("routes", shop_routes)
 def test_shop_routes_unauthorized_negative(client, session, routes):
     """Test routes for unauthorized access scenario negative: Unauthorized"""
@@ -294,3 +404,43 @@ def test_shop_routes_empty_request_negative(client, session, routes):
     # Then
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert response.get_json().get("error") == "Invalid request data"
+
+
+@pytest.mark.parametrize("route, expected_status", [
+    ("/shops/shop_photo", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE),
+    ("/shops/shop_banner", status.HTTP_200_OK),
+])
+def test_upload_size_limit_per_route(client, session, route, expected_status):
+    """Test uploads over the route limit are rejected by Content-Length before parsing"""
+    # Given
+    create_user_shop_product(session)
+    headers = authorize(client)
+    image = FileStorage(stream=BytesIO(TestValidData.TEST_IMAGE_BYTES + bytes(4 * 1024 * 1024)),
+                        filename='example.jpg', content_type='image/jpeg')
+
+    # When
+    with patch("utils.uploads.UploadRequest._get_file_stream",
+               side_effect=UploadRequest._get_file_stream, autospec=True) as file_stream:
+        response = client.post(route, data={"image": image},
+                               content_type='multipart/form-data', headers=headers)
+
+    # Then
+    assert response.status_code == expected_status
+    assert file_stream.called == (expected_status == status.HTTP_200_OK)
+
+
+def test_upload_shop_photo_not_image(client, session):
+    """Test upload rejects a file whose content is no image, whatever its declared type"""
+    # Given
+    create_user_shop_product(session)
+    headers = authorize(client)
+    fake = FileStorage(stream=BytesIO(b'GIF89a not really a png'), filename='example.png',
+                       content_type='image/png')
+
+    # When
+    response = client.post('/shops/shop_photo', data={"image": fake},
+                           content_type='multipart/form-data', headers=headers)
+
+    # Then
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert Shop.query.one().photo_shop is None
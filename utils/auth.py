@@ -20,7 +20,7 @@ def token_required(f):
             }, 401
         try:
             data = jwt.decode(token, current_app.config["JWT_SECRET_KEY"], algorithms=["HS256"])
-            current_user = User.query.filter_by(id=data['id']).first()
+            current_user = User.get_user_by_id(data['id'])
 
             if current_user is None:
                 return {
@@ -0,0 +1,44 @@
+import uuid
+
+from flask import current_app, request
+
+from dependencies import cache
+
+
+def get_cache_version(version_key: str, timeout: int) -> str:
+    """Returns the token stored under version_key, a new one if it was dropped or expired"""
+    version = cache.get(version_key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(version_key, version, timeout=timeout)
+    return version
+
+
+def get_or_build_for_host(key: str, build, timeout: int) -> bytes:
+    """
+        Returns the response body cached under key for the current request host.
+
+        Cached bodies contain absolute URLs built by url_for, so each host gets
+        its own entry. Entries are keyed by the version token stored under key,
+        a single cache.delete(key) makes the bodies of every host unreachable,
+        including one being built while the resource changed.
+        The Host header is chosen by the client, only the hosts listed in
+        CACHED_RESPONSE_HOSTS (SERVER_NAME or the public hosts by default) are
+        cached, bodies for others are built per request. The cache backend is
+        shared by the workers, so an invalidation is seen by all of them.
+
+        Parameters:
+            key: Cache key of the resource.
+
+            build: Callable returning the body bytes on a cache miss.
+
+            timeout (int): Cache timeout in seconds.
+    """
+    if request.host not in current_app.config.get('CACHED_RESPONSE_HOSTS', ()):
+        return build()
+    body_key = f"{key}:{get_cache_version(key, timeout)}:{request.host_url}"
+    body = cache.get(body_key)
+    if body is None:
+        body = build()
+        cache.set(body_key, body, timeout=timeout)
+    return body
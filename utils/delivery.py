@@ -0,0 +1,57 @@
+import json
+from bisect import bisect_left
+
+from models.errors import NotFoundError
+from utils.utils import normalize_search_text
+from utils.watched_file import WatchedFile
+
+
+class DeliveryIndex(WatchedFile):
+    """
+    Process-wide, read-only city and branch index over a carrier's delivery JSON.
+
+    City names are normalized with normalize_search_text and kept in one
+    sorted list, so the cities starting with a prefix are a bisect away and
+    a lookup costs O(log n + limit). The file is parsed again whenever it changes.
+    Lookups raise NotFoundError while the file is missing.
+    """
+
+    def __init__(self, path):
+        # ([normalized city name], [city name], {normalized city name: (city name, [branch])})
+        super().__init__(path, ([], [], {}))
+
+    def _refresh(self):
+        try:
+            super()._refresh()
+        except FileNotFoundError as ex:
+            raise NotFoundError('Delivery data not found') from ex
+
+    def _load(self, raw: bytes):
+        branches: dict[str, tuple[str, list[dict]]] = {}
+        for city in json.loads(raw):
+            name = city['city_name']
+            branches.setdefault(normalize_search_text(name), (name, []))[1] \
+                .extend(city.get('branches', []))
+        keys = sorted(branches)
+        return keys, [branches[key][0] for key in keys], branches
+
+    def find_cities(self, prefix: str, limit: int) -> list[str]:
+        """Returns up to limit city names starting with prefix, ignoring case and apostrophes"""
+        self._refresh()
+        keys, names, _ = self._snapshot
+        prefix = normalize_search_text(prefix.strip())
+        start = bisect_left(keys, prefix)
+        found = []
+        for index in range(start, min(start + limit, len(keys))):
+            if not keys[index].startswith(prefix):
+                break
+            found.append(names[index])
+        return found
+
+    def get_branches(self, city: str, limit: int) -> tuple[str, list[dict]] | None:
+        """Returns the city name and up to limit of its branches, None if the city is unknown"""
+        self._refresh()
+        found = self._snapshot[2].get(normalize_search_text(city.strip()))
+        if found is None:
+            return None
+        return found[0], found[1][:limit]
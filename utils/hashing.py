@@ -0,0 +1,120 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import Flask
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from models.errors import ServiceBusyError
+
+TIMEOUT_MESSAGES = {
+    "generate": "Password hashing timed out",
+    "check": "Password check timed out",
+}
+
+
+class PasswordHasher:
+    """
+        Runs password hashing in a process pool with a bounded queue.
+
+        Hashing is deliberately slow and holds the GIL, so running it in the
+        request thread stalls every other request served by the worker. When
+        more than PASSWORD_HASH_MAX_PENDING hashes are queued or running,
+        new ones fail fast with ServiceBusyError instead of waiting.
+        With PASSWORD_HASH_WORKERS = 0 hashes run inline, still bounded.
+        A pool broken by a dead worker process is replaced and the hash
+        is submitted once more.
+
+        Parameters:
+            registry (CollectorRegistry): Registry the metrics are added to.
+    """
+
+    def __init__(self, registry: CollectorRegistry):
+        self.workers = 0
+        self.timeout = None
+        self._slots: threading.BoundedSemaphore | None = None
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+        self.queue_depth = Gauge("password_hash_queue_depth",
+                                 "Password hashes queued or running.",
+                                 registry=registry, multiprocess_mode="livesum")
+        self.duration = Histogram("password_hash_seconds",
+                                  "Password hash time including queueing in seconds.",
+                                  ("operation",), registry=registry)
+        self.rejected = Counter("password_hash_rejected",
+                                "Password hashes rejected because the queue was full.",
+                                registry=registry)
+
+    def init_app(self, app: Flask):
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 0)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT')
+        self._slots = threading.BoundedSemaphore(
+            app.config.get('PASSWORD_HASH_MAX_PENDING', max(self.workers, 1) * 4))
+
+    def generate(self, password: str) -> str:
+        return self._run("generate", generate_password_hash, password)
+
+    def check(self, password_hash: str, password: str) -> bool:
+        return self._run("check", check_password_hash, password_hash, password)
+
+    def _run(self, operation: str, func, *args):
+        if self._slots is None:
+            raise RuntimeError('PasswordHasher.init_app was not called')
+        if not self._slots.acquire(blocking=False):
+            self.rejected.inc()
+            raise ServiceBusyError('Too many password checks in progress')
+        start = time.perf_counter()
+        self.queue_depth.inc()
+        if not self.workers:
+            try:
+                return func(*args)
+            finally:
+                self._release(operation, start)
+        future = None
+        try:
+            for retry in (False, True):
+                executor = self._get_executor()
+                try:
+                    future = executor.submit(func, *args)
+                    return future.result(timeout=self.timeout)
+                except BrokenProcessPool as ex:
+                    future = None
+                    self._discard_executor(executor)
+                    if retry:
+                        raise ServiceBusyError('Password hashing is unavailable') from ex
+        except FutureTimeoutError as ex:
+            raise ServiceBusyError(
+                TIMEOUT_MESSAGES.get(operation, "Password hashing timed out")) from ex
+        finally:
+            if future is not None and not future.done():
+                # The slot is held until the hash finishes, even if the request gave up
+                future.add_done_callback(lambda _future: self._release(operation, start))
+            else:
+                self._release(operation, start)
+
+    def _release(self, operation: str, start: float):
+        self.queue_depth.dec()
+        if self._slots is not None:
+            self._slots.release()
+        self.duration.labels(operation).observe(time.perf_counter() - start)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use, so gunicorn workers each get their own pool
+        executor = self._executor
+        if executor is None:
+            with self._lock:
+                executor = self._executor
+                if executor is None:
+                    executor = self._executor = ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, Response, request, url_for
+from PIL import Image, ImageOps, UnidentifiedImageError
+from werkzeug.datastructures import FileStorage
+
+# Longest side in pixels of every variant generated next to an uploaded image
+IMAGE_VARIANTS = {
+    'thumb': 320,
+    'detail': 800,
+    'full': 1600,
+}
+# Variant format -> (file extension, Pillow save options)
+IMAGE_VARIANT_FORMATS = {
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+IMAGE_CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Stored images and their variants are named by the SHA-256 of the upload
+CONTENT_ADDRESSED_MEDIA = re.compile(r'^media/.+/[0-9a-f]{64}(_[a-z]+)?\.[a-z]+$')
+
+
+class _HashingWriter:
+    """File wrapper updating a digest with every chunk written through it"""
+
+    def __init__(self, file, digest):
+        self.file = file
+        self.digest = digest
+
+    def write(self, chunk: bytes):
+        self.digest.update(chunk)
+        return self.file.write(chunk)
+
+
+def shard_name(filename: str) -> str:
+    """Places a hex-named file two levels deep by its name prefix, abcd12.png -> ab/cd/abcd12.png"""
+    return f"{filename[0:2]}/{filename[2:4]}/{filename}"
+
+
+def store_image(photo: FileStorage, photo_path: str, extension: str) -> tuple[str, bool]:
+    """
+        Writes an upload under the SHA-256 of its content.
+
+        The upload is hashed while it is copied to a temporary file, which is
+        renamed into place unless a file with the same content is stored already.
+        Files are sharded into sub folders by hash prefix, see shard_name.
+        Returns the name relative to photo_path and whether a new file was created.
+    """
+    os.makedirs(photo_path, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=photo_path, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            photo.save(_HashingWriter(tmp, digest), buffer_size=IMAGE_CHUNK_SIZE)
+        filename = shard_name(f"{digest.hexdigest()}.{extension}")
+        path = os.path.join(photo_path, filename)
+        if os.path.exists(path):
+            # A fresh mtime keeps flask media gc from collecting it, or its
+            # variants, before the commit
+            for file_path in image_files(path):
+                if os.path.exists(file_path):
+                    os.utime(file_path)
+            return filename, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return filename, True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def cache_immutable_media(response: Response) -> Response:
+    """Lets clients cache content-addressed media forever, their content never changes"""
+    if request.endpoint == 'static' and response.status_code in (200, 304) and \
+            CONTENT_ADDRESSED_MEDIA.match((request.view_args or {}).get('filename', '')):
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+def media_url(folder: str, name: str | None) -> str | None:
+    """Returns the absolute URL of an image stored in static/media/folder, None without one"""
+    if name:
+        return url_for('static', filename=f'media/{folder}/{name}', _external=True)
+    return name
+
+
+def image_variant_name(original: str, variant: str, image_format: str) -> str:
+    """Returns the name (or URL) of a variant of the original image, abc.png -> abc_thumb.webp"""
+    stem = original.rsplit('.', 1)[0]
+    return f"{stem}_{variant}.{IMAGE_VARIANT_FORMATS[image_format][0]}"
+
+
+def image_variant_urls(original_url: str | None) -> dict | None:
+    """Maps variant -> format -> URL for the URL of an uploaded image"""
+    if not original_url:
+        return None
+    return {variant: {image_format: image_variant_name(original_url, variant, image_format)
+                      for image_format in IMAGE_VARIANT_FORMATS}
+            for variant in IMAGE_VARIANTS}
+
+
+def image_files(path: str) -> list[str]:
+    """Returns the path of an uploaded image followed by the paths of its variants"""
+    return [path] + [image_variant_name(path, variant, image_format)
+                     for variant in IMAGE_VARIANTS
+                     for image_format in IMAGE_VARIANT_FORMATS]
+
+
+def remove_image(path: str):
+    """Removes an uploaded image together with its variants"""
+    for file_path in image_files(path):
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+
+
+def generate_image_variants(path: str):
+    """
+        Writes every variant of the image at path next to it.
+
+        Each file is written under a temporary name and renamed into place,
+        so a variant URL serves either nothing or the complete file.
+    """
+    with Image.open(path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = 'transparency' in image.info or 'A' in image.getbands()
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        # JPEG has no alpha, transparent areas become white
+        flat = image
+        if image.mode == 'RGBA':
+            flat = Image.new('RGB', image.size, (255, 255, 255))
+            flat.paste(image, mask=image.getchannel('A'))
+
+        for variant, size in IMAGE_VARIANTS.items():
+            for image_format, (_extension, options) in IMAGE_VARIANT_FORMATS.items():
+                resized = (flat if image_format == 'jpeg' else image).copy()
+                resized.thumbnail((size, size), Image.LANCZOS)
+                variant_path = image_variant_name(path, variant, image_format)
+                tmp_path = f"{variant_path}.tmp"
+                resized.save(tmp_path, format=image_format.upper(), **options)
+                os.replace(tmp_path, variant_path)
+
+
+class ImagePipeline:
+    """
+        Generates image variants on a background thread pool.
+
+        Uploads return as soon as the original is stored. Until its variants
+        are written their URLs return 404, clients fall back to the original.
+        With IMAGE_VARIANT_WORKERS = 0 variants are generated inline.
+    """
+
+    def __init__(self):
+        self.workers = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask):
+        self.workers = app.config.get('IMAGE_VARIANT_WORKERS', 0)
+
+    def submit(self, path: str):
+        if not self.workers:
+            self._generate(path)
+            return None
+        return self._get_executor().submit(self._generate, path)
+
+    @staticmethod
+    def _generate(path: str):
+        try:
+            generate_image_variants(path)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as ex:
+            logging.error("Image variants for %s were not generated: %s", path, ex)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers,
+                                                        thread_name_prefix="image-variants")
+        return self._executor
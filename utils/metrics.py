@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+
+import psutil
+from flask import Flask, g, has_request_context, request
+from prometheus_client import CollectorRegistry, Gauge, Histogram, make_wsgi_app, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SYSTEM_METRICS_INTERVAL = 5.0
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+QUERY_TIME_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0)
+
+
+def make_metrics_app(registry: CollectorRegistry):
+    """
+        Returns the WSGI app serving /healthcheck.
+
+        With PROMETHEUS_MULTIPROC_DIR set (see config/gunicorn.py) every worker
+        writes its values to mmap'd files in that directory, and a scrape
+        aggregates the files of all workers instead of reading the registry of
+        the worker that happened to answer.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return make_wsgi_app(registry=registry)
+
+
+class SystemMetricsSampler:
+    """
+        Samples host and worker process usage on a daemon thread.
+
+        Scrapes of /healthcheck only read the last sampled values, so they
+        never block a worker. CPU usage is the average over the last interval.
+
+        Parameters:
+            registry (CollectorRegistry): Registry the gauges are added to.
+
+            interval (float): Seconds between samples.
+    """
+
+    def __init__(self, registry: CollectorRegistry,
+                 interval: float = SYSTEM_METRICS_INTERVAL):
+        self.interval = interval
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.ram_metric = Gauge("memory_usage_percent", "Memory usage in percent.",
+                                registry=registry, multiprocess_mode="livemostrecent")
+        self.cpu_metric = Gauge("cpu_usage_percent", "CPU usage percent.",
+                                registry=registry, multiprocess_mode="livemostrecent")
+        self.rss_metric = Gauge("worker_resident_memory_bytes",
+                                "Resident memory of the worker process in bytes.",
+                                registry=registry, multiprocess_mode="liveall")
+        self.fds_metric = Gauge("worker_open_fds",
+                                "Open file descriptors of the worker process.",
+                                registry=registry, multiprocess_mode="liveall")
+        self.threads_metric = Gauge("worker_threads",
+                                    "Threads of the worker process.",
+                                    registry=registry, multiprocess_mode="liveall")
+
+    def sample(self):
+        """Reads current usage into the gauges without blocking"""
+        self.cpu_metric.set(psutil.cpu_percent(interval=None))
+        self.ram_metric.set(psutil.virtual_memory().percent)
+        with self._process.oneshot():
+            self.rss_metric.set(self._process.memory_info().rss)
+            self.fds_metric.set(self._process.num_fds())
+            self.threads_metric.set(self._process.num_threads())
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="system-metrics-sampler",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except psutil.Error:
+                continue
+
+
+class RequestMetrics:
+    """
+        Records request latency and SQL usage per endpoint.
+
+        Endpoints are labelled by their Flask endpoint name (e.g.
+        "products_route.get_catalog"), requests matching no route by "unmatched".
+        SQL statements are timed with engine cursor events and attributed to
+        the request running them.
+
+        Parameters:
+            registry (CollectorRegistry): Registry the metrics are added to.
+    """
+
+    def __init__(self, registry: CollectorRegistry):
+        self.latency = Histogram("http_request_duration_seconds",
+                                 "Request latency in seconds.",
+                                 ("endpoint", "method", "status"), registry=registry)
+        self.in_progress = Gauge("http_requests_in_progress",
+                                 "Requests currently being handled.",
+                                 ("endpoint", "method"), registry=registry,
+                                 multiprocess_mode="livesum")
+        self.query_count = Histogram("db_queries_per_request",
+                                     "SQL statements executed per request.",
+                                     ("endpoint",), buckets=QUERY_COUNT_BUCKETS,
+                                     registry=registry)
+        self.query_time = Histogram("db_query_seconds_per_request",
+                                    "Total SQL statement time per request in seconds.",
+                                    ("endpoint",), buckets=QUERY_TIME_BUCKETS,
+                                    registry=registry)
+
+    def init_app(self, app: Flask):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _handle_error)
+
+    @staticmethod
+    def _endpoint() -> str:
+        return request.endpoint or "unmatched"
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_query_count = 0
+        g.metrics_query_time = 0.0
+        self.in_progress.labels(self._endpoint(), request.method).inc()
+
+    def _after_request(self, response):
+        if "metrics_start" in g:
+            endpoint = self._endpoint()
+            self.latency.labels(endpoint, request.method, response.status_code).observe(
+                time.perf_counter() - g.metrics_start)
+            self.query_count.labels(endpoint).observe(g.metrics_query_count)
+            self.query_time.labels(endpoint).observe(g.metrics_query_time)
+        return response
+
+    def _teardown_request(self, _exception):
+        if g.pop("metrics_start", None) is not None:
+            self.in_progress.labels(self._endpoint(), request.method).dec()
+
+
+def _before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+    start = conn.info["query_start_time"].pop()
+    if has_request_context() and "metrics_start" in g:
+        g.metrics_query_count += 1
+        g.metrics_query_time += time.perf_counter() - start
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute, its start time is dropped here
+    starts = context.connection.info.get("query_start_time") if context.connection else None
+    if context.execution_context is not None and starts:
+        starts.pop()
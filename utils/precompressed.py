@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+
+from flask import Response, request
+
+from utils.watched_file import WatchedFile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip is always offered
+    brotli = None
+
+
+class PrecompressedFile(WatchedFile):
+    """
+    Process-wide, read-only copy of a static file with its compressed encodings.
+
+    The file is read and compressed once, and again whenever it changes.
+    Strong ETags are derived from the file content and suffixed with the
+    encoding of the compressed bodies.
+    """
+
+    def __init__(self, path, mimetype="application/json"):
+        # (etag, {content encoding: body}), identity is the raw file
+        super().__init__(path, ("", {}))
+        self.mimetype = mimetype
+
+    def _load(self, raw: bytes):
+        return compress_bodies(raw)
+
+    def make_response(self, download_name=None) -> Response:
+        """Answers the current request with the file, see make_precompressed_response"""
+        self._refresh()
+        etag, bodies = self._snapshot
+        return make_precompressed_response(etag, bodies, self.mimetype, download_name)
+
+
+def compress_bodies(raw: bytes) -> tuple[str, dict[str, bytes]]:
+    """Returns the ETag of raw and {content encoding: body}, identity is raw itself"""
+    bodies = {"identity": raw}
+    compressed = {"gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(raw, quality=11)
+    bodies.update((encoding, body) for encoding, body in compressed.items()
+                  if len(body) < len(raw))
+    return hashlib.sha256(raw).hexdigest()[:32], bodies
+
+
+def make_precompressed_response(etag: str, bodies: dict[str, bytes], mimetype: str,
+                                download_name=None) -> Response:
+    """
+    Answers the current request with the best encoding the client accepts.
+
+    Clients holding the current ETag get an empty 304. The response must be
+    revalidated before reuse, so a changed file is seen on the next request.
+    """
+    encoding = next((name for name in ("br", "gzip")
+                     if name in bodies and request.accept_encodings[name]), "identity")
+    # Strong validators differ per encoding, any of them names the current content
+    etags = {name: etag if name == "identity" else f"{etag}-{name}" for name in bodies}
+
+    response = Response(mimetype=mimetype)
+    response.set_etag(etags[encoding])
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    if download_name:
+        response.headers["Content-Disposition"] = f"attachment; filename={download_name}"
+    if any(request.if_none_match.contains(value) for value in etags.values()):
+        response.status_code = 304
+        return response
+    response.set_data(bodies[encoding])
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,107 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from flask import Flask, current_app
+
+from dependencies import cache
+from models.accounts import RevokedToken
+
+LOOKUP_CACHE_MAX_SIZE = 10000
+
+
+class RevocationStore(ABC):
+    """
+        Stores revoked JWT ids until the token itself expires.
+
+        Backends are selected with the JWT_REVOCATION_STORE config value, see
+        init_revocation_store.
+    """
+
+    @abstractmethod
+    def revoke(self, jti: str, expires_at: int):
+        """Marks the token id revoked until expires_at, a unix timestamp"""
+
+    @abstractmethod
+    def is_revoked(self, jti: str) -> bool:
+        """Tells whether the token id was revoked"""
+
+
+class CacheRevocationStore(RevocationStore):
+    """Keeps revoked ids in dependencies.cache, visible to the current process only"""
+
+    def revoke(self, jti: str, expires_at: int):
+        cache.set(jti, "1", timeout=max(int(expires_at - time.time()), 1))
+
+    def is_revoked(self, jti: str) -> bool:
+        return cache.get(jti) is not None
+
+
+class DatabaseRevocationStore(RevocationStore):
+    """
+        Keeps revoked ids in the revoked_tokens table shared by all workers.
+
+        Lookups are cached in process: revoked ids until their expiry, ids
+        found not revoked for negative_ttl seconds. A token revoked on another
+        worker is therefore rejected here at most negative_ttl seconds later,
+        while a token revoked on this worker is rejected immediately.
+
+        Parameters:
+            negative_ttl (float): Seconds a "not revoked" answer is trusted.
+    """
+
+    def __init__(self, negative_ttl: float):
+        self.negative_ttl = negative_ttl
+        # jti -> expiry of the token, epoch seconds
+        self._revoked: dict[str, float] = {}
+        # jti -> time.monotonic() deadline of the "not revoked" answer
+        self._not_revoked: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: int):
+        RevokedToken.revoke(jti, expires_at)
+        with self._lock:
+            self._not_revoked.pop(jti, None)
+            self._prune(self._revoked, time.time())
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti: str) -> bool:
+        if jti in self._revoked:
+            return True
+        if self._not_revoked.get(jti, 0) > time.monotonic():
+            return False
+        expires_at = RevokedToken.get_expires_at(jti)
+        revoked = expires_at is not None
+        with self._lock:
+            if revoked:
+                self._prune(self._revoked, time.time())
+                self._revoked[jti] = expires_at
+            elif self.negative_ttl > 0:
+                self._prune(self._not_revoked, time.monotonic())
+                self._not_revoked[jti] = time.monotonic() + self.negative_ttl
+        return revoked
+
+    @staticmethod
+    def _prune(entries: dict, now: float):
+        if len(entries) < LOOKUP_CACHE_MAX_SIZE:
+            return
+        for key in [key for key, deadline in entries.items() if deadline <= now]:
+            del entries[key]
+        if len(entries) >= LOOKUP_CACHE_MAX_SIZE:
+            entries.clear()
+
+
+def init_revocation_store(app: Flask):
+    backend = app.config.get('JWT_REVOCATION_STORE', 'database')
+    store: RevocationStore
+    if backend == 'cache':
+        store = CacheRevocationStore()
+    elif backend == 'database':
+        store = DatabaseRevocationStore(app.config.get('JWT_REVOCATION_NEGATIVE_TTL', 5))
+    else:
+        raise ValueError(f'Unknown JWT_REVOCATION_STORE: {backend}')
+    app.extensions['revocation_store'] = store
+
+
+def get_revocation_store() -> RevocationStore:
+    return current_app.extensions['revocation_store']
@@ -0,0 +1,66 @@
+import json
+
+from flask import Response, request
+from pydantic import TypeAdapter
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - MessagePack is optional, JSON is always offered
+    msgpack = None
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+PRETTY_INDENT = 4
+_TYPE_ADAPTERS: dict[type, TypeAdapter] = {}
+
+
+def get_type_adapter(value_type: type) -> TypeAdapter:
+    """Returns the TypeAdapter of value_type, its serializer is built once per type"""
+    adapter = _TYPE_ADAPTERS.get(value_type)
+    if adapter is None:
+        adapter = _TYPE_ADAPTERS.setdefault(value_type, TypeAdapter(value_type))
+    return adapter
+
+
+def _response_mimetype() -> str:
+    if msgpack is None:
+        return JSON_MIMETYPE
+    return request.accept_mimetypes.best_match((JSON_MIMETYPE, *MSGPACK_MIMETYPES),
+                                               default=JSON_MIMETYPE)
+
+
+def _is_pretty() -> bool:
+    return request.args.get("pretty") in ("1", "true")
+
+
+def _make_response(body: bytes, mimetype: str, status: int) -> Response:
+    response = Response(body, mimetype=mimetype, status=status)
+    if msgpack is not None:
+        response.vary.add("Accept")
+    return response
+
+
+def json_response(value, status: int = 200) -> Response:
+    """
+        Serializes a pydantic model, or plain data pydantic can serialize, for the current request.
+
+        The body is compact JSON, indented JSON with ?pretty=1, or MessagePack
+        when the Accept header prefers it and the msgpack package is installed.
+    """
+    adapter = get_type_adapter(type(value))
+    mimetype = _response_mimetype()
+    if mimetype in MSGPACK_MIMETYPES:
+        body = msgpack.packb(adapter.dump_python(value, mode="json"))
+    else:
+        body = adapter.dump_json(value, indent=PRETTY_INDENT if _is_pretty() else None)
+    return _make_response(body, mimetype, status)
+
+
+def json_body_response(body: bytes, status: int = 200) -> Response:
+    """Like json_response for a compact JSON body encoded earlier, e.g. a cached one"""
+    mimetype = _response_mimetype()
+    if mimetype in MSGPACK_MIMETYPES:
+        body = msgpack.packb(json.loads(body))
+    elif _is_pretty():
+        body = json.dumps(json.loads(body), indent=PRETTY_INDENT, ensure_ascii=False).encode()
+    return _make_response(body, mimetype, status)
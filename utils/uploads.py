@@ -0,0 +1,80 @@
+import tempfile
+from functools import wraps
+
+from flask import Request, request
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from utils.images import IMAGE_CHUNK_SIZE
+
+PHOTO_MAX_FILE_SIZE = 3 * 1024 * 1024
+BANNER_MAX_FILE_SIZE = 5 * 1024 * 1024
+# Multipart boundaries, part headers and small form fields sent next to the file
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+# Leading bytes of every accepted image format -> stored file extension
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+)
+IMAGE_HEADER_SIZE = 12
+
+
+def file_too_large_message(max_file_size: int) -> str:
+    return f"File size too large. Maximum file size is {round(max_file_size / 1048576)}MB."
+
+
+def detect_image_type(photo: FileStorage) -> str | None:
+    """Returns the extension matching the first bytes of the upload, None if it is no image"""
+    header = photo.stream.read(IMAGE_HEADER_SIZE)
+    photo.stream.seek(0)
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    if header[0:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class UploadRequest(Request):
+    """
+        Request with a per route body limit and bounded memory for uploaded files.
+
+        upload_limit, set by limit_upload, replaces MAX_CONTENT_LENGTH: werkzeug
+        rejects a larger Content-Length before reading the body and stops
+        reading a body sent without one at the limit. Uploaded files are kept
+        in memory up to one chunk and spill to a temporary file beyond it.
+    """
+    upload_limit: int | None = None
+
+    @property
+    def max_content_length(self) -> int | None:
+        if self.upload_limit is not None:
+            return self.upload_limit
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=IMAGE_CHUNK_SIZE, mode='rb+')
+
+
+def limit_upload(max_file_size: int):
+    """
+        Rejects request bodies larger than a max_file_size upload with 413.
+
+        The form is parsed here, before the view, so the view reads the
+        already parsed request.files.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            request.upload_limit = max_file_size + UPLOAD_FORM_OVERHEAD
+            try:
+                # Reading request.files parses the body, while the limit above applies
+                _ = request.files
+            except RequestEntityTooLarge:
+                return {"error": file_too_large_message(max_file_size)}, 413
+            return f(*args, **kwargs)
+
+        return decorated
+
+    return decorator
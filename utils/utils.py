@@ -1,37 +1,58 @@
+import base64
+import binascii
 import json
 import os
-import uuid
+from datetime import datetime
 from os import SEEK_END
 
 from werkzeug.datastructures import FileStorage
 
 from config import Config
+from dependencies import image_pipeline
 from models.errors import BadFileTypeError, FileTooLargeError, NoImageError
+from models.media import MediaFile
+from utils.images import image_files, store_image
+from utils.uploads import (BANNER_MAX_FILE_SIZE, PHOTO_MAX_FILE_SIZE, detect_image_type,
+                           file_too_large_message)
 from validation.products import get_subcategory_id
 
 
+# Apostrophes are dropped so "пʼять" and "п'ять" become one token, and letters
+# users commonly swap when typing Ukrainian are folded to one form.
+_SEARCH_TEXT_FOLDING = str.maketrans({
+    "'": None, "ʼ": None, "’": None, "‘": None, "`": None,
+    "ґ": "г", "є": "е", "і": "и", "ї": "и",
+})
+
+
 def allowed_file(filename):
     return '.' in filename and \
         filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg'}
 
 
-def serialize_pydantic_response_error(obj):
-    if obj is None:
-        return {}
-    if hasattr(obj, '__dict__'):
-        serialized_data = {key: value for key, value in obj.__dict__.items() if not
-        key.startswith('_')}
-        missing_attrs = set(obj.__dict__.keys()) - set(serialized_data.keys())
-        for attr in missing_attrs:
-            serialized_data[attr] = None
-        return serialized_data
-    if hasattr(obj, '__slots__'):
-        serialized_data = {attr: getattr(obj, attr) for attr in obj.__slots__}
-        missing_attrs = set(obj.__slots__) - set(serialized_data.keys())
-        for attr in missing_attrs:
-            serialized_data[attr] = None
-        return serialized_data
-    return {}
+def encode_cursor(*values) -> str:
+    """Packs the sort key of the last row on a page into an opaque cursor string"""
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value
+                      for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Unpacks a cursor created by encode_cursor. Raises ValueError if it is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError) as ex:
+        raise ValueError('Invalid cursor') from ex
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def normalize_search_text(value: str | None) -> str:
+    """Case-folds Ukrainian text and removes the differences search should ignore"""
+    if not value:
+        return ''
+    return value.casefold().translate(_SEARCH_TEXT_FOLDING)
 
 
 # TODO: better replace in models
@@ -52,71 +73,12 @@ def serialize_product(**data):
 
 # TODO: better replace in models
 def product_info_serialize(products):
-    result = []
-    unique_product_ids = set()
-
-    for product, product_detail, _product_photo in products:
-        if product.id not in unique_product_ids:
-            photos = [photo.serialize()
-                      for photo in product_detail.product_to_photo]
-
-            try:
-                product_characteristics = json.loads(
-                    product_detail.product_characteristic) if (
-                        product_detail.product_characteristic is not None) else None
-            except ValueError as ex:
-                raise ValueError("product_characteristics", ex) from ex
-
-            try:
-                method_of_payment = json.loads(
-                    product_detail.method_of_payment) if (
-                        product_detail.method_of_payment is not None) else None
-            except ValueError as ex:
-                raise ValueError("method_of_payment", ex) from ex
-
-            try:
-                delivery_post = json.loads(product_detail.delivery_post) \
-                    if product_detail.delivery_post is not None else None
-            except ValueError as ex:
-                raise ValueError("delivery_post", ex) from ex
-
-            product_data = {
-                "id": product.id,
-                "category_id": product.category_id,
-                "sub_category_id": get_subcategory_id(product.sub_category_name),
-                "shop_id": product.shop_id,
-                "product_name": product.product_name,
-                "product_description": product.product_description,
-                "time_added": product.time_added,
-                "time_modifeid": product.time_modifeid,
-                "is_active": product.is_active,
-                "price": product_detail.price,
-                "product_status": product_detail.product_status,
-
-                "product_characteristic": product_characteristics,
-
-                "is_return": product_detail.is_return,
-
-                "delivery_post": delivery_post,
-
-                "method_of_payment": method_of_payment,
-
-                "is_unique": product_detail.is_unique,
-                "photos": [{
-                    "id": photo.get('id'),
-                    "product_photo": photo.get("product_photo"),
-                    "timestamp": photo.get('timestamp'),
-                    "main": photo.get('main')
-                } for photo in photos]
-            }
-
-            result.append(product_data)
-            unique_product_ids.add(product.id)
-
-    return result
-
-
-def product_info_serialize_by_id(product, product_detail, _product_photo):
+    """Serializes (Product, ProductDetail) pairs whose photos are already loaded"""
+    return [product_info_serialize_by_id(product, product_detail)
+            for product, product_detail in products]
+
+
+def product_info_serialize_by_id(product, product_detail):
     photos = [photo.serialize() for photo in product_detail.product_to_photo]
 
     try:
@@ -176,6 +138,10 @@ def load_and_save_image(image_field, photo: FileStorage, photo_path):
     """
         Load and save images.
 
+        Images are stored under the hash of their content, so identical uploads
+        share one file. The new file gains a reference and the file named by
+        image_field loses one, see models.media.MediaFile.
+
         Parameters:
             image_field: Model field for image.
 
@@ -186,6 +152,8 @@ def load_and_save_image(image_field, photo: FileStorage, photo_path):
 
         Raises:
             FileTooLargeException: If the size of the image exceeds the maximum allowed size.
+
+            BadFileTypeError: If the file does not start like a PNG, JPEG or WebP image.
     """
 
     if not photo:
@@ -193,28 +161,32 @@ def load_and_save_image(image_field, photo: FileStorage, photo_path):
 
     banner_shop_path = os.path.join(Config.MEDIA_PATH, 'banner_shops')
     if photo_path == banner_shop_path:
-        max_file_size = 5242880
+        max_file_size = BANNER_MAX_FILE_SIZE
     else:
-        max_file_size = 3145728
+        max_file_size = PHOTO_MAX_FILE_SIZE
     file_size = photo.seek(0, SEEK_END)
     if file_size > max_file_size:
-        raise FileTooLargeError(
-            f"File size too large. Maximum file size is {round(max_file_size / 1048576)}MB.")
+        raise FileTooLargeError(file_too_large_message(max_file_size))
     # Return cursor to 0. Without seek(0) file will be broken.
     photo.seek(0)
 
-    file_type, file_extension = photo.content_type.split("/")
-    if file_type != "image" or file_extension not in ('png', 'jpg', 'jpeg', 'webp'):
+    file_type = photo.content_type.split("/")[0]
+    # The stored type comes from the file content, the declared one is only a hint
+    file_extension = detect_image_type(photo)
+    if file_type != "image" or file_extension is None:
         raise BadFileTypeError(
             "Bad request. Does file have proper file format?")
 
-    file_name = uuid.uuid4().hex
-    file_path = os.path.join(
-        photo_path, f"{file_name}.{file_extension}")
+    image_path, created = store_image(photo, photo_path, file_extension)
+    MediaFile.acquire(photo_path, image_path)
+    path = os.path.join(photo_path, image_path)
+    if not os.path.exists(path):
+        # Released and removed after store_image found it. Files are only removed under
+        # the write lock acquire() now holds, so once stored again the file stays.
+        photo.seek(0)
+        image_path, created = store_image(photo, photo_path, file_extension)
     if image_field:
-        old_file_path = os.path.join(photo_path, image_field)
-        if os.path.isfile(old_file_path):
-            os.remove(old_file_path)
-    image_path = f"{file_name}.{file_extension}"
-    photo.save(file_path)
+        MediaFile.release(photo_path, image_field)
+    if created or not all(os.path.exists(file_path) for file_path in image_files(path)):
+        image_pipeline.submit(path)
     return image_path
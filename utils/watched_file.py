@@ -0,0 +1,44 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class WatchedFile(ABC):
+    """
+    Process-wide, read-only data built from a file and rebuilt when its mtime changes.
+
+    Subclasses implement _load, turning the file content into the snapshot
+    their lookups read. The mtime is checked at most once per CHECK_INTERVAL
+    seconds, so between checks a lookup costs a plain attribute read.
+
+    Parameters:
+        path (str): Path of the watched file.
+
+        empty: Snapshot used until the file is first loaded.
+    """
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self, path, empty):
+        self.path = path
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._mtime = None
+        self._snapshot = empty
+
+    @abstractmethod
+    def _load(self, raw: bytes):
+        """Returns the snapshot built from the file content"""
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.CHECK_INTERVAL:
+            return
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime_ns
+            self._checked_at = now
+            if mtime == self._mtime:
+                return
+            with open(self.path, 'rb') as file:
+                self._snapshot = self._load(file.read())
+            self._mtime = mtime
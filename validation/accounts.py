@@ -143,6 +143,7 @@ class ChangePasswordSchema(BaseModel):
 
 
 class UserInfoSchema(BaseModel):
+    """Fields of the /accounts/info response, the account page reads no others"""
     full_name: str
     email: str
     profile_picture: Optional[str] = None
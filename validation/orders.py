@@ -1 +1,43 @@
-"""It will be described when orders are created"""
\ No newline at end of file
+from pydantic import BaseModel, field_validator
+
+MAX_DELIVERY_LOOKUP_LIMIT = 100
+
+
+def _validate_limit(value: int) -> int:
+    if value < 1 or value > MAX_DELIVERY_LOOKUP_LIMIT:
+        raise ValueError(f'Limit must be between 1 and {MAX_DELIVERY_LOOKUP_LIMIT}')
+    return value
+
+
+class CityQueryValid(BaseModel):
+    prefix: str = ''
+    limit: int = 20
+
+    @field_validator('prefix')
+    @staticmethod
+    def prefix_validator(value: str) -> str:
+        if len(value) > 100:
+            raise ValueError('City prefix must be at most 100 characters')
+        return value
+
+    @field_validator('limit')
+    @staticmethod
+    def limit_validator(value: int) -> int:
+        return _validate_limit(value)
+
+
+class BranchQueryValid(BaseModel):
+    city: str
+    limit: int = 50
+
+    @field_validator('city')
+    @staticmethod
+    def city_validator(value: str) -> str:
+        if not value.strip() or len(value) > 100:
+            raise ValueError('City must be between 1 and 100 characters')
+        return value
+
+    @field_validator('limit')
+    @staticmethod
+    def limit_validator(value: int) -> int:
+        return _validate_limit(value)
@@ -6,8 +6,12 @@ from enum import Enum
 from pathlib import Path
 from typing import Dict, Optional
 
-from flask import url_for
-from pydantic import BaseModel, ConfigDict, field_validator
+from flask import Response, url_for
+from pydantic import BaseModel, ConfigDict, computed_field, field_validator
+
+from utils.images import image_variant_urls
+from utils.precompressed import compress_bodies, make_precompressed_response
+from utils.watched_file import WatchedFile
 
 
 class SubCategoryEnum(str, Enum):
@@ -117,6 +121,54 @@ class UpdateProductValid(BaseModel):
         return value
 
 
+class CatalogSortEnum(str, Enum):
+    newest = 'newest'
+    price_asc = 'price_asc'
+    price_desc = 'price_desc'
+
+
+class CatalogQueryValid(BaseModel):
+    category_id: Optional[int] = None
+    sub_category_id: Optional[int] = None
+    sort: CatalogSortEnum = CatalogSortEnum.newest
+    limit: int = 30
+    after: Optional[str] = None
+
+    @field_validator('limit')
+    @staticmethod
+    def limit_validator(value: int) -> int:
+        if value < 1:
+            raise ValueError('Limit must be a positive number')
+        return value
+
+
+class SearchQueryValid(BaseModel):
+    q: str
+    limit: int = 30
+    offset: int = 0
+
+    @field_validator('q')
+    @staticmethod
+    def query_validator(value: str) -> str:
+        if not value.strip() or len(value) > 100:
+            raise ValueError('Search query must be between 1 and 100 characters')
+        return value
+
+    @field_validator('limit')
+    @staticmethod
+    def limit_validator(value: int) -> int:
+        if value < 1:
+            raise ValueError('Limit must be a positive number')
+        return value
+
+    @field_validator('offset')
+    @staticmethod
+    def offset_validator(value: int) -> int:
+        if value < 0:
+            raise ValueError('Offset must not be negative')
+        return value
+
+
 class PhotoProductValid(BaseModel):
     product_photo: str
     main: bool
@@ -137,6 +189,11 @@ class ProductPhotoSchema(BaseModel):
                         _external=True)
         return image
 
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def variants(self) -> Optional[dict[str, dict[str, str]]]:
+        return image_variant_urls(self.product_photo)
+
 
 class ProductInfoSchema(BaseModel):
     id: int
@@ -173,6 +230,7 @@ class PaginatedDetailProductSchema(BaseModel):
     has_previous: bool = False
     has_next: bool = False
     total_pages: int = 0
+    next_cursor: Optional[str] = None
     data: list[DetailProductInfoSchema]
 
 
@@ -180,38 +238,74 @@ class PaginatedProductSchema(BaseModel):
     has_previous: bool = False
     has_next: bool = False
     total_pages: int = 0
+    next_cursor: Optional[str] = None
     data: list[ProductInfoSchema]
 
 
-def get_subcategory_name(category_id, subcategory_id):
-    static_path = os.path.join(
-        Path(__file__).parent.parent, "static/categories/categories.json")
-    with open(static_path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
-
-    if str(category_id) not in data:
-        raise ValueError('The category with the specified ID does not exist')
-
-    subcategories = data[str(category_id)]['subcategories']
-    subcategory_name = subcategories.get(str(subcategory_id))
+class CategoryIndex(WatchedFile):
+    """
+    Process-wide, read-only index over categories.json.
+
+    The file is parsed into id -> name and name -> id maps, again whenever
+    it changes, so lookups are plain dict reads. The same snapshot keeps the
+    file's compressed encodings served by /categories/categories.
+    """
+
+    def __init__(self, path):
+        # ({category_id: category}, {subcategory_name: subcategory_id},
+        #  {subcategory_id: subcategory_name}, (etag, {content encoding: body}))
+        super().__init__(path, ({}, {}, {}, ("", {})))
+
+    def _load(self, raw: bytes):
+        categories = json.loads(raw)
+        subcategory_ids: dict[str, int] = {}
+        subcategory_names: dict[str, str] = {}
+        for category_data in categories.values():
+            for subcategory_id, name in category_data.get('subcategories', {}).items():
+                subcategory_ids.setdefault(name, int(subcategory_id))
+                subcategory_names[subcategory_id] = name
+        return categories, subcategory_ids, subcategory_names, compress_bodies(raw)
+
+    def make_response(self, download_name=None) -> Response:
+        """Answers the current request with categories.json, see make_precompressed_response"""
+        self._refresh()
+        etag, bodies = self._snapshot[3]
+        return make_precompressed_response(etag, bodies, "application/json", download_name)
+
+    def get_subcategory_name(self, category_id, subcategory_id) -> str:
+        self._refresh()
+        category = self._snapshot[0].get(str(category_id))
+        if category is None:
+            raise ValueError('The category with the specified ID does not exist')
+
+        subcategory_name = category['subcategories'].get(str(subcategory_id))
+        if subcategory_name is None:
+            raise ValueError(
+                'The subcategory with the specified ID does not belong to the category')
+        return subcategory_name
+
+    def get_subcategory_name_by_id(self, subcategory_id) -> str:
+        self._refresh()
+        subcategory_name = self._snapshot[2].get(str(subcategory_id))
+        if subcategory_name is None:
+            raise ValueError('The subcategory with the specified ID does not exist')
+        return subcategory_name
+
+    def get_subcategory_id(self, subcategory_name) -> int:
+        self._refresh()
+        subcategory_id = self._snapshot[1].get(subcategory_name)
+        if subcategory_id is None:
+            raise ValueError('The subcategory with the specified name does not exist')
+        return subcategory_id
+
+
+category_index = CategoryIndex(os.path.join(
+    Path(__file__).parent.parent, "static/categories/categories.json"))
 
-    if subcategory_name is None:
-        raise ValueError(
-            'The subcategory with the specified ID does not belong to the category')
 
-    return subcategory_name
+def get_subcategory_name(category_id, subcategory_id):
+    return category_index.get_subcategory_name(category_id, subcategory_id)
 
 
 def get_subcategory_id(subcategory_name):
-    static_path = os.path.join(
-        Path(__file__).parent.parent, "static/categories/categories.json")
-    with open(static_path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
-
-    for _, category_data in data.items():
-        subcategories = category_data.get('subcategories', {})
-        for subcategory_id, name in subcategories.items():
-            if name == subcategory_name:
-                return int(subcategory_id)
-
-    raise ValueError('The subcategory with the specified name does not exist')
+    return category_index.get_subcategory_id(subcategory_name)
@@ -1,13 +1,12 @@
 import re
 from typing import Optional
 
-from flask import url_for
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, computed_field, field_validator
 from pydantic_core.core_schema import ValidationInfo
-from sqlalchemy import func
 
 from models.shops import Shop
-from validation.products import PaginatedProductSchema, ProductInfoSchema
+from utils.images import image_variant_urls, media_url
+from validation.products import PaginatedProductSchema
 
 
 class ShopCreateValid(BaseModel):
@@ -33,9 +32,7 @@ class ShopCreateValid(BaseModel):
             regex = r"^[A-Za-zА-ЩЬЮЯҐЄІЇа-щьюяґєії0-9'.,;\- ]+$"
             if not re.match(regex, value) or len(value) > 50:
                 raise ValueError('Invalid shop name format')
-            existing_shop = Shop.query.filter(
-                func.lower(Shop.name) == value.lower()).first()
-            if existing_shop:
+            if Shop.get_shop_by_name(value) is not None:
                 raise ValueError('Shop with this name already exists')
         return value
 
@@ -73,10 +70,8 @@ class ShopUpdateValid(BaseModel):
             regex = r"^[A-Za-zА-ЩЬЮЯҐЄІЇа-щьюяґєії0-9'.,;\- ]+$"
             if not re.match(regex, value) or len(value) > 50:
                 raise ValueError('Invalid shop name format')
-            existing_shop = Shop.query.filter(
-                func.lower(Shop.name) == value.lower()).first()
-            user_shop = Shop.query.filter(Shop.owner_id == owner_id).first()
-            if existing_shop and existing_shop != user_shop:
+            existing_shop = Shop.get_shop_by_name(value)
+            if existing_shop is not None and existing_shop.owner_id != owner_id:
                 raise ValueError('Shop with this name already exists')
         return value
 
@@ -105,43 +100,24 @@ class ShopSchema(BaseModel):
     @field_validator("photo_shop", mode="after")
     @classmethod
     def set_photo_shop(cls, v):
-        if v:
-            image = url_for('static', filename=f'media/shops/{v}',
-                            _external=True)
-            return image
-        return v
+        return media_url('shops', v)
 
     @field_validator("banner_shop", mode="after")
     @classmethod
     def set_banner_shop(cls, v):
-        if v:
-            image = url_for('static', filename=f'media/banner_shops/{v}',
-                            _external=True)
-            return image
-        return v
+        return media_url('banner_shops', v)
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def photo_shop_variants(self) -> Optional[dict[str, dict[str, str]]]:
+        return image_variant_urls(self.photo_shop)
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def banner_shop_variants(self) -> Optional[dict[str, dict[str, str]]]:
+        return image_variant_urls(self.banner_shop)
 
 
 class ShopWithProductsSchema(BaseModel):
     shop: ShopSchema
     products: PaginatedProductSchema
-
-    @classmethod
-    def load_list(cls, item_list, shop):
-        result = []
-        shop = ShopSchema.model_validate(shop)
-        for product_tuple in item_list:
-            product_id = product_tuple[0]
-            product_name = product_tuple[1]
-            price = product_tuple[2]
-            product_status = product_tuple[3]
-            is_unique = product_tuple[4]
-            photo = product_tuple[5]
-
-            schema = ProductInfoSchema(id=product_id,
-                                       product_name=product_name,
-                                       price=price,
-                                       product_status=product_status,
-                                       is_unique=is_unique,
-                                       photo=photo)
-            result.append(schema)
-        return cls(shop=shop, products=PaginatedProductSchema(data=result))